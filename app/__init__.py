@@ -1,20 +1,73 @@
 # app/__init__.py
 
-from flask import Flask, jsonify
+import time
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
+from .bootstrap import start_bootstrap, readiness, is_ready
+from .metrics import REQUEST_SECONDS
+from .profiling import start_request_profile, finish_request_profile
+
+# Routes that answer while the database is still downloading
+WARMING_EXEMPT = {"/", "/api/ready", "/api/metrics"}
 
 def create_app():
     app = Flask(__name__)
     CORS(app)
 
+    # Fetch the database in the background; the worker boots immediately
+    start_bootstrap()
+
     from .api.schema_api import bp as schema_bp
     from .api.volatility_api import bp as volatility_bp
+    from .api.export_api import bp as export_bp
+    from .api.payload_api import bp as payload_bp
+    from .api.covariance_api import bp as covariance_bp
+    from .api.metrics_api import bp as metrics_bp
 
     app.register_blueprint(schema_bp, url_prefix="/api")
     app.register_blueprint(volatility_bp, url_prefix="/api")
+    app.register_blueprint(export_bp, url_prefix="/api")
+    app.register_blueprint(payload_bp, url_prefix="/api")
+    app.register_blueprint(covariance_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp, url_prefix="/api")
+
+    # Registered first so the timer also covers requests answered while warming
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_timing(response):
+        start = g.pop("request_start", None)
+        if start is not None:
+            REQUEST_SECONDS.observe((request.endpoint or "unmatched", request.method, str(response.status_code)),
+                                    time.perf_counter() - start)
+        return response
+
+    # Opt-in sampling profile of one request (RISKRADAR_PROFILING=1 + X-Profile header)
+    @app.before_request
+    def start_profile():
+        g.profiler = start_request_profile(request)
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop("profiler", None)
+        return finish_request_profile(profiler, request, response) if profiler else response
+
+    @app.before_request
+    def require_database():
+        if not is_ready() and request.path not in WARMING_EXEMPT:
+            return jsonify(readiness()), 503, {"Retry-After": "5"}
 
     @app.route("/")
     def index():
         return jsonify({"status": "ok", "message": "✅ RiskRadar API is live"})
 
+    @app.route("/api/ready")
+    def ready():
+        state = readiness()
+        if state["status"] == "failed":
+            start_bootstrap()  # retry; resumes from the partial download
+        return jsonify(state), 200 if state["status"] == "ready" else 503
+
     return app
\ No newline at end of file
@@ -0,0 +1,60 @@
+# app/api/covariance_api.py
+
+from flask import Blueprint, request, jsonify
+from app.cache import cached_response
+from app.services.batch_volatility import load_index_tickers
+from app.services.covariance import stored_version, submatrix
+from app.services.weights_store import parse_day
+
+bp = Blueprint("covariance_api", __name__)
+
+MAX_TICKERS = 1000  # keeps the JSON matrix (n^2 values) bounded
+KINDS = ("cov", "corr")
+
+def _matrix_version():
+    """
+    Cache version: the stored matrix this request would read. Matrices are
+    files, so building one never bumps the database's data version.
+    """
+    try:
+        window = int(request.args.get("window", 60))
+    except ValueError:
+        return None
+    return stored_version(request.args.get("date"), window, request.args.get("shrinkage", "0") == "1")
+
+@bp.route("/covariance", methods=["GET"])
+@cached_response(version=_matrix_version)
+def get_covariance_matrix():
+    """
+    Covariance or correlation submatrix for ?tickers=AAPL,MSFT (or ?index=dow30)
+    from the latest matrix precomputed on or before ?date (latest by default;
+    built by `python -m app.services.covariance`).
+    Options: window (default 60), kind=cov|corr, shrinkage=1 for Ledoit-Wolf.
+    """
+    window = int(request.args.get("window", 60))
+    kind = request.args.get("kind", "cov")
+    shrinkage = request.args.get("shrinkage", "0") == "1"
+    index = request.args.get("index")
+    tickers = [t.strip() for t in request.args.get("tickers", "").split(",") if t.strip()]
+
+    if kind not in KINDS:
+        return jsonify({"error": f"Unsupported kind: {kind}"}), 400
+    if window < 2:
+        return jsonify({"error": "window must be at least 2"}), 400
+    date = request.args.get("date")
+    if date is not None and parse_day(date) is None:
+        return jsonify({"error": f"Invalid date: {date}"}), 400
+    if index:
+        try:
+            tickers = load_index_tickers(index)
+        except KeyError:
+            return jsonify({"error": f"Unknown index: {index}"}), 400
+    if not tickers:
+        return jsonify({"error": "Provide tickers or index"}), 400
+    if len(tickers) > MAX_TICKERS:
+        return jsonify({"error": f"At most {MAX_TICKERS} tickers per request"}), 400
+
+    result = submatrix(list(dict.fromkeys(tickers)), date, window, kind, shrinkage)
+    if result is None:
+        return jsonify({"error": "No covariance precomputed on or before that date"}), 404
+    return jsonify(result)
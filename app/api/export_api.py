@@ -0,0 +1,26 @@
+# app/api/export_api.py
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.services.exporter import FORMATS, iter_export
+
+bp = Blueprint("export_api", __name__)
+
+def _stream_export(ticker=None):
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+
+    chunks = iter_export(fmt, ticker=ticker,
+                         start_date=request.args.get("start"),
+                         end_date=request.args.get("end"))
+    filename = f"{ticker or 'stock_data'}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+@bp.route("/export", methods=["GET"])
+def export_all():
+    return _stream_export()
+
+@bp.route("/export/<ticker>", methods=["GET"])
+def export_ticker(ticker):
+    return _stream_export(ticker)
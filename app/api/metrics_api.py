@@ -0,0 +1,12 @@
+# app/api/metrics_api.py
+
+from flask import Blueprint, Response
+from app.metrics import registry
+
+bp = Blueprint("metrics_api", __name__)
+
+PROMETHEUS_TEXT = "text/plain; version=0.0.4; charset=utf-8"
+
+@bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(registry.render(), mimetype=PROMETHEUS_TEXT)
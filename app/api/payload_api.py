@@ -0,0 +1,72 @@
+# app/api/payload_api.py
+
+import os
+from flask import Blueprint, jsonify, request, redirect, send_file, url_for
+from app.services.payloads import PAYLOAD_DIR, load_manifest, choose_variant
+
+bp = Blueprint("payload_api", __name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"  # content-hashed URLs only
+REVALIDATE = "public, no-cache"                     # logical names: the ETag makes it a 304
+
+def _logical_name(filename: str) -> str:
+    """
+    'volatility.<hash>.json.gz' -> 'volatility.json'
+    """
+    for suffix in (".gz", ".br"):
+        if filename.endswith(suffix):
+            filename = filename[:-len(suffix)]
+    stem, ext = os.path.splitext(filename)
+    return f"{stem.rsplit('.', 1)[0]}{ext}"
+
+
+def send_payload(name: str, immutable: bool = False):
+    """
+    Serve the best precompressed variant of a published file, or None if unpublished.
+    Only requests for the content-hashed URL (immutable=True) may be cached
+    for good; a logical name like /api/weights/<date> can be republished, so
+    clients revalidate it against the hash-based ETag.
+    """
+    entry = load_manifest().get(name)
+    if entry is None:
+        return None
+    encoding, filename = choose_variant(entry, request.headers.get("Accept-Encoding"))
+    path = os.path.join(PAYLOAD_DIR, filename)
+    if not os.path.exists(path):
+        return None
+
+    resp = send_file(path, mimetype="application/json", conditional=True,
+                     etag=f"{entry['hash']}-{encoding or 'identity'}")
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+    return resp
+
+@bp.route("/payloads", methods=["GET"])
+def get_manifest():
+    """
+    Logical name -> hashed variants; clients build immutable URLs from it.
+    """
+    resp = jsonify({
+        name: {**entry, "url": url_for("payload_api.get_payload",
+                                       filename=entry["variants"]["identity"]["file"])}
+        for name, entry in load_manifest().items()
+    })
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@bp.route("/payloads/<path:filename>", methods=["GET"])
+def get_payload(filename):
+    name = _logical_name(filename)
+    entry = load_manifest().get(name)
+    if entry is None:
+        return jsonify({"error": "File not found"}), 404
+
+    # Unhashed (or outdated) names redirect to the current hashed URL
+    current = entry["variants"]["identity"]["file"]
+    if filename != current:
+        resp = redirect(url_for("payload_api.get_payload", filename=current))
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    return send_payload(name, immutable=True) or (jsonify({"error": "File not found"}), 404)
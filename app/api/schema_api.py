@@ -3,14 +3,18 @@
 from flask import Blueprint, jsonify
 from sqlalchemy import text
 from app.database import engine  # ✅ Correct import
+from app.cache import cached_response, response_cache
 
 bp = Blueprint("schema_api", __name__)
 
+SCHEMA_QUERY = text("PRAGMA table_info(stock_data);")
+
 @bp.route("/schema", methods=["GET"])
+@cached_response
 def get_schema():
     try:
         with engine.connect() as conn:
-            result = conn.execute(text("PRAGMA table_info(stock_data);"))
+            result = conn.execute(SCHEMA_QUERY)
             schema = [
                 {
                     "cid": row[0],
@@ -26,4 +30,8 @@ def get_schema():
 
     except Exception as e:
         print(f"❌ Error in get_schema: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
@@ -1,17 +1,92 @@
 # app/api/volatility_api.py
 
 import os
+import json
+import numpy as np
 import pandas as pd
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 from sqlalchemy import text
 from app.database import engine
+from app.cache import cached_response
+from app.metrics import span
+from app.api.payload_api import send_payload
+from app.services.price_store import get_price_store
+from app.services.volatility_engine import get_state
+from app.services.snapshots import is_ticker_fresh, read_volatility, read_weights
+from app.services.weights_store import (
+    get_weights as read_stored_weights, top_volatility, volatility_percentile, parse_day, store_version,
+)
+from app.services.volatility_estimators import ESTIMATORS, compute_estimators, history_needed
+from app.services.batch_volatility import (
+    load_index_tickers, fetch_closes, compute_batch_volatility, iter_volatility_records,
+)
 
 bp = Blueprint("volatility_api", __name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 
+# Hot queries live at module level so every pooled connection prepares each once
+TICKERS_QUERY = text("SELECT DISTINCT ticker FROM stock_data")
+HISTORY_QUERY = text("""
+    SELECT date, open, high, low, close, volume
+    FROM stock_data
+    WHERE ticker = :ticker
+    ORDER BY date DESC
+    LIMIT 100
+""")
+CLOSES_QUERY = text("""
+    SELECT date, close
+    FROM stock_data
+    WHERE ticker = :ticker
+    ORDER BY date ASC
+""")
+LATEST_DATE_QUERY = text("SELECT MAX(date) FROM stock_data WHERE ticker = :ticker")
+OHLC_TAIL_QUERY = text("""
+    SELECT date, open, high, low, close
+    FROM stock_data
+    WHERE ticker = :ticker
+    ORDER BY date DESC
+    LIMIT :limit
+""")
+
+def _num(value, integer: bool):
+    value = float(value)
+    if np.isnan(value):
+        return None
+    return int(value) if integer else value
+
+def _history_records(cols: dict, store) -> list:
+    """
+    Build newest-first history records from price store column views,
+    with the same value types the SQL query returns.
+    """
+    fields = ("open", "high", "low", "close", "volume")
+    integer = {f: f in store.integer_fields for f in fields}
+    dates = cols["date_text"]
+    return [
+        {"date": dates[i].decode(), **{f: _num(cols[f][i], integer[f]) for f in fields}}
+        for i in range(len(dates) - 1, -1, -1)
+    ]
+
 @bp.route("/weights/<date>")
 def get_weights(date):
+    window = int(request.args.get("window", 30))
+    nearest = request.args.get("nearest", "0") == "1"
+    stored = read_stored_weights(date, window, nearest)
+    if stored is not None:
+        served, weights = stored
+        resp = jsonify(weights)
+        resp.headers["X-Weights-Date"] = served
+        return resp
+
+    weights = read_weights(date, window)
+    if weights:
+        return jsonify(weights)
+
+    published = send_payload(f"weights_{date}.json")
+    if published is not None:
+        return published
+
     path = os.path.join(DATA_DIR, f"weights_{date}.json")
     print(f"📁 Attempting to serve: {path}")  # Add debug log
 
@@ -22,23 +97,28 @@ def get_weights(date):
     return send_file(path, mimetype="application/json")
 
 @bp.route("/tickers")
+@cached_response
 def get_tickers():
+    store = get_price_store()
+    if store is not None:
+        return jsonify(store.tickers())
+
     with engine.connect() as conn:
-        result = conn.execute(text("SELECT DISTINCT ticker FROM stock_data"))
+        result = conn.execute(TICKERS_QUERY)
         tickers = [row[0] for row in result]
     return jsonify(tickers)
 
 @bp.route("/history/<ticker>")
+@cached_response
 def get_history(ticker):
     try:
+        store = get_price_store()
+        if store is not None:
+            cols = store.tail(ticker, 100)
+            return jsonify(_history_records(cols, store) if cols is not None else [])
+
         with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT date, open, high, low, close, volume
-                FROM stock_data
-                WHERE ticker = :ticker
-                ORDER BY date DESC
-                LIMIT 100
-            """), {"ticker": ticker})
+            result = conn.execute(HISTORY_QUERY, {"ticker": ticker})
 
             rows = result.fetchall()
             keys = result.keys()
@@ -50,22 +130,196 @@ def get_history(ticker):
         print(f"❌ Error in get_history: {e}")
         return jsonify({"error": str(e)}), 500
 
+def _latest_date(ticker: str, store=None):
+    """
+    Most recent bar date for a ticker as 'YYYY-MM-DD' (index seek, no scan).
+    """
+    if store is not None:
+        cols = store.tail(ticker, 1)
+        return str(np.datetime_as_string(cols["date"][0], unit="D")) if cols is not None and len(cols["date"]) else None
+    with engine.connect() as conn:
+        latest = conn.execute(LATEST_DATE_QUERY, {"ticker": ticker}).scalar()
+    return str(latest)[:10] if latest is not None else None
+
+@bp.route("/volatility/batch", methods=["GET", "POST"])
+def get_volatility_batch():
+    """
+    Volatility for many tickers in one request, streamed as NDJSON:
+    a header line with the shared date axis, then one line per ticker.
+    Accepts ?tickers=AAPL,MSFT or ?index=sp500 (or the same keys in a JSON body).
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        window = int(body.get("window", request.args.get("window", 30)))
+        points = int(body.get("points", request.args.get("points", 30)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "window and points must be integers"}), 400
+    if window < 2:
+        return jsonify({"error": "window must be at least 2"}), 400
+    if points < 1:
+        return jsonify({"error": "points must be at least 1"}), 400
+    index = body.get("index", request.args.get("index"))
+    tickers = body.get("tickers", request.args.get("tickers"))
+    if isinstance(tickers, str):
+        tickers = [t.strip() for t in tickers.split(",") if t.strip()]
+
+    if index:
+        try:
+            tickers = load_index_tickers(index)
+        except KeyError:
+            return jsonify({"error": f"Unknown index: {index}"}), 400
+    if not tickers:
+        return jsonify({"error": "Provide tickers or index"}), 400
+
+    closes = fetch_closes(sorted(set(tickers)), window, points)
+    with span("volatility.batch"):
+        vol = compute_batch_volatility(closes, window, points)
+    missing = sorted(set(tickers) - set(vol.columns))
+
+    def generate():
+        yield json.dumps({"window": window, "dates": list(vol.index), "missing": missing},
+                         separators=(",", ":")) + "\n"
+        for record in iter_volatility_records(vol):
+            yield json.dumps(record, separators=(",", ":")) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def _rankings_version():
+    """
+    Cache version for the ranking routes: the weights store file they read.
+    refresh_snapshots rebuilds it after the commit that bumps the data version.
+    """
+    try:
+        return store_version(int(request.args.get("window", 30)))
+    except ValueError:
+        return None
+
+@bp.route("/volatility/top")
+@cached_response(version=_rankings_version)
+def get_volatility_top():
+    """
+    Most (order=desc) or least (order=asc) volatile tickers on ?date
+    (latest, or the closest earlier trading day).
+    """
+    window = int(request.args.get("window", 30))
+    n = min(int(request.args.get("n", 10)), 1000)
+    if n < 1:
+        return jsonify({"error": "n must be at least 1"}), 400
+    order = request.args.get("order", "desc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": f"Unsupported order: {order}"}), 400
+    date = request.args.get("date")
+    if date is not None and parse_day(date) is None:
+        return jsonify({"error": f"Invalid date: {date}"}), 400
+    ranked = top_volatility(date, n, order, window)
+    if ranked is None:
+        return jsonify({"error": "No ranking for that date"}), 404
+    served, rows = ranked
+    return jsonify({"date": served, "window": window, "order": order, "tickers": rows})
+
+@bp.route("/volatility/<ticker>/percentile")
+@cached_response(version=_rankings_version)
+def get_volatility_percentile(ticker):
+    window = int(request.args.get("window", 30))
+    date = request.args.get("date")
+    if date is not None and parse_day(date) is None:
+        return jsonify({"error": f"Invalid date: {date}"}), 400
+    result = volatility_percentile(ticker, date, window)
+    if result is None:
+        return jsonify({"error": "No ranking for that ticker and date"}), 404
+    return jsonify(result)
+
+def _estimator_volatility(ticker, window, estimator, store, points=30):
+    """
+    Last `points` values of an OHLC estimator, reading only the bars it needs.
+    """
+    if window < 2:
+        return jsonify({"error": "window must be at least 2"}), 400
+    limit = history_needed(estimator, window, points)
+    if store is not None:
+        cols = store.tail(ticker, limit)
+        if cols is None:
+            cols = {"date": np.array([], dtype="datetime64[D]")}
+        dates = np.datetime_as_string(cols["date"], unit="D")
+    else:
+        with engine.connect() as conn:
+            df = pd.read_sql_query(OHLC_TAIL_QUERY, conn, params={"ticker": ticker, "limit": limit}).iloc[::-1]
+        cols = {k: df[k].to_numpy() for k in ("open", "high", "low", "close")}
+        dates = df["date"].astype(str).str[:10].to_numpy()
+
+    if len(dates) <= window:
+        return jsonify({"error": "Not enough data to compute volatility"}), 400
+
+    with span(f"volatility.{estimator}"):
+        vol = compute_estimators(cols["open"], cols["high"], cols["low"], cols["close"],
+                                 window, (estimator,))[estimator]
+    keep = np.flatnonzero(~np.isnan(vol))[-points:]
+    return jsonify([{"date": str(dates[i]), "volatility": float(vol[i])} for i in keep])
+
+def _current_state(ticker: str, window: int, store=None):
+    """
+    The incremental engine's state for a ticker if it covers the latest bar, else None.
+    """
+    state = get_state(ticker, window)
+    if state is not None and state.recent and str(state.last_date)[:10] == _latest_date(ticker, store):
+        return state
+    return None
+
+def needs_full_history(ticker: str, window: int = 30, estimator: str = "close") -> bool:
+    """
+    True when /volatility/<ticker> has neither a fresh snapshot nor current
+    state to serve, so it recomputes over the ticker's full history.
+    """
+    if estimator != "close":
+        return False  # OHLC estimators read a bounded tail
+    return not is_ticker_fresh(ticker, window) and _current_state(ticker, window, get_price_store()) is None
+
 @bp.route("/volatility/<ticker>")
+@cached_response
 def get_volatility(ticker):
     window = int(request.args.get("window", 30))
+    estimator = request.args.get("estimator", "close")
+    if window < 2:
+        return jsonify({"error": "window must be at least 2"}), 400
+    if estimator not in ESTIMATORS:
+        return jsonify({"error": f"Unknown estimator: {estimator}",
+                        "estimators": list(ESTIMATORS)}), 400
+    store = get_price_store()
+    if estimator != "close":
+        return _estimator_volatility(ticker, window, estimator, store)
+
+    # Serve the materialized snapshot when it matches the source rows
+    if is_ticker_fresh(ticker, window):
+        return jsonify(read_volatility(ticker, window))
+
+    # Then the incremental engine when its state is current
+    state = _current_state(ticker, window, store)
+    if state is not None:
+        return jsonify([{"date": d, "volatility": v} for d, v in state.recent])
+
+    if store is not None:
+        # Compute on the memory-mapped close column; only the returned tail gets formatted
+        cols = store.slice(ticker)
+        if cols is None or len(cols["close"]) < window:
+            return jsonify({"error": "Not enough data to compute volatility"}), 400
+
+        close = pd.Series(cols["close"], copy=False)
+        with span("volatility.rolling_std"):
+            vol = close.pct_change().rolling(window).std().dropna().tail(30)
+        dates = cols["date_text"][vol.index.to_numpy()]
+        return jsonify([
+            {"date": d.decode(), "volatility": float(v)} for d, v in zip(dates, vol.to_numpy())
+        ])
+
     with engine.connect() as conn:
-        df = pd.read_sql_query("""
-            SELECT date, close
-            FROM stock_data
-            WHERE ticker = :ticker
-            ORDER BY date ASC
-        """, conn, params={"ticker": ticker})
+        df = pd.read_sql_query(CLOSES_QUERY, conn, params={"ticker": ticker})
 
     if df.empty or len(df) < window:
         return jsonify({"error": "Not enough data to compute volatility"}), 400
 
-    df['return'] = df['close'].pct_change()
-    df['volatility'] = df['return'].rolling(window).std()
-    df = df.dropna()
+    with span("volatility.rolling_std"):
+        df['return'] = df['close'].pct_change()
+        df['volatility'] = df['return'].rolling(window).std()
+        df = df.dropna()
 
-    return jsonify(df[['date', 'volatility']].tail(30).to_dict(orient='records'))
\ No newline at end of file
+    return jsonify(df[['date', 'volatility']].tail(30).to_dict(orient='records'))
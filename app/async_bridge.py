@@ -0,0 +1,373 @@
+# app/async_bridge.py
+
+import io
+import os
+import re
+import sys
+import asyncio
+import threading
+import multiprocessing
+from urllib.parse import parse_qs, unquote
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from app.metrics import registry
+
+# === CONFIGURATION ===
+# ASGI front for the Flask app (served by asgi.py). The event loop only parses
+# requests and writes responses; the WSGI app runs in one of three lanes:
+#   cheap   - thread pool for index lookups and cached/store reads
+#             (tickers, history, weights, rankings, precomputed covariance,
+#             snapshot-served volatility, schema, metrics, ...)
+#   compute - process pool, each process holding its own app, for batch
+#             volatility and /volatility/<ticker> requests that fall back to
+#             the full history (pandas work runs outside this process's GIL)
+#   stream  - small thread pool for streamed exports. Each export holds one
+#             thread for its whole life (the app, every chunk and close()
+#             share it, and so Flask's context) and hands chunks to the loop
+#             through a queue, at most STREAM_BUFFER ahead of the client.
+# Each lane admits at most workers + queue requests; beyond that it answers
+# 503 with Retry-After at once, so a burst of expensive calls can never
+# hold up the cheap lane. Compute-lane requests are counted in the worker
+# processes' own metrics registries.
+CHEAP_THREADS = int(os.environ.get("RISKRADAR_ASGI_CHEAP_THREADS", 8))
+CHEAP_QUEUE = int(os.environ.get("RISKRADAR_ASGI_CHEAP_QUEUE", 256))
+COMPUTE_PROCESSES = int(os.environ.get("RISKRADAR_ASGI_COMPUTE_PROCESSES", os.cpu_count() or 1))
+COMPUTE_QUEUE = int(os.environ.get("RISKRADAR_ASGI_COMPUTE_QUEUE", 16))
+STREAM_THREADS = int(os.environ.get("RISKRADAR_ASGI_STREAM_THREADS", 2))
+STREAM_QUEUE = int(os.environ.get("RISKRADAR_ASGI_STREAM_QUEUE", 4))
+STREAM_BUFFER = int(os.environ.get("RISKRADAR_ASGI_STREAM_BUFFER", 8))  # chunks
+RETRY_AFTER = "1"
+
+COMPUTE_PATHS = {"/api/volatility/batch"}
+VOLATILITY_PATH = re.compile(r"^/api/volatility/(?!(?:top|batch)$)([^/]+)$")
+
+def lane_for(path: str) -> str:
+    if path.startswith("/api/export"):
+        return "stream"
+    if path in COMPUTE_PATHS:
+        return "compute"
+    return "cheap"
+
+
+def full_history_volatility(environ: dict) -> bool:
+    """
+    True for a /volatility/<ticker> request that no snapshot or state can
+    serve. Runs on the cheap lane (a few index lookups). While the database
+    is warming, or when the lookups fail, the request stays cheap and the app
+    answers it (503 with readiness, or its own error).
+    """
+    from sqlalchemy.exc import SQLAlchemyError
+    from app.bootstrap import is_ready
+
+    match = VOLATILITY_PATH.match(environ["PATH_INFO"])
+    if not match or not is_ready():
+        return False
+    params = parse_qs(environ["QUERY_STRING"])
+    try:
+        window = int(params.get("window", ["30"])[0])
+    except ValueError:
+        return False  # answered with 400 by the app
+    if window < 2:
+        return False
+    from app.api.volatility_api import needs_full_history
+    try:
+        return needs_full_history(unquote(match.group(1)), window, params.get("estimator", ["close"])[0])
+    except (SQLAlchemyError, OSError) as e:
+        print(f"⚠️ Volatility lane check failed, serving on the cheap lane: {e}")
+        return False
+
+# === WSGI ===
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """
+    Picklable WSGI environ for an ASGI HTTP scope (wsgi.input/errors are added by run_wsgi).
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif key != "CONTENT_LENGTH":
+            key = f"HTTP_{key}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ: dict, body: bytes):
+    """
+    Call the WSGI app. Returns (status code, [(name, value)], body iterable).
+    """
+    environ = dict(environ, **{"wsgi.input": io.BytesIO(body), "wsgi.errors": sys.stderr})
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = int(status.split(" ", 1)[0]), headers
+
+    result = wsgi_app(environ, start_response)
+    if not started:
+        # start_response may be deferred until the first chunk
+        result = iter(result)
+        first = next(result, b"")
+        result = _prepend(first, result)
+    return started["status"], started["headers"], result
+
+
+def _prepend(first: bytes, rest):
+    yield first
+    yield from rest
+
+
+def drain_stream(wsgi_app, environ: dict, body: bytes, loop, queue: asyncio.Queue,
+                 slots: threading.Semaphore, cancelled: threading.Event) -> None:
+    """
+    Run a streamed response start to finish on the calling thread and post
+    ("start", status, headers), ("body", chunk)..., then ("end",) or
+    ("error", exc) to `queue` on `loop`. Each chunk takes one of `slots`
+    (returned by the sender); `cancelled` stops the iteration early.
+    """
+    def post(*item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    try:
+        status, headers, result = run_wsgi(wsgi_app, environ, body)
+    except Exception as e:
+        post("error", e)
+        return
+    try:
+        post("start", status, headers)
+        for chunk in result:
+            if not chunk:
+                continue
+            while not slots.acquire(timeout=0.1):
+                if cancelled.is_set():
+                    return
+            if cancelled.is_set():
+                return
+            post("body", chunk)
+        post("end")
+    except Exception as e:
+        post("error", e)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+
+def run_buffered(wsgi_app, environ: dict, body: bytes) -> tuple:
+    status, headers, result = run_wsgi(wsgi_app, environ, body)
+    try:
+        return status, headers, b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+# === COMPUTE PROCESSES ===
+
+_worker_app = None
+
+def _init_worker():
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app()
+
+
+def _compute(environ: dict, body: bytes) -> tuple:
+    return run_buffered(_worker_app, environ, body)
+
+
+def _ready() -> bool:
+    return _worker_app is not None
+
+# === ASGI APP ===
+
+class Lane:
+    def __init__(self, name: str, executor, workers: int, queue: int):
+        self.name, self.executor = name, executor
+        self.limit = workers + queue
+        self.inflight = 0
+        self.rejected = 0
+
+    def admit(self) -> bool:
+        if self.inflight >= self.limit:
+            self.rejected += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self) -> None:
+        self.inflight -= 1
+
+
+class AsyncBridge:
+    """
+    ASGI application dispatching each request to its lane.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.lanes = None
+        registry.register_collector(self._collect_metrics)
+
+    def start(self) -> None:
+        if self.lanes is not None:
+            return
+        processes = ProcessPoolExecutor(COMPUTE_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker)
+        self.lanes = {
+            "cheap": Lane("cheap", ThreadPoolExecutor(CHEAP_THREADS, thread_name_prefix="asgi-cheap"),
+                          CHEAP_THREADS, CHEAP_QUEUE),
+            "compute": Lane("compute", processes, COMPUTE_PROCESSES, COMPUTE_QUEUE),
+            "stream": Lane("stream", ThreadPoolExecutor(STREAM_THREADS, thread_name_prefix="asgi-stream"),
+                           STREAM_THREADS, STREAM_QUEUE),
+        }
+
+    async def warm_up(self) -> None:
+        """
+        Start every compute process (and its app) before the first request.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.lanes["compute"].executor, _ready)
+                               for _ in range(COMPUTE_PROCESSES)))
+
+    def stop(self) -> None:
+        if self.lanes is None:
+            return
+        for lane in self.lanes.values():
+            lane.executor.shutdown(wait=False, cancel_futures=True)
+        self.lanes = None
+
+    def _collect_metrics(self):
+        if self.lanes is None:
+            return []
+        return [
+            ("riskradar_asgi_inflight", "gauge", "Requests admitted and not yet answered, by lane.",
+             [({"lane": n}, lane.inflight) for n, lane in self.lanes.items()]),
+            ("riskradar_asgi_rejected_total", "counter", "Requests refused with 503 by admission control, by lane.",
+             [({"lane": n}, lane.rejected) for n, lane in self.lanes.items()]),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.start()
+                    await self.warm_up()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        self.start()  # servers without lifespan support
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, body)
+        name = lane_for(scope["path"])
+        if name == "cheap" and VOLATILITY_PATH.match(scope["path"]):
+            # Snapshot- and state-served requests are cheap; only the full-history fallback is not
+            cheap = self.lanes["cheap"]
+            if not cheap.admit():
+                await _send_busy(send)
+                return
+            try:
+                if await loop.run_in_executor(cheap.executor, full_history_volatility, environ):
+                    name = "compute"
+            finally:
+                cheap.release()
+
+        lane = self.lanes[name]
+        if not lane.admit():
+            await _send_busy(send)
+            return
+
+        try:
+            if lane.name == "compute":
+                status, headers, content = await loop.run_in_executor(lane.executor, _compute, environ, body)
+                await _send(send, status, headers, content)
+            elif lane.name == "stream":
+                await self._stream(loop, lane, environ, body, send)
+            else:
+                status, headers, content = await loop.run_in_executor(
+                    lane.executor, run_buffered, self.wsgi_app, environ, body)
+                await _send(send, status, headers, content)
+        finally:
+            lane.release()
+
+    async def _stream(self, loop, lane, environ, body, send):
+        queue, slots, cancelled = asyncio.Queue(), threading.Semaphore(STREAM_BUFFER), threading.Event()
+        producer = loop.run_in_executor(lane.executor, drain_stream, self.wsgi_app, environ, body,
+                                        loop, queue, slots, cancelled)
+        try:
+            kind, *item = await queue.get()
+            if kind == "error":
+                raise item[0]
+            status, headers = item
+            await send({"type": "http.response.start", "status": status, "headers": _encode(headers)})
+            while True:
+                kind, *item = await queue.get()
+                if kind == "end":
+                    break
+                if kind == "error":
+                    raise item[0]
+                await send({"type": "http.response.body", "body": item[0], "more_body": True})
+                slots.release()
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            # On a disconnect or error, stop the producer between chunks and wait for its close()
+            cancelled.set()
+            await producer
+
+
+def _encode(headers) -> list:
+    return [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+
+async def _send_busy(send) -> None:
+    await _send(send, 503, [("Content-Type", "application/json"), ("Retry-After", RETRY_AFTER)],
+                b'{"error": "Server busy, retry shortly"}')
+
+
+async def _send(send, status: int, headers, body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": _encode(headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_asgi_app():
+    from app import create_app
+    return AsyncBridge(create_app())
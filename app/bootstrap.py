@@ -0,0 +1,186 @@
+# app/bootstrap.py
+
+import os
+import time
+import fcntl
+import hashlib
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.client import IncompleteRead
+from app.database import DB_PATH, DROPBOX_URL
+
+# === CONFIGURATION ===
+# Downloads riskradar.db once per host: one process holds the file lock, streams
+# into <db>.part (resuming with HTTP Range after a dropped connection), checks
+# the SHA-256 and renames into place. Workers start serving immediately and
+# report "warming" until the file exists.
+# The expected digest is RISKRADAR_DB_SHA256 when set, otherwise the digest
+# published next to the database (RISKRADAR_DB_SHA256_URL, by default the DB
+# URL's path + ".sha256", in `sha256sum` format). Without either the download
+# fails closed; RISKRADAR_DB_ALLOW_UNVERIFIED=1 opts out explicitly.
+# The default Dropbox link publishes no sidecar, so deployments pin the digest:
+# .render.yaml declares RISKRADAR_DB_SHA256, entered when the Blueprint is created.
+DB_URL = os.environ.get("RISKRADAR_DB_URL", DROPBOX_URL)
+DB_SHA256 = os.environ.get("RISKRADAR_DB_SHA256")
+DB_SHA256_URL = os.environ.get("RISKRADAR_DB_SHA256_URL")
+ALLOW_UNVERIFIED = os.environ.get("RISKRADAR_DB_ALLOW_UNVERIFIED", "0") == "1"
+CHUNK_BYTES = 1 << 20
+RETRIES = 5
+TIMEOUT = 30
+
+# === DOWNLOAD ===
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def digest_url(url: str) -> str:
+    """
+    Sidecar digest URL: the same URL with ".sha256" appended to its path.
+    """
+    parts = urllib.parse.urlsplit(url)
+    return urllib.parse.urlunsplit(parts._replace(path=parts.path + ".sha256"))
+
+
+def fetch_published_digest(url: str, timeout: float = TIMEOUT) -> str:
+    """
+    Read a `sha256sum`-style digest file and return the hex digest.
+    Raises ValueError when it cannot be fetched or holds no valid digest.
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            body = resp.read(4096).decode("ascii", "replace")
+    except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+        raise ValueError(f"Could not fetch the published digest from {url}: {e}") from e
+    token = body.split()[0].lower() if body.split() else ""
+    if len(token) != 64 or any(c not in "0123456789abcdef" for c in token):
+        raise ValueError(f"{url} does not hold a SHA-256 digest")
+    return token
+
+
+def expected_digest(url: str, sha256: str = None, sha256_url: str = None,
+                    allow_unverified: bool = False) -> str:
+    """
+    The digest the download must match, or None only when unverified downloads are allowed.
+    """
+    if sha256:
+        return sha256.lower()
+    try:
+        return fetch_published_digest(sha256_url or digest_url(url))
+    except ValueError as e:
+        if allow_unverified:
+            print(f"⚠️ {e}; RISKRADAR_DB_ALLOW_UNVERIFIED=1, skipping checksum verification.")
+            return None
+        raise ValueError(f"{e}. Set RISKRADAR_DB_SHA256 or RISKRADAR_DB_SHA256_URL "
+                         "(or RISKRADAR_DB_ALLOW_UNVERIFIED=1 to skip verification).") from e
+
+
+def download_database(url: str, dest: str, sha256: str = None,
+                      retries: int = RETRIES, timeout: float = TIMEOUT) -> None:
+    """
+    Fetch `url` into `dest` via a resumable temp file, verify against `sha256`
+    (skipped only when it is None) and rename atomically.
+    Raises ValueError on checksum mismatch and the last network error if every attempt fails.
+    """
+    part = f"{dest}.part"
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+
+    for attempt in range(retries):
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+                if offset and resp.status != 206:
+                    offset = 0  # server ignored the Range header; start over
+                length = resp.headers.get("Content-Length")
+                expected = offset + int(length) if length is not None else None
+                with open(part, "ab" if offset else "wb") as f:
+                    for block in iter(lambda: resp.read(CHUNK_BYTES), b""):
+                        f.write(block)
+                    f.flush()
+                    os.fsync(f.fileno())
+            received = os.path.getsize(part)
+            if expected is not None and received < expected:
+                raise IncompleteRead(b"", expected - received)
+            break
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                break  # nothing left past our offset: the temp file is complete
+            if attempt == retries - 1:
+                raise
+        except (urllib.error.URLError, IncompleteRead, ConnectionError, TimeoutError):
+            if attempt == retries - 1:
+                raise
+        print(f"⚠️ Download interrupted, retrying ({attempt + 1}/{retries})...")
+        time.sleep(min(2 ** attempt, 30))
+
+    if sha256 is not None:
+        actual = _sha256(part)
+        if actual != sha256.lower():
+            os.remove(part)
+            raise ValueError(f"Checksum mismatch for {url}: expected {sha256}, got {actual}")
+    os.replace(part, dest)
+
+
+def ensure_database(path: str = DB_PATH, url: str = DB_URL, sha256: str = DB_SHA256,
+                    sha256_url: str = DB_SHA256_URL, allow_unverified: bool = ALLOW_UNVERIFIED) -> None:
+    """
+    Make sure the database exists, downloading it under an exclusive file lock.
+    Processes that lose the race wait on the lock and then find the file in place.
+    """
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(path):
+                return
+            digest = expected_digest(url, sha256, sha256_url, allow_unverified)
+            print("⬇️ Downloading riskradar.db...")
+            download_database(url, path, digest)
+            print("✅ Database downloaded.")
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+# === READINESS ===
+
+_state = {"status": "warming", "error": None}
+_thread = None
+
+def start_bootstrap(path: str = DB_PATH, url: str = DB_URL, sha256: str = DB_SHA256) -> None:
+    """
+    Run ensure_database in a background thread so the worker can boot now.
+    """
+    global _thread
+    if os.path.exists(path):
+        _state.update(status="ready", error=None)
+        return
+    if _thread is not None and _thread.is_alive():
+        return
+
+    def run():
+        try:
+            ensure_database(path, url, sha256)
+            _state.update(status="ready", error=None)
+        except Exception as e:
+            print(f"❌ Database bootstrap failed: {e}")
+            _state.update(status="failed", error=str(e))
+
+    _state.update(status="warming", error=None)
+    _thread = threading.Thread(target=run, name="db-bootstrap", daemon=True)
+    _thread.start()
+
+
+def readiness() -> dict:
+    return dict(_state)
+
+
+def is_ready() -> bool:
+    return _state["status"] == "ready"
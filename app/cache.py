@@ -0,0 +1,147 @@
+# app/cache.py
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, make_response, Response
+from app.database import data_version as database_version
+from app.metrics import registry
+from app.services.price_store import get_price_store
+
+# === CONFIGURATION ===
+# In-process LRU of rendered responses, bounded by total body size. Keys include
+# the data version, so any commit to the database (or a price store rebuild)
+# turns every older entry into a miss that ages out of the LRU. Views served
+# from files built outside the database add their own version (e.g. the file's
+# mtime) through cached_response(version=...).
+CACHE_MAX_BYTES = int(os.environ.get("RISKRADAR_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_CONTROL = "public, no-cache"  # always revalidate; ETags make that a 304
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU mapping cache keys to (body, mimetype, etag).
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry) -> None:
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0])
+            self.entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted[0])
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def _collect_cache_metrics():
+    stats = response_cache.stats()
+    return [
+        ("riskradar_cache_hits_total", "counter", "Response cache hits.", [({}, stats["hits"])]),
+        ("riskradar_cache_misses_total", "counter", "Response cache misses.", [({}, stats["misses"])]),
+        ("riskradar_cache_evictions_total", "counter", "Response cache LRU evictions.", [({}, stats["evictions"])]),
+        ("riskradar_cache_entries", "gauge", "Responses held in the cache.", [({}, stats["entries"])]),
+        ("riskradar_cache_bytes", "gauge", "Bytes held in the cache.", [({}, stats["bytes"])]),
+    ]
+
+
+registry.register_collector(_collect_cache_metrics)
+
+# === DATA VERSION ===
+
+def data_version() -> tuple:
+    """
+    Current data version: SQLite's PRAGMA data_version (changes whenever any
+    other connection commits) plus the price store build time.
+    """
+    store = get_price_store()
+    return database_version(), store.meta["built_at"] if store is not None else None
+
+# === DECORATOR ===
+
+def cached_response(view=None, *, version=None):
+    """
+    Cache successful responses of a read-only view and answer
+    If-None-Match revalidation with 304 Not Modified. `version`, when given,
+    is called per request and its result joins the key.
+    """
+    if view is None:
+        return lambda view: cached_response(view, version=version)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.get("profiler") is not None:
+            return view(*args, **kwargs)  # profile the real work, not a cache lookup
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            data_version(),
+            version() if version is not None else None,
+        )
+        entry = response_cache.get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = (body, response.mimetype, hashlib.sha256(body).hexdigest()[:32])
+            response_cache.put(key, entry)
+
+        body, mimetype, etag = entry
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        return response
+
+    return wrapper
@@ -1,20 +1,111 @@
 # app/database.py
 
 import os
-import urllib.request
-from sqlalchemy import create_engine
+import sqlite3
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+from app.metrics import CountingConnection, instrument_engine
 
+# === CONFIGURATION ===
+# Every API route, service and script goes through the engines below.
+# All knobs can be overridden with RISKRADAR_* environment variables.
+# The file itself is fetched by app/bootstrap.py; engines connect lazily.
+# Both engines report query timings and row counts to app/metrics.py.
 DB_FOLDER = os.path.join(os.path.dirname(__file__), "database")
 DB_FILE = "riskradar.db"
-DB_PATH = os.path.join(DB_FOLDER, DB_FILE)
+DB_PATH = os.environ.get("RISKRADAR_DB_PATH", os.path.join(DB_FOLDER, DB_FILE))
 DROPBOX_URL = "https://www.dropbox.com/scl/fi/x2bgjbm1804rkj5d2izxy/riskradar.db?rlkey=ee0vfjkaf6i0c9dczqurdzfuv&st=boccvoqy&dl=1"
 
-# Ensure database is downloaded
-if not os.path.exists(DB_PATH):
-    print("⬇️ Downloading riskradar.db from Dropbox...")
-    os.makedirs(DB_FOLDER, exist_ok=True)
-    urllib.request.urlretrieve(DROPBOX_URL, DB_PATH)
-    print("✅ Database downloaded.")
+READ_ONLY = os.environ.get("RISKRADAR_DB_READ_ONLY", "1") == "1"
+POOL_SIZE = int(os.environ.get("RISKRADAR_DB_POOL_SIZE", 8))
+MAX_OVERFLOW = int(os.environ.get("RISKRADAR_DB_MAX_OVERFLOW", 8))
+MMAP_SIZE = int(os.environ.get("RISKRADAR_DB_MMAP_SIZE", 1 << 30))           # bytes
+CACHE_SIZE_KB = int(os.environ.get("RISKRADAR_DB_CACHE_SIZE_KB", 64 * 1024))  # per connection
+BUSY_TIMEOUT_MS = int(os.environ.get("RISKRADAR_DB_BUSY_TIMEOUT_MS", 10_000))
+STATEMENT_CACHE = int(os.environ.get("RISKRADAR_DB_STATEMENT_CACHE", 256))    # prepared statements per connection
 
-# Create SQLAlchemy engine
-engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
\ No newline at end of file
+# === ENGINE FACTORIES ===
+
+def _apply_pragmas(dbapi_conn, writer: bool) -> None:
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    if writer:
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+    else:
+        cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+def create_reader_engine(path: str = DB_PATH, read_only: bool = READ_ONLY,
+                         pool_size: int = POOL_SIZE, max_overflow: int = MAX_OVERFLOW):
+    """
+    Pooled engine for serving reads. Connections open the file through a
+    read-only URI (when enabled) and are tuned once when created.
+    """
+    url = f"sqlite:///file:{path}?mode=ro&uri=true" if read_only else f"sqlite:///{path}"
+    eng = create_engine(
+        url,
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": BUSY_TIMEOUT_MS / 1000,
+            "cached_statements": STATEMENT_CACHE,
+            "factory": CountingConnection,
+        },
+    )
+    event.listen(eng, "connect", lambda conn, _: _apply_pragmas(conn, writer=False))
+    instrument_engine(eng)
+    return eng
+
+
+def create_writer_engine(path: str = DB_PATH):
+    """
+    Single-connection engine for ingest and maintenance jobs. Puts the
+    database in WAL mode so readers are never blocked by a writer.
+    Opens with mode=rw so a missing file is an error, never a new empty database.
+    """
+    eng = create_engine(
+        f"sqlite:///file:{path}?mode=rw&uri=true",
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": BUSY_TIMEOUT_MS / 1000,
+            "cached_statements": STATEMENT_CACHE,
+            "factory": CountingConnection,
+        },
+    )
+    event.listen(eng, "connect", lambda conn, _: _apply_pragmas(conn, writer=True))
+    instrument_engine(eng)
+    return eng
+
+# === SHARED ENGINES ===
+
+engine = create_reader_engine()         # serving / analysis reads
+writer_engine = create_writer_engine()  # the only path that writes
+
+# === DATA VERSION ===
+
+_version_conn = None
+_version_lock = threading.Lock()
+
+def data_version() -> int:
+    """
+    SQLite's PRAGMA data_version on a dedicated connection: it changes whenever
+    any other connection commits, so callers can skip revalidation until it does.
+    """
+    global _version_conn
+    with _version_lock:
+        if _version_conn is None:
+            _version_conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+        return _version_conn.execute("PRAGMA data_version").fetchone()[0]
@@ -0,0 +1,239 @@
+# app/metrics.py
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from sqlalchemy import event
+
+# === CONFIGURATION ===
+# Minimal in-process metrics registry rendered in the Prometheus text format
+# at /api/metrics. Request timings are recorded by hooks in create_app, SQL
+# timings and row counts by engine events plus a counting sqlite3 cursor, and
+# pandas work inside handlers by span(). Every gunicorn worker keeps its own
+# registry, so a scrape reports the worker that answered it.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# === REGISTRY ===
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.values = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, state in sorted(self.values.items()):
+                for bound, n in zip(self.buckets + ("+Inf",), state[:-2] + [state[-1]]):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {n}")
+                plain = _format_labels(self.labels, labels)
+                lines.append(f"{self.name}_sum{plain} {repr(state[-2])}")
+                lines.append(f"{self.name}_count{plain} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect) -> None:
+        """
+        `collect()` returns [(name, type, help, [(labels dict, value), ...]), ...] at scrape time.
+        """
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} "
+                                 f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "riskradar_http_request_duration_seconds", "Time to build a response, by route.",
+    ("endpoint", "method", "status")))
+SQL_SECONDS = registry.register(Histogram(
+    "riskradar_sql_query_duration_seconds", "SQL execution time, by statement kind and table.",
+    ("operation", "table")))
+SQL_ROWS = registry.register(Counter(
+    "riskradar_sql_rows_total", "Rows fetched (reads) or changed (writes), by statement kind and table.",
+    ("operation", "table")))
+COMPUTE_SECONDS = registry.register(Histogram(
+    "riskradar_compute_duration_seconds", "Time spent in named pandas/numpy sections.", ("span",)))
+
+# === SQL INSTRUMENTATION ===
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|INDEX\s+\w+\s+ON)\s+[\"`]?(\w+)", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def statement_labels(statement: str) -> tuple:
+    """
+    ('select', 'stock_data') style labels; bounded because statements are module constants.
+    """
+    words = statement.split(None, 1)
+    operation = words[0].lower() if words else ""
+    table = _TABLE.search(statement)
+    return operation, table.group(1) if table else ""
+
+
+class CountingCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor that adds fetched rows to SQL_ROWS under the labels of its last statement.
+    """
+    labels = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self.labels is not None:
+            SQL_ROWS.inc(self.labels)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if rows and self.labels is not None:
+            SQL_ROWS.inc(self.labels, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if rows and self.labels is not None:
+            SQL_ROWS.inc(self.labels, len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    """
+    Passed to sqlite3.connect(factory=...) so every cursor counts its rows.
+    """
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+
+def instrument_engine(eng) -> None:
+    """
+    Time every statement on `eng` and label its cursor for row counting.
+    """
+    @event.listens_for(eng, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(eng, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        labels = statement_labels(statement)
+        SQL_SECONDS.observe(labels, elapsed)
+        if labels[0] in ("insert", "update", "delete") and cursor.rowcount > 0:
+            SQL_ROWS.inc(labels, cursor.rowcount)
+        elif isinstance(cursor, CountingCursor):
+            cursor.labels = labels
+
+# === SPANS ===
+
+@contextmanager
+def span(name: str):
+    """
+    Record the duration of a block under riskradar_compute_duration_seconds{span=name}.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        COMPUTE_SECONDS.observe((name,), time.perf_counter() - start)
+
+# === PROCESS I/O ===
+
+def _read_bytes() -> int:
+    """
+    Bytes this process has read from storage (/proc/self/io), None where unavailable.
+    The API reads little besides the database and its derived stores.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("read_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _collect_process_io():
+    from app.database import DB_PATH
+
+    samples = []
+    read_bytes = _read_bytes()
+    if read_bytes is not None:
+        samples.append(("riskradar_db_read_bytes_total", "counter",
+                        "Bytes read from storage by this worker (database and derived stores).",
+                        [({}, read_bytes)]))
+    if os.path.exists(DB_PATH):
+        samples.append(("riskradar_db_size_bytes", "gauge", "Size of the SQLite database file.",
+                        [({}, os.path.getsize(DB_PATH))]))
+    return samples
+
+
+registry.register_collector(_collect_process_io)
@@ -0,0 +1,218 @@
+# app/profiling.py
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from app.database import DB_PATH
+
+# === CONFIGURATION ===
+# Two profiling surfaces:
+#   request profiling - with RISKRADAR_PROFILING=1, a request carrying
+#       `X-Profile: return|store` (or ?profile=return|store) runs under a
+#       sampling profiler. "return" replaces the body with collapsed stacks
+#       (flamegraph.pl / speedscope input); "store" keeps the normal response
+#       and writes the stacks under PROFILE_DIR. If RISKRADAR_PROFILE_TOKEN is
+#       set, the X-Profile-Token header must match it.
+#   stage profiling  - `--profile [REPORT]` on the maintenance scripts records
+#       wall time, CPU time and RSS deltas for every stage() block to JSON.
+PROFILING_ENABLED = os.environ.get("RISKRADAR_PROFILING", "0") == "1"
+PROFILE_TOKEN = os.environ.get("RISKRADAR_PROFILE_TOKEN")
+PROFILE_DIR = os.path.join(os.path.dirname(DB_PATH), "profiles")
+SAMPLE_INTERVAL = float(os.environ.get("RISKRADAR_PROFILE_INTERVAL", 0.001))  # seconds
+PROFILE_MODES = ("return", "store")
+
+# === REQUEST PROFILING ===
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack from a background thread.
+    Stacks are kept collapsed ("root;...;leaf" -> samples).
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self.started
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def requested_mode(request) -> str:
+    """
+    The requested profile mode, or None when profiling is off or not authorized.
+    """
+    if not PROFILING_ENABLED:
+        return None
+    mode = request.headers.get("X-Profile") or request.args.get("profile")
+    if mode == "1":
+        mode = "store"
+    if mode not in PROFILE_MODES:
+        return None
+    if PROFILE_TOKEN and request.headers.get("X-Profile-Token") != PROFILE_TOKEN:
+        return None
+    return mode
+
+
+def start_request_profile(request):
+    mode = requested_mode(request)
+    if mode is None:
+        return None
+    profiler = SamplingProfiler(threading.get_ident()).start()
+    profiler.mode = mode
+    return profiler
+
+
+def finish_request_profile(profiler, request, response):
+    """
+    Stop the profiler and return the collapsed stacks or store them next to the response.
+    """
+    profiler.stop()
+    headers = {
+        "X-Profile-Wall-Ms": f"{profiler.wall * 1000:.2f}",
+        "X-Profile-Samples": str(profiler.samples),
+    }
+    if profiler.mode == "return":
+        from flask import Response
+        return Response(profiler.collapsed(), mimetype="text/plain", headers=headers)
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}_{request.endpoint or 'unmatched'}.collapsed"
+    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+        f.write(profiler.collapsed())
+    response.headers.update(headers)
+    response.headers["X-Profile-File"] = name
+    return response
+
+# === STAGE PROFILING ===
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss_bytes() -> int:
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _cpu_seconds() -> float:
+    """
+    CPU time of this process and its finished children (e.g. volatility workers).
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class StageProfiler:
+    def __init__(self, name: str):
+        self.name = name
+        self.stages = []
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._wall0, self._cpu0 = time.perf_counter(), _cpu_seconds()
+
+    @contextmanager
+    def stage(self, name: str):
+        rss0, wall0, cpu0 = _rss_bytes(), time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            rss1 = _rss_bytes()
+            self.stages.append({
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall0, 4),
+                "cpu_s": round(_cpu_seconds() - cpu0, 4),
+                "rss_start_mb": round(rss0 / 1e6, 1) if rss0 is not None else None,
+                "rss_end_mb": round(rss1 / 1e6, 1) if rss1 is not None else None,
+                "rss_delta_mb": round((rss1 - rss0) / 1e6, 1) if rss0 is not None and rss1 is not None else None,
+                "peak_rss_mb": round(_peak_rss_bytes() / 1e6, 1),
+            })
+
+    def report(self) -> dict:
+        return {
+            "script": self.name,
+            "started": self.started,
+            "wall_s": round(time.perf_counter() - self._wall0, 4),
+            "cpu_s": round(_cpu_seconds() - self._cpu0, 4),
+            "peak_rss_mb": round(_peak_rss_bytes() / 1e6, 1),
+            "stages": self.stages,
+        }
+
+
+_active = None
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block under the active stage profiler; a no-op when none is running.
+    """
+    if _active is None:
+        yield
+    else:
+        with _active.stage(name):
+            yield
+
+
+@contextmanager
+def profile_run(name: str, report_path: str = None):
+    """
+    Activate stage profiling for a script run and write the report on exit.
+    With report_path None this does nothing.
+    """
+    global _active
+    if report_path is None:
+        yield None
+        return
+    _active = StageProfiler(name)
+    try:
+        yield _active
+    finally:
+        report = _active.report()
+        _active = None
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"⏱️  Profile written to {report_path} ({report['wall_s']:.2f}s wall, {report['cpu_s']:.2f}s CPU)")
+
+
+def add_profile_argument(parser, script: str) -> None:
+    parser.add_argument("--profile", nargs="?", const=f"{script}_profile.json", metavar="REPORT",
+                        help=f"write per-stage wall/CPU/memory to REPORT (default {script}_profile.json)")
@@ -0,0 +1,90 @@
+# app/services/batch_volatility.py
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from app.database import engine
+
+# === CONFIGURATION ===
+# Index constituent lists live in data_sources/ as single-column CSVs
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX_DIR = os.path.join(BASE_DIR, "data_sources")
+INDEX_FILES = {
+    "sp500": "sp500_tickers.csv",
+    "nasdaq100": "nasdaq100_tickers.csv",
+    "dow30": "dow30_tickers.csv",
+    "russell2000": "russell2000_tickers.csv",
+    "itot": "itot_tickers.csv",
+    "master": "master_tickers.csv",
+}
+
+# Each ticker's own last :bars rows: the correlated subquery finds the start
+# date with one index seek, then the join reads that range only
+BATCH_QUERY = text("""
+    SELECT s.ticker, s.date, s.close
+    FROM (SELECT DISTINCT value AS ticker FROM json_each(:tickers)) AS t
+    JOIN stock_data s
+      ON s.ticker = t.ticker
+     AND s.date >= COALESCE((
+            SELECT i.date FROM stock_data i
+            WHERE i.ticker = t.ticker
+            ORDER BY i.date DESC
+            LIMIT 1 OFFSET :offset
+         ), '')
+    ORDER BY s.ticker, s.date
+""")
+
+# === FUNCTIONS ===
+
+def load_index_tickers(name: str) -> list:
+    """
+    Return the tickers of a named index (sp500, russell2000, ...).
+    Raises KeyError for unknown index names.
+    """
+    path = os.path.join(INDEX_DIR, INDEX_FILES[name])
+    return pd.read_csv(path)["ticker"].dropna().astype(str).str.strip().unique().tolist()
+
+
+def fetch_closes(tickers: list, window: int, points: int) -> pd.DataFrame:
+    """
+    Fetch the last window + points + 1 closes of every ticker in one query,
+    as a long (ticker, date, close) frame ordered by ticker and date.
+    """
+    bars = window + points + 1
+    with engine.connect() as conn:
+        rows = conn.execute(BATCH_QUERY, {"tickers": json.dumps(tickers), "offset": bars - 1}).fetchall()
+    df = pd.DataFrame(rows, columns=["ticker", "date", "close"])
+    df["date"] = df["date"].astype(str).str[:10]
+    return df.drop_duplicates(subset=["ticker", "date"], keep="last")
+
+
+def compute_batch_volatility(closes: pd.DataFrame, window: int = 30, points: int = 30) -> pd.DataFrame:
+    """
+    Rolling volatility per ticker on its own bars, exactly as /volatility/<ticker>
+    computes it (close.pct_change().rolling(window).std()), pivoted onto the
+    shared date axis. Returns the last `points` dates x tickers.
+    """
+    if closes.empty:
+        return pd.DataFrame()
+    grouped = closes.groupby("ticker", sort=False)
+    returns = grouped["close"].pct_change()
+    vol = returns.groupby(closes["ticker"], sort=False).rolling(window, min_periods=window).std()
+    closes = closes.assign(volatility=vol.reset_index(level=0, drop=True))
+    matrix = closes.pivot(index="date", columns="ticker", values="volatility").sort_index()
+    return matrix.dropna(how="all").tail(points)
+
+
+def iter_volatility_records(vol: pd.DataFrame, digits: int = 8):
+    """
+    Yield one compact record per ticker aligned to the shared date axis;
+    missing values are None.
+    """
+    values = np.round(vol.to_numpy(dtype=np.float64), digits)
+    mask = np.isnan(values)
+    for j, ticker in enumerate(vol.columns):
+        col = values[:, j].tolist()
+        if mask[:, j].any():
+            col = [None if m else v for v, m in zip(col, mask[:, j])]
+        yield {"ticker": ticker, "volatility": col}
@@ -0,0 +1,104 @@
+# app/services/change_log.py
+
+import json
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import engine
+
+# === CONFIGURATION ===
+# stock_data_changes is an append-only log of writes to stock_data: one row per
+# (write batch, ticker) holding the earliest date the batch touched. Upserts
+# that correct existing bars change neither the row count nor the max date, so
+# derived data (price store, snapshots, volatility state) records the last seq
+# it has seen and compares that instead. Writers call record_changes() in the
+# same transaction as their rows.
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS stock_data_changes (
+        seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticker     TEXT    NOT NULL,
+        first_date TEXT    NOT NULL,
+        rows       INTEGER NOT NULL,
+        changed_at REAL    NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_changes_ticker_seq ON stock_data_changes (ticker, seq)",
+]
+
+# === WRITE ===
+
+def ensure_change_log(conn) -> None:
+    for ddl in SCHEMA:
+        conn.execute(text(ddl))
+
+
+def record_changes(conn, first_dates: dict, rows: dict = None) -> None:
+    """
+    Log one change per ticker: {ticker: earliest date written}.
+    `conn` is the writer connection holding the rows' transaction.
+    """
+    if not first_dates:
+        return
+    now = time.time()
+    rows = rows or {}
+    conn.execute(text("""
+        INSERT INTO stock_data_changes (ticker, first_date, rows, changed_at)
+        VALUES (:ticker, :first_date, :rows, :changed_at)
+    """), [
+        {"ticker": t, "first_date": str(d)[:10], "rows": int(rows.get(t, 0)), "changed_at": now}
+        for t, d in first_dates.items()
+    ])
+
+# === READ ===
+
+def source_stamp() -> list:
+    """
+    [max rowid, last change seq] of stock_data. Appends move the first,
+    logged corrections the second; both are index seeks.
+    """
+    with engine.connect() as conn:
+        max_rowid = conn.execute(text("SELECT MAX(rowid) FROM stock_data")).scalar() or 0
+        try:
+            seq = conn.execute(text("SELECT MAX(seq) FROM stock_data_changes")).scalar() or 0
+        except OperationalError:
+            seq = 0  # no writer has logged a change yet
+    return [int(max_rowid), int(seq)]
+
+
+def ticker_seqs(conn, tickers: list = None) -> dict:
+    """
+    {ticker: last change seq} for logged tickers (all of them when tickers is None).
+    """
+    try:
+        if tickers is None:
+            rows = conn.execute(text("SELECT ticker, MAX(seq) FROM stock_data_changes GROUP BY ticker"))
+        else:
+            rows = conn.execute(text("""
+                SELECT c.ticker, MAX(c.seq)
+                FROM json_each(:tickers) AS t
+                JOIN stock_data_changes c ON c.ticker = t.value
+                GROUP BY c.ticker
+            """), {"tickers": json.dumps(tickers)})
+        return {t: seq for t, seq in rows}
+    except OperationalError:
+        return {}
+
+
+def changed_since(conn, seen: dict) -> dict:
+    """
+    {ticker: earliest date changed after seq} for each {ticker: seq} in `seen`.
+    Tickers without later changes are left out.
+    """
+    if not seen:
+        return {}
+    try:
+        rows = conn.execute(text("""
+            SELECT c.ticker, MIN(c.first_date)
+            FROM json_each(:seen) AS s
+            JOIN stock_data_changes c ON c.ticker = s.key AND c.seq > s.value
+            GROUP BY c.ticker
+        """), {"seen": json.dumps(seen)})
+        return {t: d for t, d in rows}
+    except OperationalError:
+        return {}
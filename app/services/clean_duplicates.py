@@ -1,15 +1,11 @@
 # app/services/clean_duplicates.py
 
-import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.database import writer_engine as engine
+from app.profiling import stage
 
 # === CONFIGURATION ===
-# Dynamically locate the SQLite database
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DATABASE_URL = f"sqlite:///{BASE_DIR}/app/database/riskradar.db"
-
-# Create the SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=False)
+# Maintenance writes go through the shared single-writer engine (WAL mode)
 
 
 def clean_duplicates():
@@ -19,7 +15,7 @@ def clean_duplicates():
     3. Create a unique index on (ticker, date) to prevent future duplicates.
     """
     # 1️⃣ Delete duplicates in a single transaction
-    with engine.begin() as conn:
+    with stage("delete_duplicates"), engine.begin() as conn:
         result = conn.execute(text("""
             DELETE FROM stock_data
             WHERE rowid NOT IN (
@@ -33,16 +29,36 @@ def clean_duplicates():
     # 2️⃣ VACUUM and 3️⃣ create unique index
     # VACUUM must run outside of an active transaction
     with engine.connect() as conn:
-        conn.execute(text("VACUUM;"))
+        with stage("vacuum"):
+            conn.execute(text("VACUUM;"))
         print("🧹  Database vacuumed.")
-        conn.execute(text("""
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_ticker_date
-            ON stock_data (ticker, date);
-        """))
+        with stage("create_unique_index"):
+            conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_ticker_date
+                ON stock_data (ticker, date);
+            """))
         print("🔧  Created unique index on (ticker, date).")
 
 
 if __name__ == "__main__":
-    print("🔍  Starting duplicate cleanup and optimization...")
-    clean_duplicates()
-    print("✅  Cleanup complete.")
\ No newline at end of file
+    import argparse
+    from app.profiling import add_profile_argument, profile_run
+
+    parser = argparse.ArgumentParser(description="Remove duplicate (ticker, date) rows.")
+    parser.add_argument("--online", action="store_true",
+                        help="batched, resumable cleanup that runs alongside live traffic "
+                             "(see app/services/online_maintenance.py for its options)")
+    add_profile_argument(parser, "clean_duplicates")
+    args = parser.parse_args()
+
+    with profile_run("clean_duplicates", args.profile):
+        if args.online:
+            from app.services.online_maintenance import run_online_maintenance
+            print("🔍  Starting online duplicate cleanup...")
+            with stage("run_online_maintenance"):
+                state = run_online_maintenance()
+            print(f"✅  Removed {state['deleted']} duplicate rows.")
+        else:
+            print("🔍  Starting duplicate cleanup and optimization...")
+            clean_duplicates()
+            print("✅  Cleanup complete.")
\ No newline at end of file
@@ -0,0 +1,281 @@
+# app/services/covariance.py
+
+import os
+import json
+import glob
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from app.database import engine, DB_PATH
+from app.services.change_log import source_stamp
+
+# === CONFIGURATION ===
+# Rolling covariance / correlation of daily returns (close over the ticker's
+# previous row, identical to compute_daily_returns) over the whole universe.
+# Pairs are computed on their jointly observed days in BLOCK x BLOCK tiles so
+# every tile's working set stays in cache. Matrices are precomputed by the CLI
+# below (a scheduled job) into .npy files, one per trading day, and requests
+# only memory-map them, so serving a submatrix reads only its rows.
+COV_DIR = os.path.join(os.path.dirname(DB_PATH), "covariance")
+BLOCK = 256
+MIN_OBS_FRACTION = 0.5  # pairs with fewer joint observations than this share of the window are NaN
+
+TICKERS_QUERY = text("SELECT DISTINCT ticker FROM stock_data")
+
+# Each ticker's last :bars rows before :end: one index seek for the start date,
+# then a range read. The window's trading days are always among those rows.
+WINDOW_QUERY = text("""
+    SELECT s.ticker, s.date, s.close
+    FROM json_each(:tickers) AS t
+    JOIN stock_data s
+      ON s.ticker = t.value
+     AND s.date < :end
+     AND s.date >= COALESCE((
+            SELECT i.date FROM stock_data i
+            WHERE i.ticker = t.value AND i.date < :end
+            ORDER BY i.date DESC
+            LIMIT 1 OFFSET :offset
+         ), '')
+    ORDER BY s.ticker, s.date
+""")
+
+# === COMPUTE ===
+
+def pairwise_covariance(x: np.ndarray, min_periods: int = 2, block: int = BLOCK) -> np.ndarray:
+    """
+    Sample covariance (ddof=1) of the columns of x using, for each pair, only
+    the rows where both are present. Matches DataFrame.cov(min_periods=...).
+    """
+    present = ~np.isnan(x)
+    m = present.astype(np.float64)
+    z = np.where(present, x, 0.0)
+    n_cols = x.shape[1]
+    cov = np.empty((n_cols, n_cols))
+
+    for i0 in range(0, n_cols, block):
+        i1 = min(i0 + block, n_cols)
+        zi, mi = z[:, i0:i1], m[:, i0:i1]
+        for j0 in range(i0, n_cols, block):
+            j1 = min(j0 + block, n_cols)
+            zj, mj = z[:, j0:j1], m[:, j0:j1]
+            n = mi.T @ mj                    # joint observations
+            sum_i = zi.T @ mj                # sum of i over rows where j is present
+            sum_j = mi.T @ zj                # sum of j over rows where i is present
+            cross = zi.T @ zj
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tile = (cross - sum_i * sum_j / n) / (n - 1)
+            tile[n < max(min_periods, 2)] = np.nan
+            cov[i0:i1, j0:j1] = tile
+            cov[j0:j1, i0:i1] = tile.T
+    return cov
+
+
+def ledoit_wolf_intensity(x: np.ndarray) -> tuple:
+    """
+    Ledoit-Wolf (2004) shrinkage toward mu * I for the columns of x.
+    Missing values are treated as zero deviations from the column mean.
+    Returns (delta, mu).
+    """
+    present = ~np.isnan(x)
+    counts = present.sum(axis=0)
+    keep = counts > 0
+    if not keep.any():
+        return 0.0, 0.0
+    means = np.where(keep, np.nansum(x, axis=0) / np.maximum(counts, 1), 0.0)
+    d = np.where(present, x - means, 0.0)[:, keep]
+    t, p = d.shape
+
+    s = d.T @ d / t
+    mu = np.trace(s) / p
+    d2 = (np.sum(s * s) - 2 * mu * np.trace(s) + mu * mu * p) / p
+    # sum_k ||x_k x_k' - S||^2 = sum_k ||x_k||^4 - t ||S||^2
+    b2 = (np.sum(np.sum(d * d, axis=1) ** 2) - t * np.sum(s * s)) / (t * t * p)
+    if d2 <= 0:
+        return 0.0, mu
+    return float(min(b2, d2) / d2), float(mu)
+
+
+def shrink(cov: np.ndarray, delta: float, mu: float) -> np.ndarray:
+    out = (1 - delta) * cov
+    out[np.diag_indices_from(out)] += delta * mu
+    return out
+
+
+def correlation_from_cov(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    corr[np.diag_indices_from(corr)] = np.where(np.isnan(std), np.nan, 1.0)
+    return corr
+
+# === PRECOMPUTE ===
+
+def fetch_window_returns(date: str = None, window: int = 60, days: int = 1) -> tuple:
+    """
+    Daily returns for the last `window` + `days` - 1 trading days on or before
+    `date` (latest when None), reading only each ticker's last rows.
+    Returns (dates, tickers, returns matrix) with NaN where a ticker has no row.
+    """
+    end = "9999" if date is None else str(np.datetime64(str(date)[:10], "D") + 1)
+    with engine.connect() as conn:
+        tickers = sorted(t for (t,) in conn.execute(TICKERS_QUERY))
+        rows = conn.execute(WINDOW_QUERY, {"tickers": json.dumps(tickers), "end": end,
+                                           "offset": window + days - 1}).fetchall()
+    df = pd.DataFrame(rows, columns=["ticker", "date", "close"])
+    df["date"] = df["date"].astype(str).str[:10]
+    df = df.drop_duplicates(subset=["ticker", "date"], keep="last")
+    df["returns"] = df.groupby("ticker")["close"].pct_change()
+    dates = np.sort(df["date"].unique())[-(window + days - 1):]
+    matrix = (df[df["date"].isin(dates)]
+              .pivot(index="date", columns="ticker", values="returns")
+              .reindex(index=dates, columns=tickers))
+    return [str(d) for d in dates], np.array(tickers), matrix.to_numpy(dtype=np.float64)
+
+
+def _paths(date: str, window: int, shrinkage: bool, cov_dir: str) -> tuple:
+    base = os.path.join(cov_dir, f"cov_{date}_w{window}{'_lw' if shrinkage else ''}")
+    return f"{base}.npy", f"{base}.json"
+
+
+def build_covariance(date: str = None, window: int = 60, shrinkage: bool = False,
+                     days: int = 1, cov_dir: str = COV_DIR) -> list:
+    """
+    Compute and store the matrices for the last `days` trading days on or
+    before `date` (latest when None). Returns the stored dates.
+    """
+    stamp = source_stamp()
+    dates, tickers, returns = fetch_window_returns(date, window, days)
+    os.makedirs(cov_dir, exist_ok=True)
+    built = []
+    for end in range(max(len(dates) - days, 0), len(dates)):
+        x = returns[max(0, end - window + 1):end + 1]
+        cov = pairwise_covariance(x, min_periods=max(2, int(np.ceil(window * MIN_OBS_FRACTION))))
+        delta = 0.0
+        if shrinkage:
+            delta, mu = ledoit_wolf_intensity(x)
+            cov = shrink(cov, delta, mu)
+        matrix_path, meta_path = _paths(dates[end], window, shrinkage, cov_dir)
+        np.save(f"{matrix_path}.tmp.npy", cov)
+        os.replace(f"{matrix_path}.tmp.npy", matrix_path)
+        meta = {"date": dates[end], "window": window, "tickers": tickers.tolist(),
+                "shrinkage": delta, "source": stamp}
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        built.append(dates[end])
+    return built
+
+
+def drop_covariance(since: str, cov_dir: str = COV_DIR) -> int:
+    """
+    Delete stored matrices dated on or after `since`, whose windows saw
+    changed rows. Returns the number of matrices removed.
+    """
+    removed = 0
+    for meta_path in glob.glob(os.path.join(cov_dir, "cov_*.json")):
+        if os.path.basename(meta_path)[len("cov_"):len("cov_") + 10] >= str(since)[:10]:
+            for path in (f"{meta_path[:-len('.json')]}.npy", meta_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            removed += 1
+    return removed
+
+# === READ ===
+
+def stored_dates(window: int = 60, shrinkage: bool = False, cov_dir: str = COV_DIR) -> list:
+    """
+    Sorted trading days with a precomputed matrix for (window, shrinkage).
+    """
+    suffix = f"_w{window}{'_lw' if shrinkage else ''}.json"
+    names = (os.path.basename(p) for p in glob.glob(os.path.join(cov_dir, f"cov_*{suffix}")))
+    return sorted(n[len("cov_"):-len(suffix)] for n in names)
+
+
+def _served_date(date: str, window: int, shrinkage: bool, cov_dir: str):
+    dates = stored_dates(window, shrinkage, cov_dir)
+    if date is not None:
+        dates = [d for d in dates if d <= str(date)[:10]]
+    return dates[-1] if dates else None
+
+
+def get_covariance(date: str = None, window: int = 60, shrinkage: bool = False,
+                   cov_dir: str = COV_DIR) -> tuple:
+    """
+    Latest precomputed covariance on or before `date` (latest when None).
+    Returns (matrix (memory-mapped), meta) or (None, None) when none is stored.
+    meta holds "date", "window", "tickers" and "shrinkage" (delta applied).
+    Never computes: matrices come from build_covariance.
+    """
+    served = _served_date(date, window, shrinkage, cov_dir)
+    if served is None:
+        return None, None
+    matrix_path, meta_path = _paths(served, window, shrinkage, cov_dir)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return np.load(matrix_path, mmap_mode="r"), meta
+    except FileNotFoundError:
+        return None, None  # removed by a concurrent rebuild
+
+
+def stored_version(date: str = None, window: int = 60, shrinkage: bool = False,
+                   cov_dir: str = COV_DIR):
+    """
+    (date, mtime) of the matrix get_covariance would serve, None when none is stored.
+    Changes whenever a build adds a later date or rewrites the served one.
+    """
+    served = _served_date(date, window, shrinkage, cov_dir)
+    if served is None:
+        return None
+    try:
+        return served, os.stat(_paths(served, window, shrinkage, cov_dir)[1]).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def submatrix(tickers: list, date: str = None, window: int = 60, kind: str = "cov",
+              shrinkage: bool = False) -> dict:
+    """
+    Covariance ("cov") or correlation ("corr") between the requested tickers.
+    Returns None when no matrix is precomputed on or before `date`.
+    """
+    matrix, meta = get_covariance(date, window, shrinkage)
+    if matrix is None:
+        return None
+    index = {t: i for i, t in enumerate(meta["tickers"])}
+    found = [t for t in tickers if t in index]
+    idx = np.array([index[t] for t in found], dtype=np.intp)
+    sub = np.asarray(matrix[np.ix_(idx, idx)])
+    if kind == "corr":
+        sub = correlation_from_cov(sub)
+    return {
+        "date": meta["date"],
+        "window": meta["window"],
+        "kind": kind,
+        "shrinkage": meta["shrinkage"],
+        "tickers": found,
+        "missing": [t for t in tickers if t not in index],
+        "matrix": [[None if np.isnan(v) else float(v) for v in row] for row in sub],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute universe covariance matrices.")
+    parser.add_argument("--date", help="YYYY-MM-DD (default: latest)")
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--days", type=int, default=1, help="trading days to build, ending at --date")
+    parser.add_argument("--shrinkage", action="store_true", help="apply Ledoit-Wolf shrinkage")
+    args = parser.parse_args()
+
+    start = time.time()
+    built = build_covariance(args.date, args.window, args.shrinkage, args.days)
+    if not built:
+        print("❌ No trading data on or before that date.")
+    else:
+        print(f"✅ Stored {len(built)} covariance matrices ({built[0]} .. {built[-1]}, "
+              f"window={args.window}) in {time.time() - start:.1f}s.")
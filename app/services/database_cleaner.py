@@ -1,14 +1,10 @@
 # app/services/database_cleaner.py
 
-import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.database import writer_engine as engine
 
 # ——— CONFIGURATION ———
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DATABASE_URL = f"sqlite:///{BASE_DIR}/app/database/riskradar.db"
-
-# Create engine
-engine = create_engine(DATABASE_URL, echo=False)
+# Maintenance writes go through the shared single-writer engine (WAL mode)
 
 def find_duplicate_keys():
     """
@@ -52,12 +48,23 @@ def vacuum_and_index():
         print("🛠  Vacuumed database and created unique index on (ticker, date).")
 
 if __name__ == "__main__":
-    print("🔍  Checking for duplicate (ticker, date) entries…")
-    dupes = find_duplicate_keys()
-    if not dupes:
-        print("✅  No duplicates found.")
-    else:
-        print(f"⚠️  Found {len(dupes)} duplicate key(s). Cleaning up…")
-        remove_duplicates()
-        vacuum_and_index()
-        print("✅  Cleanup complete.")
\ No newline at end of file
+    import argparse
+    from app.profiling import add_profile_argument, profile_run, stage
+
+    parser = argparse.ArgumentParser(description="Find and remove duplicate (ticker, date) rows.")
+    add_profile_argument(parser, "database_cleaner")
+    args = parser.parse_args()
+
+    with profile_run("database_cleaner", args.profile):
+        print("🔍  Checking for duplicate (ticker, date) entries…")
+        with stage("find_duplicate_keys"):
+            dupes = find_duplicate_keys()
+        if not dupes:
+            print("✅  No duplicates found.")
+        else:
+            print(f"⚠️  Found {len(dupes)} duplicate key(s). Cleaning up…")
+            with stage("remove_duplicates"):
+                remove_duplicates()
+            with stage("vacuum_and_index"):
+                vacuum_and_index()
+            print("✅  Cleanup complete.")
\ No newline at end of file
@@ -4,16 +4,22 @@ import os
 import json
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine
+from sqlalchemy import text, bindparam
 from sqlalchemy.orm import sessionmaker
+from app.database import engine
+from app.services.payloads import publish
+from app.services.volatility_estimators import ESTIMATORS, estimate_frame
 
 # === CONFIGURATION ===
-# Dynamically locate the SQLite database file
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DATABASE_URL = f"sqlite:///{BASE_DIR}/app/database/riskradar.db"
 
-# Create engine and session factory
-engine = create_engine(DATABASE_URL, echo=False)
+# Streaming mode: tickers per chunk and compact per-column dtypes
+STREAM_CHUNK_TICKERS = 200
+STREAM_COLUMNS = ['ticker', 'date', 'close', 'volume', 'open', 'high', 'low']
+NUMERIC_COLUMNS = ['close', 'volume', 'open', 'high', 'low']
+PRICE_DTYPE = np.float32
+
+# Session factory on the shared read engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # === FUNCTIONS ===
@@ -120,6 +126,15 @@ def compute_rolling_volatility(df: pd.DataFrame, window: int = 30) -> pd.DataFra
     return vol[['ticker', 'date', 'volatility']]
 
 
+def compute_estimator_volatility(df: pd.DataFrame, window: int = 30, estimator: str = 'close') -> pd.DataFrame:
+    """
+    Rolling volatility per ticker from an OHLC estimator (see volatility_estimators).
+    Returns DataFrame with columns: ticker, date, volatility.
+    """
+    est = estimate_frame(df, window=window, estimators=(estimator,))
+    return est.rename(columns={estimator: 'volatility'})[['ticker', 'date', 'volatility']]
+
+
 def check_volatility_summary(vol_df: pd.DataFrame, latest_date: pd.Timestamp) -> None:
     """
     Print top and bottom tickers by latest volatility.
@@ -154,6 +169,7 @@ def export_to_json(df: pd.DataFrame, filepath: str) -> None:
     """
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     df.to_json(filepath, orient='records', date_format='iso')
+    publish(filepath)
     print(f"✅ Exported data to {filepath}")
 
 
@@ -185,32 +201,295 @@ def check_duplicate_ticker_dates(df: pd.DataFrame) -> None:
         print(f"⚠️  Found {len(groups)} combos with duplicates (total rows: {total}).")
         print(groups.head(10).to_string(index=False))
 
+# === STREAMING MODE ===
+# The functions above need the whole table in memory. The streaming run reads
+# one chunk of tickers at a time and folds each into mergeable partial
+# aggregates, so peak memory tracks the chunk size instead of the table size.
+
+CHUNK_QUERY = text("""
+    SELECT ticker, date, close, volume, open, high, low
+    FROM stock_data
+    WHERE ticker IN :tickers
+    ORDER BY ticker, date
+""").bindparams(bindparam("tickers", expanding=True))
+
+
+def to_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Categorical ticker, int32 day-number dates, float32 prices.
+    """
+    df['ticker'] = df['ticker'].astype('category')
+    df['date'] = (
+        pd.to_datetime(df['date'].astype(str).str[:10]).values
+        .astype('datetime64[D]').astype(np.int32)
+    )
+    for col in ['open', 'high', 'low', 'close']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(PRICE_DTYPE)
+    df['volume'] = pd.to_numeric(df['volume'], errors='coerce').astype(np.float64)
+    return df
+
+
+def iter_ticker_chunks(chunk_tickers: int = STREAM_CHUNK_TICKERS):
+    """
+    Yield (missing_counts, compact_df) per chunk of tickers.
+    Missing values are counted before dtype conversion.
+    """
+    with engine.connect() as conn:
+        tickers = [row[0] for row in conn.execute(text("SELECT DISTINCT ticker FROM stock_data ORDER BY ticker"))]
+    for i in range(0, len(tickers), chunk_tickers):
+        with engine.connect() as conn:
+            rows = conn.execute(CHUNK_QUERY, {"tickers": tickers[i:i + chunk_tickers]}).fetchall()
+        df = pd.DataFrame(rows, columns=STREAM_COLUMNS)
+        missing = df.isnull().sum()
+        yield missing, to_compact(df)
+
+
+class ExplorerStats:
+    """
+    Mergeable partial aggregates for the data health checks. Chunks never
+    split a ticker, so per-ticker and per-(ticker, date) counts combine by
+    addition and numeric moments combine with Chan's parallel formula.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.missing = pd.Series(0, index=STREAM_COLUMNS, dtype=np.int64)
+        self.records_per_ticker = pd.Series(dtype=np.int64)
+        self.tickers_per_date = pd.Series(dtype=np.int64)  # index: int32 day number
+        self.moments = {}  # column -> (n, mean, m2, min, max)
+        self.dup_combos = 0
+        self.dup_rows = 0
+        self.dup_sample = pd.DataFrame(columns=['ticker', 'date', 'count'])
+
+    @classmethod
+    def from_chunk(cls, missing: pd.Series, df: pd.DataFrame) -> "ExplorerStats":
+        part = cls()
+        part.rows = len(df)
+        part.missing = missing.reindex(STREAM_COLUMNS, fill_value=0).astype(np.int64)
+        part.records_per_ticker = df['ticker'].value_counts().astype(np.int64)
+        part.records_per_ticker = part.records_per_ticker[part.records_per_ticker > 0]
+
+        unique_pairs = df.drop_duplicates(subset=['ticker', 'date'])
+        part.tickers_per_date = unique_pairs['date'].value_counts().astype(np.int64)
+
+        for col in NUMERIC_COLUMNS:
+            values = df[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if len(values):
+                part.moments[col] = (
+                    len(values), values.mean(), ((values - values.mean()) ** 2).sum(),
+                    values.min(), values.max(),
+                )
+
+        dup = df.duplicated(subset=['ticker', 'date'], keep=False)
+        if dup.any():
+            groups = df[dup].groupby(['ticker', 'date'], observed=True).size().reset_index(name='count')
+            part.dup_combos = len(groups)
+            part.dup_rows = int(dup.sum())
+            part.dup_sample = groups.head(10)
+        return part
+
+    def merge(self, other: "ExplorerStats") -> "ExplorerStats":
+        self.rows += other.rows
+        self.missing = self.missing.add(other.missing, fill_value=0).astype(np.int64)
+        self.records_per_ticker = pd.concat([self.records_per_ticker, other.records_per_ticker])
+        self.tickers_per_date = self.tickers_per_date.add(other.tickers_per_date, fill_value=0).astype(np.int64)
+        for col, (n_b, mean_b, m2_b, min_b, max_b) in other.moments.items():
+            if col not in self.moments:
+                self.moments[col] = (n_b, mean_b, m2_b, min_b, max_b)
+                continue
+            n_a, mean_a, m2_a, min_a, max_a = self.moments[col]
+            n = n_a + n_b
+            delta = mean_b - mean_a
+            self.moments[col] = (
+                n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n,
+                min(min_a, min_b), max(max_a, max_b),
+            )
+        self.dup_combos += other.dup_combos
+        self.dup_rows += other.dup_rows
+        if len(self.dup_sample) < 10 and len(other.dup_sample):
+            self.dup_sample = pd.concat([self.dup_sample, other.dup_sample]).head(10)
+        return self
+
+
+def report_stats(stats: ExplorerStats) -> pd.DataFrame:
+    """
+    Print the same health report as the in-memory checks from merged aggregates.
+    Returns the reliability DataFrame.
+    """
+    dates = pd.to_datetime(stats.tickers_per_date.index.to_numpy().astype('datetime64[D]'))
+    counts = pd.Series(stats.tickers_per_date.to_numpy(), index=dates).sort_index()
+
+    print("\n🗓️ === Coverage Summary ===")
+    print(f"Distinct tickers: {len(stats.records_per_ticker)}")
+    print(f"Distinct dates : {counts.size}")
+    if counts.size:
+        print(f"Date range     : {counts.index.min().date()} to {counts.index.max().date()}")
+
+    print("\n🗓️ === Records per Date ===")
+    print(f"Distinct dates          : {counts.size}")
+    print(f"Average tickers per date: {counts.mean():.1f}")
+    print(f"Min tickers in a date   : {counts.min()}")
+    print(f"Max tickers in a date   : {counts.max()}")
+    missing_dates = counts[counts < counts.max()]
+    if not missing_dates.empty:
+        print(f"\n⚠️  Dates with fewer than {counts.max()} tickers (sample 10):")
+        print(missing_dates.head(10).to_string())
+    else:
+        print("All dates have full coverage of tickers.")
+
+    print("\n📊 === Summary Statistics ===")
+    summary = pd.DataFrame({
+        col: {
+            'count': n, 'mean': mean, 'std': np.sqrt(m2 / (n - 1)) if n > 1 else np.nan,
+            'min': lo, 'max': hi,
+        }
+        for col, (n, mean, m2, lo, hi) in stats.moments.items()
+    })
+    print(summary)
+
+    print("\n🔎 === Missing Data ===")
+    if stats.missing.any():
+        print(stats.missing[stats.missing > 0])
+    else:
+        print("No missing values found.")
+
+    print("\n📈 === Records per Ticker ===")
+    per_ticker = stats.records_per_ticker.sort_values(ascending=False)
+    print(per_ticker)
+    print(f"\n🔢 Average records per ticker: {per_ticker.mean():.1f}")
+    print(f"📉 Minimum records for a ticker: {per_ticker.min()}")
+    print(f"📈 Maximum records for a ticker: {per_ticker.max()}")
+
+    rel = (per_ticker / per_ticker.max()).rename('reliability')
+    reliability_df = pd.concat([per_ticker.rename('records'), rel], axis=1)
+    print("\n⭐ === Reliability Scores (Top/Bottom 5) ===")
+    print(reliability_df.sort_values('reliability', ascending=False).head(5).to_string())
+    print(reliability_df.sort_values('reliability', ascending=True).head(5).to_string())
+
+    print("\n🔍 === Duplicate Ticker/Date ===")
+    if not stats.dup_combos:
+        print("✅ No duplicate ticker/date combinations found.")
+    else:
+        print(f"⚠️  Found {stats.dup_combos} combos with duplicates (total rows: {stats.dup_rows}).")
+        sample = stats.dup_sample.copy()
+        sample['date'] = sample['date'].to_numpy().astype('datetime64[D]')
+        print(sample.to_string(index=False))
+    return reliability_df
+
+
+def run_streaming(window: int = 30, chunk_tickers: int = STREAM_CHUNK_TICKERS) -> None:
+    """
+    One pass over the table in ticker chunks: health statistics, volatility
+    export (written to volatility.json incrementally) and latest-date weights.
+    """
+    data_dir = os.path.join(BASE_DIR, 'app', 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    vol_path = os.path.join(data_dir, 'volatility.json')
+
+    stats = ExplorerStats()
+    latest_rows = []
+    first = True
+    with open(vol_path, 'w') as out:
+        out.write('[')
+        for missing, df in iter_ticker_chunks(chunk_tickers):
+            stats.merge(ExplorerStats.from_chunk(missing, df))
+
+            prices = pd.DataFrame({
+                'ticker': df['ticker'].astype(str),
+                'date': pd.to_datetime(df['date'].to_numpy().astype('datetime64[D]')),
+                'close': df['close'].astype(np.float64),
+            })
+            vol_df = compute_rolling_volatility(compute_daily_returns(prices), window=window)
+            if not vol_df.empty:
+                records = vol_df.to_json(orient='records', date_format='iso')[1:-1]
+                out.write(records if first else ',' + records)
+                first = False
+                latest_rows.append(vol_df.dropna(subset=['volatility']).groupby('ticker').tail(1))
+        out.write(']')
+    publish(vol_path)
+    print(f"✅ Exported data to {vol_path}")
+
+    report_stats(stats)
+
+    if latest_rows:
+        latest_df = pd.concat(latest_rows, ignore_index=True)
+        latest = latest_df['date'].max()
+        check_volatility_summary(latest_df, latest)
+        weights_df = compute_volatility_weights(latest_df, latest)
+        export_to_json(weights_df, os.path.join(data_dir, f'weights_{latest.date()}.json'))
+
+    # Snapshots refresh in their own ticker chunks, touching only stale tickers
+    from app.services.snapshots import refresh_snapshots
+    refresh_snapshots(window)
+    print("✅ Refreshed volatility and weights snapshots.")
+
 # === MAIN EXECUTION ===
 if __name__ == '__main__':
-    print("✅ Connected to RiskRadar Database!\n")
+    import argparse
+    from app.profiling import add_profile_argument, profile_run, stage
+
+    parser = argparse.ArgumentParser(description="Explore stock_data and export volatility.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="process the table in ticker chunks with bounded memory")
+    parser.add_argument("--chunk-tickers", type=int, default=STREAM_CHUNK_TICKERS)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="compute volatility across this many processes")
+    parser.add_argument("--estimator", choices=ESTIMATORS, default="close",
+                        help="volatility estimator for the full run")
+    add_profile_argument(parser, "database_explorer")
+    args = parser.parse_args()
+    if args.streaming and args.estimator != "close":
+        parser.error("--estimator is only supported without --streaming")
 
-    # Load and prep data
-    df_raw = get_all_data()
-
-    # Data health checks
-    check_coverage_summary(df_raw)
-    check_records_per_date(df_raw)
-    get_summary_statistics(df_raw)
-    check_missing_data(df_raw)
-    check_records_per_ticker(df_raw)
-    check_reliability_scores(df_raw)
-    check_duplicate_ticker_dates(df_raw)
-
-    # Volatility analysis
-    df_ret = compute_daily_returns(df_raw)
-    vol_df = compute_rolling_volatility(df_ret, window=30)
-    latest = vol_df['date'].max()
-    check_volatility_summary(vol_df, latest)
-    weights_df = compute_volatility_weights(vol_df, latest)
-
-    # Export data for JS visualizations
-    data_dir = os.path.join(BASE_DIR, 'app', 'data')
-    export_to_json(vol_df, os.path.join(data_dir, 'volatility.json'))
-    export_to_json(weights_df, os.path.join(data_dir, f'weights_{latest.date()}.json'))
+    print("✅ Connected to RiskRadar Database!\n")
 
-    print("\n🏁 ✅ Database exploration and export completed.")
\ No newline at end of file
+    with profile_run("database_explorer", args.profile):
+        if args.streaming:
+            with stage("run_streaming"):
+                run_streaming(window=30, chunk_tickers=args.chunk_tickers)
+        else:
+            # Load and prep data
+            with stage("get_all_data"):
+                df_raw = get_all_data()
+
+            # Data health checks
+            for check in (check_coverage_summary, check_records_per_date, get_summary_statistics,
+                          check_missing_data, check_records_per_ticker, check_reliability_scores,
+                          check_duplicate_ticker_dates):
+                with stage(check.__name__):
+                    check(df_raw)
+
+            # Volatility analysis
+            with stage("volatility"):
+                if args.estimator != 'close':
+                    vol_df = compute_estimator_volatility(df_raw, window=30, estimator=args.estimator)
+                elif args.workers > 1:
+                    from app.services.parallel_volatility import compute_rolling_volatility_parallel
+                    vol_df = compute_rolling_volatility_parallel(window=30, workers=args.workers)
+                else:
+                    df_ret = compute_daily_returns(df_raw)
+                    vol_df = compute_rolling_volatility(df_ret, window=30)
+            with stage("weights"):
+                latest = vol_df['date'].max()
+                # One boolean filter serves both lookups
+                latest_vol = vol_df[vol_df['date'] == latest]
+                check_volatility_summary(latest_vol, latest)
+                weights_df = compute_volatility_weights(latest_vol, latest)
+
+            # Export data for JS visualizations
+            with stage("export_json"):
+                data_dir = os.path.join(BASE_DIR, 'app', 'data')
+                suffix = '' if args.estimator == 'close' else f'_{args.estimator}'
+                export_to_json(vol_df, os.path.join(data_dir, f'volatility{suffix}.json'))
+                export_to_json(weights_df, os.path.join(data_dir, f'weights{suffix}_{latest.date()}.json'))
+
+            # Materialize snapshot tables served by /api/volatility and /api/weights
+            # (snapshots hold close-to-close volatility only)
+            if args.estimator == 'close':
+                from app.services.snapshots import materialize_from_frame
+                with stage("materialize_snapshots"):
+                    materialize_from_frame(vol_df, window=30)
+                print("✅ Materialized volatility and weights snapshots.")
+
+    print("\n🏁 ✅ Database exploration and export completed.")
@@ -1,24 +1,45 @@
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
-import os
+from app.database import engine
+from app.services.price_store import get_price_store, store_to_frame
+from app.services import parquet_store
 
 # === CONFIGURATION ===
 
-# Find the correct database path dynamically
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DATABASE_URL = f"sqlite:///{BASE_DIR}/app/database/riskradar.db"
-
-# Create the SQLAlchemy engine and session
-engine = create_engine(DATABASE_URL, echo=False)
+# Session factory on the shared read engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# === HELPERS ===
+
+def _use_parquet() -> bool:
+    return parquet_store.has_parquet() and parquet_store.is_current()
+
+
+def _parquet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shape a Parquet read like the SQL reads: 'YYYY-MM-DD' date text and NumPy
+    columns (volume stays int64 unless it has gaps).
+    """
+    out = pd.DataFrame({"date": df["date"].astype(str).astype(object)})
+    for field in ("open", "high", "low", "close"):
+        out[field] = df[field].to_numpy(dtype=np.float64, na_value=np.nan)
+    volume = df["volume"]
+    out["volume"] = volume.to_numpy(dtype=np.float64, na_value=np.nan) if volume.isna().any() \
+        else volume.to_numpy(dtype=np.int64)
+    return out
+
 # === FUNCTIONS ===
 
 def get_distinct_tickers() -> list:
     """
     Fetch all distinct stock tickers stored in the database.
     """
+    store = get_price_store()
+    if store is not None:
+        return store.tickers()
+
     session = SessionLocal()
     try:
         result = session.execute(text("SELECT DISTINCT ticker FROM stock_data"))
@@ -31,6 +52,13 @@ def get_all_data_for_ticker(ticker: str) -> pd.DataFrame:
     """
     Fetch all historical price data for a given ticker.
     """
+    store = get_price_store()
+    if store is not None:
+        cols = store.slice(ticker)
+        return store_to_frame(cols, store) if cols is not None else pd.DataFrame()
+    if _use_parquet():
+        return _parquet_frame(parquet_store.get_all_data_for_ticker(ticker))
+
     session = SessionLocal()
     try:
         query = text("""
@@ -49,6 +77,13 @@ def get_data_by_date_range(ticker: str, start_date: str, end_date: str) -> pd.Da
     Fetch stock data for a ticker between two dates (inclusive).
     Format: 'YYYY-MM-DD'
     """
+    store = get_price_store()
+    if store is not None:
+        cols = store.slice(ticker, start_date, end_date)
+        return store_to_frame(cols, store) if cols is not None else pd.DataFrame()
+    if _use_parquet():
+        return _parquet_frame(parquet_store.get_data_by_date_range(ticker, start_date, end_date))
+
     session = SessionLocal()
     try:
         query = text("""
@@ -67,6 +102,13 @@ def get_recent_n_days(ticker: str, n_days: int = 30) -> pd.DataFrame:
     """
     Fetch the most recent N days of stock data for a given ticker.
     """
+    store = get_price_store()
+    if store is not None:
+        cols = store.tail(ticker, n_days)
+        return store_to_frame(cols, store) if cols is not None else pd.DataFrame()
+    if _use_parquet():
+        return _parquet_frame(parquet_store.get_recent_n_days(ticker, n_days))
+
     session = SessionLocal()
     try:
         query = text(f"""
@@ -81,6 +123,38 @@ def get_recent_n_days(ticker: str, n_days: int = 30) -> pd.DataFrame:
     finally:
         session.close()
 
+def get_price_history(tickers: list = None, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    """
+    Bulk read of (ticker, date, OHLCV) rows for many tickers. Uses the
+    partitioned Parquet export when it is current, so ticker and date filters
+    skip whole files and row groups (Arrow-backed result); otherwise queries SQL.
+    """
+    if _use_parquet():
+        return parquet_store.read_prices(tickers, start_date, end_date)
+
+    clauses, params = [], {}
+    if tickers is not None:
+        names = [f":t{i}" for i in range(len(tickers))]
+        clauses.append(f"ticker IN ({', '.join(names) or 'NULL'})")
+        params.update({f"t{i}": t for i, t in enumerate(tickers)})
+    if start_date is not None:
+        clauses.append("date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        clauses.append("date < date(:end_date, '+1 day')")
+        params["end_date"] = end_date
+    query = text(f"""
+        SELECT ticker, date, open, high, low, close, volume
+        FROM stock_data
+        {"WHERE " + " AND ".join(clauses) if clauses else ""}
+        ORDER BY ticker, date
+    """)
+    session = SessionLocal()
+    try:
+        return pd.read_sql_query(query, session.bind, params=params)
+    finally:
+        session.close()
+
 # === QUICK TESTING / DEMO ===
 
 if __name__ == "__main__":
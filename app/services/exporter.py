@@ -0,0 +1,102 @@
+# app/services/exporter.py
+
+import io
+import csv
+import json
+import sys
+from sqlalchemy import text
+from app.database import engine
+
+# === CONFIGURATION ===
+# Rows are pulled through a streaming cursor and emitted chunk by chunk, so
+# memory stays flat whatever the size of the export.
+EXPORT_COLUMNS = ("ticker", "date", "open", "high", "low", "close", "volume")
+CHUNK_ROWS = 10_000
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# === FUNCTIONS ===
+
+def iter_rows(ticker: str = None, start_date: str = None, end_date: str = None,
+              chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield lists of stock_data rows ordered by (ticker, date), optionally
+    filtered to one ticker and/or an inclusive 'YYYY-MM-DD' date range.
+    """
+    clauses, params = [], {}
+    if ticker is not None:
+        clauses.append("ticker = :ticker")
+        params["ticker"] = ticker
+    if start_date is not None:
+        clauses.append("date >= :start_date")
+        params["start_date"] = start_date
+    if end_date is not None:
+        # Dates may carry a time suffix, so compare against the next day
+        clauses.append("date < date(:end_date, '+1 day')")
+        params["end_date"] = end_date
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = text(f"""
+        SELECT {', '.join(EXPORT_COLUMNS)}
+        FROM stock_data
+        {where}
+        ORDER BY ticker, date
+    """)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(query, params)
+        for rows in result.partitions():
+            yield rows
+
+
+def iter_ndjson(rows_iter):
+    """
+    Encode row chunks as newline-delimited JSON, one string per chunk.
+    """
+    for rows in rows_iter:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":")) + "\n"
+            for row in rows
+        )
+
+
+def iter_csv(rows_iter):
+    """
+    Encode row chunks as CSV with a header line, one string per chunk.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buf.getvalue()
+    for rows in rows_iter:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue()
+
+
+def iter_export(fmt: str = "ndjson", **filters):
+    encoder = iter_csv if fmt == "csv" else iter_ndjson
+    return encoder(iter_rows(**filters))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream stock_data as NDJSON or CSV.")
+    parser.add_argument("--ticker")
+    parser.add_argument("--start", help="inclusive start date YYYY-MM-DD")
+    parser.add_argument("--end", help="inclusive end date YYYY-MM-DD")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--output", help="file path (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        for chunk in iter_export(args.format, ticker=args.ticker,
+                                 start_date=args.start, end_date=args.end):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+            print(f"✅ Exported to {args.output}", file=sys.stderr)
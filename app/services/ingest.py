@@ -0,0 +1,297 @@
+# app/services/ingest.py
+
+import os
+import time
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import writer_engine as engine
+from app.services.change_log import ensure_change_log, record_changes
+from app.services.covariance import drop_covariance
+from app.services.parquet_store import has_parquet, export_parquet
+from app.services.payloads import load_manifest, unpublish
+from app.services.price_store import STORE_DIR as PRICE_STORE_DIR, build_price_store
+from app.services.snapshots import refresh_snapshots
+from app.services.volatility_engine import invalidate_states, bootstrap, refresh as refresh_states
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet input needs pyarrow; CSV works without it
+    pq = None
+
+# === CONFIGURATION ===
+# Bulk OHLCV loader. Every batch is one transaction of
+#   INSERT ... ON CONFLICT(ticker, date) DO UPDATE
+# against idx_unique_ticker_date, so re-loading a file updates rows in place
+# and duplicates never reach stock_data. --initial-load (empty table only)
+# appends into an index-free staging table instead, then copies the
+# de-duplicated rows over in (ticker, date) order and rebuilds the indexes once.
+# Each batch also logs its tickers' first written dates to stock_data_changes
+# and drops volatility_state rows those dates invalidate, in the same
+# transaction. Published payloads and covariance matrices from the first
+# changed date on are removed after the load, and refresh_derived() rebuilds
+# the price store, snapshots, volatility state and Parquet export.
+BATCH_ROWS = 100_000
+COLUMNS = ["ticker", "date", "open", "high", "low", "close", "volume"]
+COLUMN_ALIASES = {"symbol": "ticker", "timestamp": "date", "datetime": "date"}
+STAGING_TABLE = "stock_data_staging"
+
+UPSERT_SQL = f"""
+    INSERT INTO stock_data ({", ".join(COLUMNS)})
+    VALUES ({", ".join("?" * len(COLUMNS))})
+    ON CONFLICT(ticker, date) DO UPDATE SET
+        open = excluded.open,
+        high = excluded.high,
+        low = excluded.low,
+        close = excluded.close,
+        volume = excluded.volume
+"""
+STAGING_SQL = f"INSERT INTO {STAGING_TABLE} ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+# === READING ===
+
+def iter_file_batches(path: str, batch_rows: int = BATCH_ROWS, ticker: str = None):
+    """
+    Yield normalized DataFrames of at most batch_rows rows from a CSV or Parquet file.
+    Files without a ticker column take `ticker` (default: the file name, e.g. AAPL.csv).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        if pq is None:
+            raise RuntimeError("Reading Parquet requires pyarrow (pip install pyarrow)")
+        frames = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=batch_rows))
+    else:
+        frames = pd.read_csv(path, chunksize=batch_rows)
+
+    default_ticker = ticker or os.path.splitext(os.path.basename(path))[0].upper()
+    for df in frames:
+        df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+        df = df.rename(columns=COLUMN_ALIASES)
+        if "ticker" not in df.columns:
+            df["ticker"] = default_ticker
+        missing = set(COLUMNS) - set(df.columns)
+        if missing:
+            raise ValueError(f"{path} is missing column(s): {', '.join(sorted(missing))}")
+        yield df[COLUMNS]
+
+
+def to_rows(df: pd.DataFrame, date_format: str) -> list:
+    """
+    Convert a batch to DB-ready tuples: normalized dates, NaN -> NULL, last duplicate wins.
+    """
+    df = df.dropna(subset=["ticker", "date"]).copy()
+    df["ticker"] = df["ticker"].astype(str).str.strip().str.upper()
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime(date_format)
+    df = df.drop_duplicates(subset=["ticker", "date"], keep="last")
+    df["volume"] = pd.to_numeric(df["volume"]).round().astype("Int64")
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+# === HELPERS ===
+
+def _date_format(conn) -> str:
+    """
+    Match the stored date text ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS') so keys collide.
+    """
+    sample = conn.exec_driver_sql("SELECT date FROM stock_data LIMIT 1").scalar()
+    return "%Y-%m-%d %H:%M:%S" if sample is not None and len(str(sample)) > 10 else "%Y-%m-%d"
+
+
+def _ensure_unique_index(conn) -> None:
+    try:
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_ticker_date ON stock_data (ticker, date)"
+        )
+    except Exception as e:
+        raise RuntimeError(
+            "stock_data holds duplicate (ticker, date) rows; run "
+            "`python -m app.services.clean_duplicates` before ingesting"
+        ) from e
+
+
+def _changes(rows: list) -> tuple:
+    """
+    ({ticker: first date}, {ticker: rows}) of a batch from to_rows().
+    """
+    first_dates, counts = {}, {}
+    for ticker, date, *_ in rows:
+        if ticker not in first_dates or date < first_dates[ticker]:
+            first_dates[ticker] = date
+        counts[ticker] = counts.get(ticker, 0) + 1
+    return first_dates, counts
+
+
+def _log_changes(conn, first_dates: dict, counts: dict, changed: dict) -> None:
+    record_changes(conn, first_dates, counts)
+    invalidate_states(conn, first_dates)
+    for ticker, date in first_dates.items():
+        date = str(date)[:10]
+        if ticker not in changed or date < changed[ticker]:
+            changed[ticker] = date
+
+
+class _Progress:
+    def __init__(self):
+        self.start = time.time()
+        self.rows = 0
+
+    def add(self, n: int) -> None:
+        self.rows += n
+        elapsed = max(time.time() - self.start, 1e-9)
+        print(f"📥  {self.rows:,} rows  ({self.rows / elapsed:,.0f} rows/s)")
+
+# === INGEST ===
+
+def ingest_files(paths: list, batch_rows: int = BATCH_ROWS, ticker: str = None) -> dict:
+    """
+    Upsert every file into stock_data, one transaction per batch.
+    Returns {"rows", "seconds", "changed": {ticker: first changed date}}.
+    """
+    progress = _Progress()
+    changed = {}
+    with engine.begin() as conn:
+        _ensure_unique_index(conn)
+        ensure_change_log(conn)
+        date_format = _date_format(conn)
+    for path in paths:
+        for df in iter_file_batches(path, batch_rows, ticker):
+            rows = to_rows(df, date_format)
+            if not rows:
+                continue
+            with engine.begin() as conn:
+                conn.exec_driver_sql(UPSERT_SQL, rows)
+                _log_changes(conn, *_changes(rows), changed)
+            progress.add(len(rows))
+    invalidate_exports(changed)
+    return {"rows": progress.rows, "seconds": time.time() - progress.start, "changed": changed}
+
+
+def initial_load(paths: list, batch_rows: int = BATCH_ROWS, ticker: str = None) -> dict:
+    """
+    Fast path for an empty stock_data: append to an unindexed staging table,
+    then copy de-duplicated rows in key order and (re)build the indexes once.
+    """
+    with engine.begin() as conn:
+        if conn.exec_driver_sql("SELECT 1 FROM stock_data LIMIT 1").first() is not None:
+            raise RuntimeError("--initial-load only runs on an empty stock_data table")
+        indexes = conn.exec_driver_sql("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'stock_data' AND sql IS NOT NULL
+        """).fetchall()
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        conn.exec_driver_sql(f"CREATE TABLE {STAGING_TABLE} AS SELECT {', '.join(COLUMNS)} FROM stock_data WHERE 0")
+        ensure_change_log(conn)
+
+    progress = _Progress()
+    for path in paths:
+        for df in iter_file_batches(path, batch_rows, ticker):
+            rows = to_rows(df, "%Y-%m-%d")
+            if not rows:
+                continue
+            with engine.begin() as conn:
+                conn.exec_driver_sql(STAGING_SQL, rows)
+            progress.add(len(rows))
+
+    print("🔧  Copying staged rows and rebuilding indexes...")
+    with engine.begin() as conn:
+        for name, _ in indexes:
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+        # Later rows win, like the upsert path
+        conn.exec_driver_sql(f"""
+            INSERT INTO stock_data ({", ".join(COLUMNS)})
+            SELECT {", ".join(COLUMNS)} FROM {STAGING_TABLE}
+            WHERE rowid IN (SELECT MAX(rowid) FROM {STAGING_TABLE} GROUP BY ticker, date)
+            ORDER BY ticker, date
+        """)
+        for _, sql in indexes:
+            conn.exec_driver_sql(sql)
+        _ensure_unique_index(conn)
+        per_ticker = conn.exec_driver_sql(
+            "SELECT ticker, MIN(date), COUNT(*) FROM stock_data GROUP BY ticker"
+        ).fetchall()
+        changed = {}
+        _log_changes(conn, {t: d for t, d, _ in per_ticker}, {t: n for t, _, n in per_ticker}, changed)
+        loaded = sum(n for _, _, n in per_ticker)
+        conn.exec_driver_sql(f"DROP TABLE {STAGING_TABLE}")
+    invalidate_exports(changed)
+    return {"rows": loaded, "seconds": time.time() - progress.start, "changed": changed}
+
+# === DERIVED DATA ===
+
+def invalidate_exports(changed: dict) -> None:
+    """
+    Remove published payloads (volatility.json, weights_<date>.json) and
+    covariance matrices dated on or after the first changed date.
+    """
+    if not changed:
+        return
+    since = min(changed.values())
+    stale = [
+        name for name in load_manifest()
+        if name == "volatility.json"
+        or (name.startswith("weights_") and name[len("weights_"):len("weights_") + 10] >= since)
+    ]
+    unpublished = unpublish(stale)
+    dropped = drop_covariance(since)
+    if unpublished or dropped:
+        print(f"🗑️  Unpublished {len(unpublished)} payloads and dropped {dropped} covariance "
+              f"matrices from {since} on; re-export them once derived data is refreshed.")
+
+
+def _windows(table: str) -> list:
+    try:
+        with engine.connect() as conn:
+            return [w for (w,) in conn.execute(text(f"SELECT DISTINCT window FROM {table}"))]
+    except OperationalError:
+        return []  # never built
+
+
+def refresh_derived(changed: dict, state_windows: list = None) -> None:
+    """
+    Bring the derived stores that exist up to date with the rows just loaded:
+    price store, snapshots (per materialized window), volatility state for
+    `state_windows` (default: windows already in volatility_state) and the
+    Parquet export.
+    """
+    if not changed:
+        return
+    if os.path.exists(os.path.join(PRICE_STORE_DIR, "meta.json")):
+        print("🔧  Rebuilding price store...")
+        build_price_store()
+    for window in _windows("snapshot_meta"):
+        stats = refresh_snapshots(window)
+        print(f"🔄  Refreshed snapshots for {stats['refreshed']} tickers (window={window}).")
+    for window in _windows("volatility_state") if state_windows is None else state_windows:
+        seeded = bootstrap(window, sorted(changed))
+        updated = refresh_states(window)
+        print(f"🔄  Volatility state: seeded {seeded}, updated {updated} tickers (window={window}).")
+    if has_parquet():
+        print("🔧  Re-exporting Parquet...")
+        export_parquet()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-load OHLCV CSV/Parquet files into stock_data.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--ticker", help="ticker for files without a ticker column (default: file name)")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--initial-load", action="store_true",
+                        help="empty table only: load via staging and build indexes afterwards")
+    parser.add_argument("--no-refresh", action="store_true",
+                        help="skip rebuilding the price store, snapshots, volatility state and Parquet export")
+    args = parser.parse_args()
+
+    # Read before the load: invalidation may drop every state of a window
+    state_windows = _windows("volatility_state")
+    load = initial_load if args.initial_load else ingest_files
+    try:
+        stats = load(args.paths, args.batch_rows, args.ticker)
+    except (RuntimeError, ValueError) as e:
+        raise SystemExit(f"❌  {e}")
+    print(f"✅  Loaded {stats['rows']:,} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} rows/s).")
+    if args.no_refresh:
+        print("ℹ️  Derived data is stale until refreshed (readers fall back to SQL meanwhile).")
+    else:
+        refresh_derived(stats["changed"], state_windows)
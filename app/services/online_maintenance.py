@@ -0,0 +1,229 @@
+# app/services/online_maintenance.py
+
+import os
+import json
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from app.database import writer_engine as engine, DB_PATH
+
+# === CONFIGURATION ===
+# Online alternative to clean_duplicates(): walks the (ticker, date) index in
+# small ticker ranges, deletes duplicates (keeping MIN(rowid), as before) in
+# short write transactions with a pause between them, then hands free pages
+# back with PRAGMA incremental_vacuum(N) steps. WAL readers are never blocked
+# and other writers only wait for one short transaction. Progress is
+# checkpointed, so a run cut short by --max-seconds resumes where it stopped —
+# suitable for cron alongside live traffic.
+BATCH_TICKERS = 50      # tickers per duplicate scan
+DELETE_ROWS = 5_000     # rows per delete transaction
+VACUUM_PAGES = 2_000    # pages per incremental_vacuum step
+PAUSE_SECONDS = 0.05    # sleep between write transactions
+CHECKPOINT_PATH = f"{DB_PATH}.maintenance.json"
+SUPPORT_INDEX = "idx_stock_data_ticker_date"
+
+NEXT_TICKER_QUERY = text("SELECT ticker FROM stock_data WHERE ticker > :after ORDER BY ticker LIMIT 1")
+DUPLICATES_QUERY = text("""
+    SELECT rowid FROM stock_data
+    WHERE ticker >= :lo AND ticker <= :hi
+      AND rowid NOT IN (
+          SELECT MIN(rowid) FROM stock_data
+          WHERE ticker >= :lo AND ticker <= :hi
+          GROUP BY ticker, date
+      )
+""")
+
+# === CHECKPOINT ===
+
+def load_checkpoint(path: str = CHECKPOINT_PATH) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_ticker": "", "deleted": 0, "done": False}
+
+
+def save_checkpoint(state: dict, path: str = CHECKPOINT_PATH) -> None:
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(f"{path}.tmp", path)
+
+# === HELPERS ===
+
+def _has_key_index(conn) -> bool:
+    """
+    True if some index leads with (ticker, date), so range scans stay on the index.
+    """
+    for index in conn.execute(text("PRAGMA index_list(stock_data)")).fetchall():
+        cols = [r[2] for r in conn.execute(text(f'PRAGMA index_info("{index[1]}")')).fetchall()]
+        if cols[:2] == ["ticker", "date"]:
+            return True
+    return False
+
+
+def _next_range(conn, after: str, n: int) -> tuple:
+    """
+    The next n tickers after `after`, found by index seeks (no table scan).
+    Returns (lo, hi) or None when there are no tickers left.
+    """
+    lo = hi = None
+    for _ in range(n):
+        ticker = conn.execute(NEXT_TICKER_QUERY, {"after": hi if hi is not None else after}).scalar()
+        if ticker is None:
+            break
+        lo = ticker if lo is None else lo
+        hi = ticker
+    return (lo, hi) if lo is not None else None
+
+
+class _Budget:
+    def __init__(self, max_seconds: float = None):
+        self.deadline = time.time() + max_seconds if max_seconds else None
+
+    def exhausted(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+# === PHASES ===
+
+def remove_duplicates_online(budget: _Budget, pause: float = PAUSE_SECONDS,
+                             batch_tickers: int = BATCH_TICKERS, delete_rows: int = DELETE_ROWS,
+                             checkpoint_path: str = CHECKPOINT_PATH) -> dict:
+    """
+    Delete duplicate (ticker, date) rows range by range, resuming from the checkpoint.
+    """
+    state = load_checkpoint(checkpoint_path)
+    if state.get("done"):
+        return state
+
+    with engine.connect() as conn:
+        has_index = _has_key_index(conn)
+    if not has_index:
+        # One index build is unavoidable; every later step is a bounded range scan
+        print(f"🔧  Creating {SUPPORT_INDEX} on (ticker, date)...")
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {SUPPORT_INDEX} ON stock_data (ticker, date)"))
+
+    while not budget.exhausted():
+        with engine.connect() as conn:
+            bounds = _next_range(conn, state["last_ticker"], batch_tickers)
+            if bounds is None:
+                state["done"] = True
+                break
+            lo, hi = bounds
+            rowids = [r[0] for r in conn.execute(DUPLICATES_QUERY, {"lo": lo, "hi": hi})]
+
+        for i in range(0, len(rowids), delete_rows):
+            with engine.begin() as conn:
+                conn.execute(
+                    text(f"DELETE FROM stock_data WHERE rowid IN ({','.join(map(str, rowids[i:i + delete_rows]))})")
+                )
+            time.sleep(pause)
+
+        state["deleted"] += len(rowids)
+        state["last_ticker"] = hi
+        save_checkpoint(state, checkpoint_path)
+        if rowids:
+            print(f"🗑️  {lo}..{hi}: deleted {len(rowids)} duplicate rows ({state['deleted']} total).")
+
+    save_checkpoint(state, checkpoint_path)
+    return state
+
+
+def finalize_unique_index() -> bool:
+    """
+    Add the unique index once no duplicates remain, so new duplicates are rejected.
+    Returns False when writers added duplicates behind the sweep (nothing changes).
+    """
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_ticker_date
+                ON stock_data (ticker, date)
+            """))
+            conn.execute(text(f"DROP INDEX IF EXISTS {SUPPORT_INDEX}"))
+    except IntegrityError:
+        return False
+    print("🔧  Unique index on (ticker, date) in place.")
+    return True
+
+
+def enable_incremental_vacuum() -> None:
+    """
+    One-off switch to auto_vacuum=INCREMENTAL. Needs a single full VACUUM, so
+    run it in a maintenance window; afterwards space is reclaimed online.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+    print("🧹  auto_vacuum set to INCREMENTAL.")
+
+
+def reclaim_space(budget: _Budget, pause: float = PAUSE_SECONDS, pages: int = VACUUM_PAGES) -> int:
+    """
+    Release free pages in incremental_vacuum steps. Returns pages released
+    (0 when the database is not in INCREMENTAL auto_vacuum mode).
+    """
+    with engine.connect() as conn:
+        mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+        free = conn.execute(text("PRAGMA freelist_count")).scalar()
+    if mode != 2:
+        if free:
+            print(f"ℹ️  {free} free pages; run with --enable-incremental-vacuum once to reclaim them online.")
+        return 0
+
+    released = 0
+    while free and not budget.exhausted():
+        with engine.connect() as conn:
+            # pysqlite's execute() steps this pragma once (one page); executescript runs it to completion
+            conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages});")
+            remaining = conn.execute(text("PRAGMA freelist_count")).scalar()
+        released += free - remaining
+        free = remaining
+        time.sleep(pause)
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+    print(f"🧹  Released {released} pages ({free} still free).")
+    return released
+
+
+def run_online_maintenance(max_seconds: float = None, pause: float = PAUSE_SECONDS,
+                           restart: bool = False, checkpoint_path: str = CHECKPOINT_PATH) -> dict:
+    """
+    Duplicate cleanup, unique index and space reclamation within an optional time budget.
+    """
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    budget = _Budget(max_seconds)
+    while True:
+        state = remove_duplicates_online(budget, pause, checkpoint_path=checkpoint_path)
+        if not state["done"]:
+            print(f"⏸️  Time budget used; resume from after {state['last_ticker']!r} next run.")
+            return state
+        if finalize_unique_index():
+            break
+        # Until the index exists, writers can add duplicates to ranges already swept
+        print("⚠️  New duplicates appeared behind the sweep; sweeping again before indexing.")
+        state.update(last_ticker="", done=False)
+        save_checkpoint(state, checkpoint_path)
+
+    state["released_pages"] = reclaim_space(budget, pause)
+    os.remove(checkpoint_path)
+    return state
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Online duplicate cleanup and space reclamation.")
+    parser.add_argument("--max-seconds", type=float, help="stop after this long; the next run resumes")
+    parser.add_argument("--pause", type=float, default=PAUSE_SECONDS, help="sleep between write transactions")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="one-off: switch to auto_vacuum=INCREMENTAL (runs a full VACUUM)")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum()
+    state = run_online_maintenance(args.max_seconds, args.pause, args.restart)
+    if state["done"]:
+        print(f"✅  Online maintenance complete: {state['deleted']} duplicate rows removed.")
@@ -0,0 +1,129 @@
+# app/services/parallel_volatility.py
+
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam
+from app.database import DB_PATH, create_reader_engine
+from app.services.database_explorer import compute_daily_returns, compute_rolling_volatility
+
+# === CONFIGURATION ===
+# Tickers are split into contiguous, row-balanced shards. Each worker process
+# opens its own connection, reads only its shard, computes volatility and
+# writes the result to a shard file; the parent concatenates shard files in
+# shard order, so the output is identical whatever order workers finish in.
+DEFAULT_WORKERS = int(os.environ.get("RISKRADAR_WORKERS", os.cpu_count() or 1))
+SHARDS_PER_WORKER = 4
+
+SHARD_QUERY = text("""
+    SELECT ticker, date, close FROM stock_data
+    WHERE ticker IN :tickers
+    ORDER BY ticker, date
+""").bindparams(bindparam("tickers", expanding=True))
+
+# === SHARDING ===
+
+def ticker_row_counts(db_path: str = DB_PATH) -> pd.Series:
+    """
+    Rows per ticker, sorted by ticker (answered from the (ticker, date) index).
+    """
+    eng = create_reader_engine(db_path, pool_size=1, max_overflow=0)
+    try:
+        with eng.connect() as conn:
+            rows = conn.execute(text("SELECT ticker, COUNT(*) FROM stock_data GROUP BY ticker ORDER BY ticker"))
+            return pd.Series(dict(rows.fetchall()), dtype=np.int64)
+    finally:
+        eng.dispose()
+
+
+def make_shards(counts: pd.Series, n_shards: int) -> list:
+    """
+    Split sorted tickers into up to n_shards contiguous runs of roughly equal row count.
+    """
+    if counts.empty:
+        return []
+    bounds = np.searchsorted(counts.cumsum().to_numpy(), np.linspace(0, counts.sum(), n_shards + 1)[1:-1])
+    return [list(s) for s in np.split(counts.index.to_numpy(), bounds) if len(s)]
+
+# === WORKER ===
+
+def _compute_shard(shard_id: int, tickers: list, window: int, db_path: str, out_dir: str) -> str:
+    """
+    Runs in a worker process: read one shard straight from SQLite and write its volatility.
+    """
+    eng = create_reader_engine(db_path, pool_size=1, max_overflow=0)
+    try:
+        with eng.connect() as conn:
+            df = pd.read_sql_query(SHARD_QUERY, conn, params={"tickers": tickers})
+    finally:
+        eng.dispose()
+    df["date"] = pd.to_datetime(df["date"].astype(str).str[:10])
+    vol = compute_rolling_volatility(compute_daily_returns(df), window=window)
+
+    names, codes = np.unique(vol["ticker"].to_numpy(dtype=str), return_inverse=True)
+    path = os.path.join(out_dir, f"shard_{shard_id:05d}.npz")
+    np.savez(
+        path,
+        names=names,
+        codes=codes.astype(np.int32),
+        dates=vol["date"].to_numpy(),
+        volatility=vol["volatility"].to_numpy(dtype=np.float64),
+    )
+    return path
+
+
+def _read_shard(path: str) -> pd.DataFrame:
+    with np.load(path) as data:
+        return pd.DataFrame({
+            "ticker": data["names"][data["codes"]],
+            "date": data["dates"],
+            "volatility": data["volatility"],
+        })
+
+# === DRIVER ===
+
+def compute_rolling_volatility_parallel(window: int = 30, workers: int = DEFAULT_WORKERS,
+                                        db_path: str = DB_PATH) -> pd.DataFrame:
+    """
+    Parallel equivalent of compute_rolling_volatility(compute_daily_returns(get_all_data())).
+    Returns ticker, date, volatility sorted by (ticker, date).
+    """
+    shards = make_shards(ticker_row_counts(db_path), max(1, workers) * SHARDS_PER_WORKER)
+    out_dir = tempfile.mkdtemp(prefix="riskradar_vol_")
+    try:
+        if workers <= 1:
+            paths = [_compute_shard(i, s, window, db_path, out_dir) for i, s in enumerate(shards)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_compute_shard, i, s, window, db_path, out_dir)
+                           for i, s in enumerate(shards)]
+                paths = [f.result() for f in futures]  # shard order, not completion order
+        frames = [_read_shard(p) for p in paths]
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    if not frames:
+        return pd.DataFrame(columns=["ticker", "date", "volatility"])
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compute rolling volatility across a process pool.")
+    parser.add_argument("--window", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--materialize", action="store_true",
+                        help="store the result as the volatility/weights snapshot")
+    args = parser.parse_args()
+
+    start = time.time()
+    vol_df = compute_rolling_volatility_parallel(args.window, args.workers)
+    print(f"✅ Computed {len(vol_df)} volatility rows with {args.workers} workers in {time.time() - start:.1f}s.")
+    if args.materialize:
+        from app.services.snapshots import materialize_from_frame
+        materialize_from_frame(vol_df, window=args.window)
+        print("✅ Materialized volatility and weights snapshots.")
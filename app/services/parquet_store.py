@@ -0,0 +1,202 @@
+# app/services/parquet_store.py
+
+import os
+import json
+import shutil
+import time
+import datetime
+import pandas as pd
+from sqlalchemy import text
+from app.database import engine, DB_PATH
+from app.services.change_log import source_stamp
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # the Parquet export and readers need pyarrow
+    pa = ds = pq = None
+
+# === CONFIGURATION ===
+# stock_data exported as Parquet, hive-partitioned by year (year=2024/...).
+# Rows arrive in (ticker, date) order, so every row group covers a narrow
+# ticker range and its min/max statistics let readers skip the rest: a ticker
+# + date filter touches one year directory and a row group or two per year.
+# Readers return Arrow-backed DataFrames (pd.ArrowDtype) without copying into
+# NumPy. Rebuild with `python -m app.services.parquet_store` after ingests;
+# _meta.json records the source stamp, like the price store, so is_current()
+# tells callers when stock_data has moved past the export.
+PARQUET_DIR = os.path.join(os.path.dirname(DB_PATH), "parquet")
+ROW_GROUP_ROWS = 100_000
+FETCH_ROWS = 200_000
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+META_FILE = "_meta.json"  # pyarrow datasets skip "_"-prefixed files
+
+def _schema():
+    return pa.schema([
+        ("ticker", pa.string()),
+        ("date", pa.date32()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.int64()),
+    ])
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The Parquet store requires pyarrow (pip install pyarrow)")
+
+# === EXPORT ===
+
+def export_parquet(out_dir: str = PARQUET_DIR, row_group_rows: int = ROW_GROUP_ROWS) -> dict:
+    """
+    Stream stock_data in (ticker, date) order into one Parquet file per year.
+    Each year buffers at most row_group_rows rows before writing a row group.
+    The new tree is written beside the old one and swapped in.
+    """
+    _require_pyarrow()
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    schema = _schema()
+    writers, buffers = {}, {}
+    rows = 0
+    stamp = source_stamp()
+
+    def flush(year):
+        frame = pd.concat(buffers.pop(year), ignore_index=True)
+        if year not in writers:
+            os.makedirs(os.path.join(tmp_dir, f"year={year}"))
+            writers[year] = pq.ParquetWriter(os.path.join(tmp_dir, f"year={year}", "part-0.parquet"),
+                                             schema, compression="zstd")
+        writers[year].write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False),
+                                  row_group_size=row_group_rows)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(text("""
+            SELECT ticker, date, open, high, low, close, volume
+            FROM stock_data
+            ORDER BY ticker, date
+        """))
+        for chunk in result.partitions(FETCH_ROWS):
+            df = pd.DataFrame(chunk, columns=["ticker", "date", "open", "high", "low", "close", "volume"])
+            df["date"] = pd.to_datetime(df["date"].astype(str).str[:10]).dt.date
+            df["volume"] = pd.to_numeric(df["volume"]).round().astype("Int64")
+            rows += len(df)
+            for year, part in df.groupby(pd.to_datetime(df["date"]).dt.year, sort=False):
+                buffers.setdefault(year, []).append(part)
+                if sum(len(p) for p in buffers[year]) >= row_group_rows:
+                    flush(year)
+
+    for year in list(buffers):
+        flush(year)
+    for writer in writers.values():
+        writer.close()
+
+    os.makedirs(tmp_dir, exist_ok=True)
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump({"source": stamp, "rows": rows}, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return {"rows": rows, "years": len(writers)}
+
+# === READ ===
+
+def has_parquet(path: str = PARQUET_DIR) -> bool:
+    return pa is not None and os.path.isdir(path)
+
+
+def is_current(path: str = PARQUET_DIR) -> bool:
+    """
+    True when the export exists and was built from the current stock_data.
+    """
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return has_parquet(path) and json.load(f).get("source") == source_stamp()
+    except FileNotFoundError:
+        return False
+
+
+def _years(path: str) -> list:
+    """
+    Exported years, newest first ([] before the first export).
+    """
+    if not os.path.isdir(path):
+        return []
+    return sorted((int(d.split("=")[1]) for d in os.listdir(path) if d.startswith("year=")), reverse=True)
+
+
+def _dataset(path: str = PARQUET_DIR):
+    _require_pyarrow()
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+def read_prices(tickers: list = None, start_date: str = None, end_date: str = None,
+                columns: list = None, path: str = PARQUET_DIR) -> pd.DataFrame:
+    """
+    Rows for the given tickers within inclusive 'YYYY-MM-DD' bounds, as an
+    Arrow-backed DataFrame sorted by (ticker, date); empty before the first
+    export. The year partition, row group statistics and the filter itself
+    are all applied inside pyarrow.
+    """
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if tickers is not None:
+        expr = both(expr, ds.field("ticker").isin(list(tickers)))
+    if start_date is not None:
+        start = datetime.date.fromisoformat(str(start_date)[:10])
+        expr = both(expr, (ds.field("year") >= start.year) & (ds.field("date") >= start))
+    if end_date is not None:
+        end = datetime.date.fromisoformat(str(end_date)[:10])
+        expr = both(expr, (ds.field("year") <= end.year) & (ds.field("date") <= end))
+
+    columns = columns or ["ticker"] + PRICE_COLUMNS
+    if not os.path.isdir(path):
+        _require_pyarrow()
+        return _schema().empty_table().select(columns).to_pandas(types_mapper=pd.ArrowDtype)
+    table = _dataset(path).to_table(columns=columns, filter=expr)
+    sort_keys = [(c, "ascending") for c in ("ticker", "date") if c in columns]
+    if sort_keys:
+        table = table.sort_by(sort_keys)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def get_all_data_for_ticker(ticker: str) -> pd.DataFrame:
+    """
+    Full history for one ticker (same columns as database_reader's version).
+    """
+    return read_prices([ticker], columns=PRICE_COLUMNS)
+
+
+def get_data_by_date_range(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    One ticker between two inclusive 'YYYY-MM-DD' dates.
+    """
+    return read_prices([ticker], start_date, end_date, columns=PRICE_COLUMNS)
+
+
+def get_recent_n_days(ticker: str, n_days: int = 30, path: str = PARQUET_DIR) -> pd.DataFrame:
+    """
+    Most recent n_days rows for a ticker, reading year partitions newest first.
+    """
+    parts, have = [], 0
+    for year in _years(path):
+        part = read_prices([ticker], f"{year}-01-01", f"{year}-12-31", columns=PRICE_COLUMNS, path=path)
+        parts.insert(0, part)
+        have += len(part)
+        if have >= n_days:
+            break
+    if not parts:
+        return read_prices([ticker], columns=PRICE_COLUMNS, path=path)
+    return pd.concat(parts, ignore_index=True).tail(n_days).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print(f"📦  Exporting stock_data to {PARQUET_DIR}...")
+    start = time.time()
+    stats = export_parquet()
+    print(f"✅  Wrote {stats['rows']} rows in {stats['years']} yearly partitions in {time.time() - start:.1f}s.")
@@ -0,0 +1,163 @@
+# app/services/payloads.py
+
+import os
+import json
+import gzip
+import glob
+import shutil
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+# === CONFIGURATION ===
+# Exported JSON files (volatility.json, weights_<date>.json) are published as
+# content-hashed, precompressed variants under app/data/payloads/ and listed in
+# manifest.json. Because a hashed name never changes content, the API can serve
+# them with immutable cache headers.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+PAYLOAD_DIR = os.path.join(DATA_DIR, "payloads")
+MANIFEST = "manifest.json"
+
+CHUNK_BYTES = 1 << 20
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+ENCODINGS = ("br", "gzip")  # preference order when the client accepts several
+
+# === PUBLISH ===
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _write_gzip(src: str, dest: str) -> None:
+    with open(src, "rb") as fin, open(dest, "wb") as raw:
+        # mtime=0 keeps the bytes (and so the ETag) identical across rebuilds
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as fout:
+            shutil.copyfileobj(fin, fout, CHUNK_BYTES)
+
+
+def _write_brotli(src: str, dest: str) -> None:
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        for block in iter(lambda: fin.read(CHUNK_BYTES), b""):
+            fout.write(compressor.process(block))
+        fout.write(compressor.finish())
+
+
+def load_manifest(payload_dir: str = PAYLOAD_DIR) -> dict:
+    try:
+        with open(os.path.join(payload_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def publish(path: str, payload_dir: str = PAYLOAD_DIR) -> dict:
+    """
+    Write hashed identity/gzip/brotli copies of `path` and record them in the manifest.
+    Older variants of the same file are removed. Returns the manifest entry.
+    """
+    os.makedirs(payload_dir, exist_ok=True)
+    name = os.path.basename(path)
+    stem, ext = os.path.splitext(name)
+    digest = _hash_file(path)
+
+    entry = {"hash": digest, "size": os.path.getsize(path), "variants": {}}
+    identity = f"{stem}.{digest}{ext}"
+    writers = {"identity": (identity, shutil.copyfile), "gzip": (f"{identity}.gz", _write_gzip)}
+    if brotli is not None:
+        writers["br"] = (f"{identity}.br", _write_brotli)
+
+    for encoding, (filename, write) in writers.items():
+        dest = os.path.join(payload_dir, filename)
+        if not os.path.exists(dest):
+            write(path, f"{dest}.tmp")
+            os.replace(f"{dest}.tmp", dest)
+        entry["variants"][encoding] = {"file": filename, "size": os.path.getsize(dest)}
+
+    keep = {v["file"] for v in entry["variants"].values()}
+    for old in glob.glob(os.path.join(payload_dir, f"{glob.escape(stem)}.*{ext}*")):
+        if os.path.basename(old) not in keep:
+            os.remove(old)
+
+    manifest = load_manifest(payload_dir)
+    manifest[name] = entry
+    _write_manifest(manifest, payload_dir)
+    return entry
+
+def _write_manifest(manifest: dict, payload_dir: str) -> None:
+    tmp = os.path.join(payload_dir, f"{MANIFEST}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(payload_dir, MANIFEST))
+
+
+def unpublish(names: list, payload_dir: str = PAYLOAD_DIR) -> list:
+    """
+    Drop files (e.g. after the data they were exported from changed) from the
+    manifest and delete their variants. Returns the names that were published.
+    """
+    manifest = load_manifest(payload_dir)
+    removed = [n for n in names if n in manifest]
+    if not removed:
+        return []
+    entries = [manifest.pop(n) for n in removed]
+    _write_manifest(manifest, payload_dir)
+    for entry in entries:
+        for variant in entry["variants"].values():
+            try:
+                os.remove(os.path.join(payload_dir, variant["file"]))
+            except FileNotFoundError:
+                pass
+    return removed
+
+# === NEGOTIATION ===
+
+def accepted_encodings(header: str) -> set:
+    """
+    Encodings the client accepts (q > 0) from an Accept-Encoding header.
+    """
+    accepted = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token and q > 0:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def choose_variant(entry: dict, accept_encoding: str) -> tuple:
+    """
+    Return (encoding, filename) of the best variant; encoding is None for identity.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ENCODINGS:
+        if encoding in entry["variants"] and (encoding in accepted or "*" in accepted):
+            return encoding, entry["variants"][encoding]["file"]
+    return None, entry["variants"]["identity"]["file"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish precompressed, hashed copies of exported JSON.")
+    parser.add_argument("paths", nargs="*", help="files to publish (default: every JSON in app/data)")
+    args = parser.parse_args()
+
+    for path in args.paths or sorted(glob.glob(os.path.join(DATA_DIR, "*.json"))):
+        entry = publish(path)
+        sizes = ", ".join(f"{enc} {v['size'] / 1e6:.2f} MB" for enc, v in entry["variants"].items())
+        print(f"✅ {os.path.basename(path)} → {sizes}")
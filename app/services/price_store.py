@@ -0,0 +1,233 @@
+# app/services/price_store.py
+
+import os
+import json
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from app.database import engine, DB_PATH, data_version
+from app.services.change_log import source_stamp
+
+# === CONFIGURATION ===
+# Columnar, memory-mapped copy of stock_data. SQLite stays the source of truth:
+# meta.json records the source stamp the store was built from, and readers stop
+# using the store (callers fall back to SQL) as soon as stock_data moves past it.
+# Rebuild with `python -m app.services.price_store` after every ingest.
+# `date_text` keeps each row's date exactly as stored, and `integer_fields`
+# lists columns stored as SQLite integers, so responses keep the SQL types.
+STORE_DIR = os.path.join(os.path.dirname(DB_PATH), "price_store")
+
+FIELDS = ("date", "open", "high", "low", "close", "volume")
+DTYPES = {
+    "date": "datetime64[D]",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "float64",
+}
+CHUNK_ROWS = 500_000
+NUMERIC_FIELDS = FIELDS[1:]
+
+# === BUILD ===
+
+def build_price_store(store_dir: str = STORE_DIR, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Regenerate the columnar store from stock_data.
+    Rows are laid out ordered by (ticker, date) so each ticker is one contiguous slice.
+    The new store is written next to the old one and swapped in atomically.
+    """
+    tmp_dir = f"{store_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    stamp = source_stamp()
+    with engine.connect() as conn:
+        total, date_width, *non_integer = conn.execute(text(f"""
+            SELECT COUNT(*), MAX(LENGTH(date)),
+                   {", ".join(f"MAX(typeof({f}) NOT IN ('integer', 'null'))" for f in NUMERIC_FIELDS)}
+            FROM stock_data
+        """)).fetchone()
+        total = total or 0
+        dtypes = dict(DTYPES, date_text=f"S{max(date_width or 10, 10)}")
+        columns = {
+            field: np.lib.format.open_memmap(
+                os.path.join(tmp_dir, f"{field}.npy"), mode="w+",
+                dtype=dtype, shape=(total,),
+            )
+            for field, dtype in dtypes.items()
+        } if total else {field: np.empty(0, dtype=dtype) for field, dtype in dtypes.items()}
+
+        result = conn.execution_options(stream_results=True).execute(text("""
+            SELECT ticker, date, open, high, low, close, volume
+            FROM stock_data
+            ORDER BY ticker, date
+        """))
+
+        tickers, offsets = [], []
+        pos = 0
+        last_ticker = None
+        for rows in result.partitions(chunk_rows):
+            chunk = pd.DataFrame(rows, columns=("ticker",) + FIELDS)
+            n = len(chunk)
+            # Dates may be stored as 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'
+            date_text = chunk["date"].astype(str)
+            columns["date_text"][pos:pos + n] = date_text.to_numpy(dtype=dtypes["date_text"])
+            columns["date"][pos:pos + n] = date_text.str[:10].to_numpy(dtype="datetime64[D]")
+            for field in NUMERIC_FIELDS:
+                columns[field][pos:pos + n] = pd.to_numeric(chunk[field], errors="coerce").to_numpy(dtype="float64")
+
+            ticks = chunk["ticker"].to_numpy()
+            starts = np.flatnonzero(ticks[1:] != ticks[:-1]) + 1
+            if ticks[0] != last_ticker:
+                starts = np.concatenate(([0], starts))
+            for s in starts:
+                tickers.append(str(ticks[s]))
+                offsets.append(pos + int(s))
+            last_ticker = ticks[-1]
+            pos += n
+
+    offsets.append(pos)
+    for field in dtypes:
+        if total:
+            columns[field].flush()
+        else:
+            np.save(os.path.join(tmp_dir, f"{field}.npy"), columns[field])
+    del columns
+
+    np.save(os.path.join(tmp_dir, "tickers.npy"), np.array(tickers, dtype=str))
+    np.save(os.path.join(tmp_dir, "offsets.npy"), np.array(offsets, dtype=np.int64))
+    meta = {
+        "rows": int(pos),
+        "tickers": len(tickers),
+        "built_at": time.time(),
+        "source": stamp,
+        "integer_fields": [f for f, flag in zip(NUMERIC_FIELDS, non_integer) if not flag],
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    # Swap directories; open memmaps on the old files stay valid until released
+    old_dir = f"{store_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.rename(store_dir, old_dir)
+    os.rename(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+# === READ ===
+
+class PriceStore:
+    """
+    Read-only view over a built store. Column slices are numpy views into the
+    memory-mapped files, so reading a ticker never copies or converts rows.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR):
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        mmap_mode = "r" if self.meta["rows"] else None
+        self.columns = {
+            field: np.load(os.path.join(store_dir, f"{field}.npy"), mmap_mode=mmap_mode)
+            for field in FIELDS + ("date_text",)
+        }
+        self.integer_fields = set(self.meta.get("integer_fields", ()))
+        tickers = np.load(os.path.join(store_dir, "tickers.npy"))
+        offsets = np.load(os.path.join(store_dir, "offsets.npy"))
+        self._index = {
+            str(t): (int(offsets[i]), int(offsets[i + 1])) for i, t in enumerate(tickers)
+        }
+
+    def tickers(self) -> list:
+        return list(self._index)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._index
+
+    def slice(self, ticker: str, start_date: str = None, end_date: str = None) -> dict:
+        """
+        Return {field: array view} for one ticker, optionally bounded by
+        inclusive 'YYYY-MM-DD' dates. Returns None for unknown tickers.
+        """
+        bounds = self._index.get(ticker)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        if start_date is not None or end_date is not None:
+            dates = self.columns["date"][lo:hi]
+            if start_date is not None:
+                lo += int(np.searchsorted(dates, np.datetime64(str(start_date)[:10], "D"), side="left"))
+            if end_date is not None:
+                hi = bounds[0] + int(np.searchsorted(dates, np.datetime64(str(end_date)[:10], "D"), side="right"))
+        return {field: col[lo:hi] for field, col in self.columns.items()}
+
+    def tail(self, ticker: str, n: int) -> dict:
+        """
+        Return the most recent n rows for a ticker (ascending by date).
+        """
+        bounds = self._index.get(ticker)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        lo = max(lo, hi - n)
+        return {field: col[lo:hi] for field, col in self.columns.items()}
+
+
+_store = None
+_store_mtime = None
+_checked_version = None
+_store_current = False
+
+def get_price_store(store_dir: str = STORE_DIR):
+    """
+    Return the shared PriceStore, reopening it after a rebuild.
+    Returns None when no store has been built yet or stock_data has changed
+    since the build (callers fall back to SQL until it is rebuilt).
+    The source is only re-checked after some connection commits.
+    """
+    global _store, _store_mtime, _checked_version, _store_current
+    try:
+        mtime = os.stat(os.path.join(store_dir, "meta.json")).st_mtime_ns
+    except FileNotFoundError:
+        _store, _store_mtime = None, None
+        return None
+    if _store is None or mtime != _store_mtime:
+        try:
+            _store = PriceStore(store_dir)
+        except FileNotFoundError:
+            _store, _store_mtime = None, None  # built by an older layout; rebuild it
+            return None
+        _store_mtime = mtime
+        _checked_version = None
+
+    version = data_version()
+    if version != _checked_version:
+        current = _store.meta.get("source") == source_stamp()
+        if _store_current and not current:
+            print("⚠️  stock_data changed since the price store was built; serving from SQL until it is rebuilt.")
+        _store_current, _checked_version = current, version
+    return _store if _store_current else None
+
+
+def store_to_frame(cols: dict, store: PriceStore) -> pd.DataFrame:
+    """
+    Wrap a slice as a DataFrame shaped like the SQL reads: dates as stored text,
+    integer columns as int64. Float price columns are not copied.
+    """
+    df = pd.DataFrame({"date": cols["date_text"].astype(str).astype(object)})
+    for field in NUMERIC_FIELDS:
+        values = cols[field]
+        if field in store.integer_fields and not np.isnan(values).any():
+            values = values.astype(np.int64)
+        df[field] = values
+    return df
+
+
+if __name__ == "__main__":
+    print(f"🔧  Rebuilding price store in {STORE_DIR}...")
+    start = time.time()
+    meta = build_price_store()
+    print(f"✅  Wrote {meta['rows']} rows for {meta['tickers']} tickers in {time.time() - start:.1f}s.")
@@ -0,0 +1,354 @@
+# app/services/snapshots.py
+
+import json
+import time
+import pandas as pd
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import OperationalError
+from app.database import engine, writer_engine
+from app.services.change_log import ticker_seqs, changed_since
+from app.services.database_explorer import compute_daily_returns, compute_rolling_volatility
+from app.services.weights_store import build_weights_store
+
+# === CONFIGURATION ===
+# Precomputed per-(ticker, window, date) volatility and per-date weights.
+# snapshot_meta records the (row count, max date, last change seq) of each
+# ticker's source rows at build time; a mismatch against stock_data and
+# stock_data_changes marks the ticker stale. Refreshes only recompute a stale
+# ticker from `window` bars before its earliest changed date; tickers whose
+# change cannot be located are rebuilt in full.
+DEFAULT_WINDOW = 30
+CHUNK_TICKERS = 200
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS volatility_snapshot (
+        ticker     TEXT    NOT NULL,
+        window     INTEGER NOT NULL,
+        date       TEXT    NOT NULL,
+        volatility REAL    NOT NULL,
+        PRIMARY KEY (ticker, window, date)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS weights_snapshot (
+        date       TEXT    NOT NULL,
+        window     INTEGER NOT NULL,
+        ticker     TEXT    NOT NULL,
+        volatility REAL    NOT NULL,
+        weight     REAL    NOT NULL,
+        PRIMARY KEY (date, window, ticker)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS snapshot_meta (
+        ticker          TEXT    NOT NULL,
+        window          INTEGER NOT NULL,
+        source_rows     INTEGER NOT NULL,
+        source_max_date TEXT,
+        source_seq      INTEGER NOT NULL DEFAULT 0,
+        built_at        REAL    NOT NULL,
+        PRIMARY KEY (ticker, window)
+    )
+    """,
+]
+
+# === SCHEMA ===
+
+def ensure_snapshot_tables() -> None:
+    with writer_engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(snapshot_meta)"))}
+        if "source_seq" not in columns:  # tables built before the change log
+            conn.execute(text("ALTER TABLE snapshot_meta ADD COLUMN source_seq INTEGER NOT NULL DEFAULT 0"))
+
+# === STALENESS ===
+
+def source_fingerprints(tickers: list = None) -> dict:
+    """
+    Return {ticker: (row_count, max_date, last_change_seq)} from stock_data
+    and stock_data_changes. Counts come from the (ticker, date) index, so no
+    table rows are read.
+    """
+    query = "SELECT ticker, COUNT(*), MAX(date) FROM stock_data"
+    params = {}
+    if tickers is not None:
+        query += " WHERE ticker IN :tickers"
+        params["tickers"] = tickers
+    stmt = text(query + " GROUP BY ticker")
+    if tickers is not None:
+        stmt = stmt.bindparams(bindparam("tickers", expanding=True))
+    with engine.connect() as conn:
+        counts = conn.execute(stmt, params).fetchall()
+        seqs = ticker_seqs(conn, tickers)
+    return {t: (n, d, seqs.get(t, 0)) for t, n, d in counts}
+
+
+def snapshot_fingerprints(window: int = DEFAULT_WINDOW) -> dict:
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT ticker, source_rows, source_max_date, source_seq FROM snapshot_meta WHERE window = :window
+        """), {"window": window})
+        return {t: (n, d, seq) for t, n, d, seq in rows}
+
+
+def stale_tickers(window: int = DEFAULT_WINDOW, source: dict = None) -> tuple:
+    """
+    Compare snapshot_meta with stock_data.
+    Returns ({stale_or_new: earliest changed date, or None to rebuild in full}, removed).
+    """
+    source = source_fingerprints() if source is None else source
+    built = snapshot_fingerprints(window)
+    stale = {t: None for t, fp in source.items() if built.get(t) != fp}
+    removed = sorted(set(built) - set(source))
+
+    known = {t: built[t] for t in stale if t in built}
+    with engine.connect() as conn:
+        changed = changed_since(conn, {t: fp[2] for t, fp in known.items()})
+        for ticker, (rows, max_date, _) in known.items():
+            # Unlogged writers: a pure append is located from the old max date
+            appended = conn.execute(text("""
+                SELECT COUNT(*), MIN(date) FROM stock_data
+                WHERE ticker = :ticker AND date > :max_date
+            """), {"ticker": ticker, "max_date": max_date or ""}).fetchone()
+            # Logged changes (ingest) cover inserts anywhere; unlogged writers only a pure append
+            located = ticker in changed or source[ticker][0] == rows + appended[0]
+            starts = [str(d)[:10] for d in (changed.get(ticker), appended[1]) if d is not None]
+            if located and starts:
+                stale[ticker] = min(starts)
+    return stale, removed
+
+
+def is_ticker_fresh(ticker: str, window: int = DEFAULT_WINDOW) -> bool:
+    """
+    Cheap per-request check: one index range count plus two primary-key/index lookups.
+    """
+    try:
+        with engine.connect() as conn:
+            built = conn.execute(text("""
+                SELECT source_rows, source_max_date, source_seq FROM snapshot_meta
+                WHERE ticker = :ticker AND window = :window
+            """), {"ticker": ticker, "window": window}).fetchone()
+            if built is None:
+                return False
+            source = conn.execute(text("""
+                SELECT COUNT(*), MAX(date) FROM stock_data WHERE ticker = :ticker
+            """), {"ticker": ticker}).fetchone()
+            seq = ticker_seqs(conn, [ticker]).get(ticker, 0)
+    except OperationalError:
+        return False
+    return tuple(built) == (*source, seq)
+
+# === MATERIALIZATION ===
+
+def _load_closes(starts: dict) -> pd.DataFrame:
+    """
+    Closes of each ticker from its start date on ({ticker: 'YYYY-MM-DD' or '' for all}).
+    """
+    with engine.connect() as conn:
+        df = pd.read_sql_query(text("""
+            SELECT s.ticker, s.date, s.close
+            FROM json_each(:starts) AS t
+            JOIN stock_data s ON s.ticker = t.key AND s.date >= t.value
+            ORDER BY s.ticker, s.date
+        """), conn, params={"starts": json.dumps(starts)})
+    df["date"] = pd.to_datetime(df["date"].astype(str).str[:10])
+    return df
+
+
+def _warmup_starts(from_dates: dict, window: int) -> dict:
+    """
+    For each {ticker: first changed date}, the date `window` bars earlier: enough
+    history for the first recomputed value. '' (everything) when a ticker has
+    fewer bars before the change.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT t.key, (
+                SELECT s.date FROM stock_data s
+                WHERE s.ticker = t.key AND s.date < t.value
+                ORDER BY s.date DESC
+                LIMIT 1 OFFSET :offset
+            )
+            FROM json_each(:from_dates) AS t
+        """), {"from_dates": json.dumps(from_dates), "offset": window - 1}).fetchall()
+    return {t: start or "" for t, start in rows}
+
+
+def write_volatility(conn, vol_df: pd.DataFrame, window: int) -> str:
+    """
+    Insert vol_df rows; callers clear the affected tickers first.
+    Returns the earliest date written (None if nothing was written).
+    """
+    # Duplicate (ticker, date) source rows would collide on the primary key
+    vol_df = vol_df.dropna(subset=["volatility"]).drop_duplicates(subset=["ticker", "date"], keep="last")
+    if vol_df.empty:
+        return None
+    dates = pd.to_datetime(vol_df["date"]).dt.strftime("%Y-%m-%d")
+    conn.execute(text("""
+        INSERT INTO volatility_snapshot (ticker, window, date, volatility)
+        VALUES (:ticker, :window, :date, :volatility)
+    """), [
+        {"ticker": t, "window": window, "date": d, "volatility": float(v)}
+        for t, d, v in zip(vol_df["ticker"], dates, vol_df["volatility"])
+    ])
+    return dates.min()
+
+
+def write_meta(conn, fingerprints: dict, window: int) -> None:
+    now = time.time()
+    conn.execute(text("""
+        INSERT INTO snapshot_meta (ticker, window, source_rows, source_max_date, source_seq, built_at)
+        VALUES (:ticker, :window, :rows, :max_date, :seq, :built_at)
+        ON CONFLICT(ticker, window) DO UPDATE SET
+            source_rows     = excluded.source_rows,
+            source_max_date = excluded.source_max_date,
+            source_seq      = excluded.source_seq,
+            built_at        = excluded.built_at
+    """), [
+        {"ticker": t, "window": window, "rows": n, "max_date": d, "seq": seq, "built_at": now}
+        for t, (n, d, seq) in fingerprints.items()
+    ])
+
+
+def rebuild_weights(conn, window: int, since: str = None) -> None:
+    """
+    Recompute per-date weights (volatility / sum of volatility that date)
+    for all dates on or after `since`.
+    """
+    since = since or "0000-00-00"
+    conn.execute(text("""
+        DELETE FROM weights_snapshot WHERE window = :window AND date >= :since
+    """), {"window": window, "since": since})
+    conn.execute(text("""
+        INSERT INTO weights_snapshot (date, window, ticker, volatility, weight)
+        SELECT date, window, ticker, volatility,
+               volatility / SUM(volatility) OVER (PARTITION BY date)
+        FROM volatility_snapshot
+        WHERE window = :window AND date >= :since
+    """), {"window": window, "since": since})
+
+
+def refresh_snapshots(window: int = DEFAULT_WINDOW, full: bool = False) -> dict:
+    """
+    Recompute snapshots for stale tickers only (or everything with full=True),
+    then rebuild weights from the earliest affected date. A stale ticker with a
+    known first changed date only has its values from that date on recomputed.
+    """
+    ensure_snapshot_tables()
+    source = source_fingerprints()
+    if full:
+        stale, removed = dict.fromkeys(source), []
+        with writer_engine.begin() as conn:
+            for table in ("volatility_snapshot", "weights_snapshot", "snapshot_meta"):
+                conn.execute(text(f"DELETE FROM {table} WHERE window = :window"), {"window": window})
+    else:
+        stale, removed = stale_tickers(window, source)
+
+    tickers = sorted(stale)
+    since = None
+    for i in range(0, len(tickers), CHUNK_TICKERS):
+        chunk = tickers[i:i + CHUNK_TICKERS]
+        from_dates = {t: stale[t] for t in chunk if stale[t] is not None}
+        starts = dict.fromkeys(chunk, "")
+        starts.update(_warmup_starts(from_dates, window) if from_dates else {})
+        df_ret = compute_daily_returns(_load_closes(starts))
+        vol_df = compute_rolling_volatility(df_ret, window=window)
+
+        # Keep only values on or after each ticker's first changed date
+        cutoff = vol_df["ticker"].map(from_dates).fillna("")
+        vol_df = vol_df[vol_df["date"].dt.strftime("%Y-%m-%d") >= cutoff]
+        with writer_engine.begin() as conn:
+            conn.execute(text("""
+                DELETE FROM volatility_snapshot
+                WHERE ticker = :ticker AND window = :window AND date >= :since
+            """), [{"ticker": t, "window": window, "since": from_dates.get(t, "")} for t in chunk])
+            written = write_volatility(conn, vol_df, window)
+            write_meta(conn, {t: source[t] for t in chunk}, window)
+        firsts = [d for d in (written, *from_dates.values()) if d is not None]
+        if firsts:
+            first = min(firsts)
+            since = first if since is None else min(since, first)
+
+    if removed:
+        with writer_engine.begin() as conn:
+            for table in ("volatility_snapshot", "snapshot_meta"):
+                conn.execute(text(f"""
+                    DELETE FROM {table} WHERE window = :window AND ticker IN :tickers
+                """).bindparams(bindparam("tickers", expanding=True)), {"window": window, "tickers": removed})
+        since = "0000-00-00"
+
+    if since is not None:
+        with writer_engine.begin() as conn:
+            rebuild_weights(conn, window, since)
+        build_weights_store(window)
+    return {
+        "refreshed": len(stale),
+        "incremental": sum(d is not None for d in stale.values()),
+        "removed": len(removed),
+        "weights_since": since,
+    }
+
+
+def materialize_from_frame(vol_df: pd.DataFrame, window: int = DEFAULT_WINDOW) -> None:
+    """
+    Store an already computed vol_df (e.g. from database_explorer's main run)
+    as the snapshot for `window`, replacing whatever was there.
+    """
+    ensure_snapshot_tables()
+    tickers = vol_df["ticker"].unique().tolist()
+    fingerprints = source_fingerprints(tickers) if tickers else {}
+    with writer_engine.begin() as conn:
+        for table in ("volatility_snapshot", "weights_snapshot", "snapshot_meta"):
+            conn.execute(text(f"DELETE FROM {table} WHERE window = :window"), {"window": window})
+        write_volatility(conn, vol_df, window)
+        write_meta(conn, fingerprints, window)
+        rebuild_weights(conn, window)
+    build_weights_store(window)
+
+# === READS ===
+
+def read_volatility(ticker: str, window: int = DEFAULT_WINDOW, points: int = 30) -> list:
+    """
+    Most recent `points` snapshot values for a ticker, oldest first.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT date, volatility FROM volatility_snapshot
+            WHERE ticker = :ticker AND window = :window
+            ORDER BY date DESC
+            LIMIT :points
+        """), {"ticker": ticker, "window": window, "points": points}).fetchall()
+    return [{"date": d, "volatility": v} for d, v in reversed(rows)]
+
+
+def read_weights(date: str, window: int = DEFAULT_WINDOW) -> list:
+    """
+    Weights for one date ordered by weight, or [] if not materialized.
+    """
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT ticker, volatility, weight FROM weights_snapshot
+                WHERE date = :date AND window = :window
+                ORDER BY weight DESC
+            """), {"date": date, "window": window}).fetchall()
+    except OperationalError:
+        return []
+    return [{"ticker": t, "volatility": v, "weight": w} for t, v, w in rows]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Materialize volatility and weights snapshots.")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--full", action="store_true", help="rebuild every ticker, not just stale ones")
+    args = parser.parse_args()
+
+    start = time.time()
+    print(f"🔍  Refreshing snapshots (window={args.window})...")
+    stats = refresh_snapshots(args.window, full=args.full)
+    print(f"✅  Refreshed {stats['refreshed']} tickers ({stats['incremental']} from their first "
+          f"changed date), removed {stats['removed']} in {time.time() - start:.1f}s.")
@@ -0,0 +1,255 @@
+# app/services/volatility_engine.py
+
+import json
+import math
+import time
+from collections import deque
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import engine, writer_engine
+
+# === CONFIGURATION ===
+# Rolling state per (ticker, window) is persisted in the volatility_state table.
+# Each state holds the last `window` returns plus their running sum and sum of
+# squares, so appending a bar costs O(1) regardless of the ticker's history.
+DEFAULT_WINDOW = 30
+RECENT_POINTS = 30  # same tail length /api/volatility returns
+
+_table_ready = False
+
+
+class RollingVolatility:
+    """
+    Incremental rolling standard deviation of simple returns for one ticker.
+    Matches close.pct_change().rolling(window).std() (sample std, ddof=1).
+    """
+
+    def __init__(self, window: int, last_date: str = None, last_close: float = None,
+                 returns=(), recent=()):
+        self.window = window
+        self.last_date = last_date
+        self.last_close = last_close
+        self.returns = deque(returns, maxlen=window)
+        self.recent = deque(recent, maxlen=RECENT_POINTS)
+        # Rebuilt from the buffer on load so float drift never survives a restart
+        self.sum = math.fsum(self.returns)
+        self.sumsq = math.fsum(r * r for r in self.returns)
+
+    def update(self, date: str, close: float):
+        """
+        Append one bar and return the new volatility (None until the window fills).
+        """
+        if close is None or math.isnan(close):
+            return None
+        vol = None
+        if self.last_close:
+            r = close / self.last_close - 1
+            if len(self.returns) == self.window:
+                old = self.returns[0]
+                self.sum -= old
+                self.sumsq -= old * old
+            self.returns.append(r)
+            self.sum += r
+            self.sumsq += r * r
+            if len(self.returns) == self.window:
+                n = self.window
+                var = (self.sumsq - self.sum * self.sum / n) / (n - 1)
+                vol = math.sqrt(max(var, 0.0))
+                self.recent.append((str(date)[:10], vol))
+        self.last_date = date
+        self.last_close = close
+        return vol
+
+    @property
+    def volatility(self):
+        return self.recent[-1][1] if self.recent else None
+
+    def to_row(self, ticker: str) -> dict:
+        return {
+            "ticker": ticker,
+            "window": self.window,
+            "last_date": self.last_date,
+            "last_close": self.last_close,
+            "returns": np.asarray(self.returns, dtype=np.float64).tobytes(),
+            "recent": json.dumps(list(self.recent)),
+        }
+
+    @classmethod
+    def from_row(cls, row) -> "RollingVolatility":
+        return cls(
+            row.window, row.last_date, row.last_close,
+            returns=np.frombuffer(row.returns, dtype=np.float64).tolist(),
+            recent=[tuple(p) for p in json.loads(row.recent)],
+        )
+
+# === PERSISTENCE ===
+
+def ensure_state_table() -> None:
+    global _table_ready
+    if _table_ready:
+        return
+    with writer_engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS volatility_state (
+                ticker     TEXT    NOT NULL,
+                window     INTEGER NOT NULL,
+                last_date  TEXT,
+                last_close REAL,
+                returns    BLOB    NOT NULL,
+                recent     TEXT    NOT NULL,
+                PRIMARY KEY (ticker, window)
+            )
+        """))
+    _table_ready = True
+
+
+def load_states(window: int = DEFAULT_WINDOW, tickers: list = None) -> dict:
+    """
+    Load persisted states for a window as {ticker: RollingVolatility}.
+    """
+    ensure_state_table()
+    query = "SELECT * FROM volatility_state WHERE window = :window"
+    params = {"window": window}
+    if tickers is not None:
+        names = [f"t{i}" for i in range(len(tickers))]
+        query += f" AND ticker IN ({', '.join(':' + n for n in names)})"
+        params.update(zip(names, tickers))
+    with engine.connect() as conn:
+        rows = conn.execute(text(query), params).fetchall()
+    return {row.ticker: RollingVolatility.from_row(row) for row in rows}
+
+
+def save_states(states: dict) -> None:
+    if not states:
+        return
+    with writer_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO volatility_state (ticker, window, last_date, last_close, returns, recent)
+            VALUES (:ticker, :window, :last_date, :last_close, :returns, :recent)
+            ON CONFLICT(ticker, window) DO UPDATE SET
+                last_date  = excluded.last_date,
+                last_close = excluded.last_close,
+                returns    = excluded.returns,
+                recent     = excluded.recent
+        """), [state.to_row(ticker) for ticker, state in states.items()])
+
+
+def invalidate_states(conn, first_dates: dict) -> None:
+    """
+    Drop states that already folded in a bar on or after each ticker's first
+    changed date ({ticker: date}); bootstrap() re-seeds them from stock_data.
+    `conn` is the writer connection holding the rows' transaction.
+    """
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'volatility_state'"
+    )).first()
+    if not exists or not first_dates:
+        return
+    conn.execute(text("""
+        DELETE FROM volatility_state
+        WHERE EXISTS (
+            SELECT 1 FROM json_each(:changes) AS c
+            WHERE c.key = volatility_state.ticker AND volatility_state.last_date >= c.value
+        )
+    """), {"changes": json.dumps({t: str(d)[:10] for t, d in first_dates.items()})})
+
+
+def get_state(ticker: str, window: int = DEFAULT_WINDOW):
+    """
+    Return the persisted state for one ticker, or None.
+    Read-only: a missing state table simply means no state yet.
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT * FROM volatility_state WHERE ticker = :ticker AND window = :window
+            """), {"ticker": ticker, "window": window}).fetchone()
+    except OperationalError:
+        return None
+    return RollingVolatility.from_row(row) if row else None
+
+# === UPDATES ===
+
+def append_bars(bars, window: int = DEFAULT_WINDOW, states: dict = None) -> dict:
+    """
+    Apply (ticker, date, close) bars, ordered by date within each ticker,
+    to the persisted states. Each bar costs O(1). Returns the touched states.
+    """
+    if states is None:
+        bars = list(bars)
+        states = load_states(window, sorted({b[0] for b in bars}))
+    touched = {}
+    for ticker, date, close in bars:
+        state = states.get(ticker)
+        if state is None:
+            state = states[ticker] = RollingVolatility(window)
+        if state.last_date is not None and str(date) <= str(state.last_date):
+            continue  # already applied
+        state.update(date, close)
+        touched[ticker] = state
+    save_states(touched)
+    return touched
+
+
+def refresh(window: int = DEFAULT_WINDOW) -> int:
+    """
+    Nightly refresh: pull only bars newer than each ticker's persisted state
+    (an index range seek per ticker) and fold them in.
+    Returns the number of tickers updated.
+    """
+    ensure_state_table()
+    states = load_states(window)
+    with engine.connect() as conn:
+        bars = conn.execute(text("""
+            SELECT s.ticker, s.date, s.close
+            FROM volatility_state v
+            JOIN stock_data s ON s.ticker = v.ticker AND s.date > v.last_date
+            WHERE v.window = :window
+            ORDER BY s.ticker, s.date
+        """), {"window": window}).fetchall()
+    return len(append_bars(bars, window, states))
+
+
+def bootstrap(window: int = DEFAULT_WINDOW, tickers: list = None) -> int:
+    """
+    Seed states for tickers that have none yet. Only the last
+    window + RECENT_POINTS bars are replayed per ticker.
+    """
+    ensure_state_table()
+    existing = set(load_states(window))
+    seed = window + RECENT_POINTS + 1
+    with engine.connect() as conn:
+        if tickers is None:
+            tickers = [row[0] for row in conn.execute(text("SELECT DISTINCT ticker FROM stock_data"))]
+        states = {}
+        for ticker in tickers:
+            if ticker in existing:
+                continue
+            rows = conn.execute(text("""
+                SELECT date, close FROM stock_data
+                WHERE ticker = :ticker
+                ORDER BY date DESC
+                LIMIT :n
+            """), {"ticker": ticker, "n": seed}).fetchall()
+            state = RollingVolatility(window)
+            for date, close in reversed(rows):
+                state.update(date, close)
+            states[ticker] = state
+    save_states(states)
+    return len(states)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Update persisted rolling volatility state.")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--bootstrap", action="store_true", help="seed tickers without state")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.bootstrap:
+        print(f"🌱  Seeded {bootstrap(args.window)} tickers (window={args.window}).")
+    print(f"🔄  Updated {refresh(args.window)} tickers (window={args.window}).")
+    print(f"✅  Done in {time.time() - start:.1f}s.")
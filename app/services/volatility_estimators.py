@@ -0,0 +1,137 @@
+# app/services/volatility_estimators.py
+
+import numpy as np
+import pandas as pd
+
+# === CONFIGURATION ===
+# Rolling volatility estimators over OHLC bars, all computed from one set of
+# shared log-range terms. Results are daily (not annualized) like the existing
+# close-to-close figures:
+#   close           std of simple close-to-close returns (the historical default)
+#   parkinson       high/low range
+#   garman_klass    high/low range plus open-to-close
+#   rogers_satchell drift-independent range estimator
+#   yang_zhang      overnight + open-to-close + Rogers-Satchell, weighted
+#   ewma            RiskMetrics exponentially weighted variance of returns
+ESTIMATORS = ("close", "parkinson", "garman_klass", "rogers_satchell", "yang_zhang", "ewma")
+EWMA_LAMBDA = 0.94
+EWMA_WARMUP = 250  # extra bars fetched so the EWMA recursion has converged
+
+# Bars each estimator needs before its first value: return-based ones also
+# need the previous close.
+_LAG = {"close": 1, "parkinson": 0, "garman_klass": 0, "rogers_satchell": 0, "yang_zhang": 1, "ewma": 1}
+
+def history_needed(estimator: str, window: int, points: int) -> int:
+    """
+    Bars to read so the last `points` values match a full-history run
+    (for EWMA, up to the weight left on bars older than the warmup).
+    """
+    extra = EWMA_WARMUP if estimator == "ewma" else 0
+    return window + points + _LAG[estimator] + extra
+
+# === ROLLING HELPERS ===
+
+def _positions(n: int, starts: np.ndarray = None) -> np.ndarray:
+    """
+    Index of each bar within its ticker (starts marks each ticker's first bar).
+    """
+    idx = np.arange(n)
+    if starts is None:
+        return idx
+    first = np.maximum.accumulate(np.where(starts, idx, 0))
+    return idx - first
+
+
+def _rolling_sums(x: np.ndarray, window: int):
+    """
+    Window sums of x and x**2 plus the NaN count, aligned to the window's last bar.
+    """
+    nan = np.isnan(x)
+    filled = np.where(nan, 0.0, x)
+    out = []
+    for series in (filled, filled * filled, nan.astype(np.int64)):
+        cs = np.concatenate(([0], np.cumsum(series)))
+        s = np.full(len(x), np.nan if series.dtype.kind == "f" else 0, dtype=series.dtype)
+        if len(x) >= window:
+            s[window - 1:] = cs[window:] - cs[:-window]
+        out.append(s)
+    return out
+
+
+def _rolling_mean(x, window, valid):
+    total, _, nans = _rolling_sums(x, window)
+    return np.where(valid & (nans == 0), total / window, np.nan)
+
+
+def _rolling_var(x, window, valid):
+    total, total_sq, nans = _rolling_sums(x, window)
+    var = (total_sq - total * total / window) / (window - 1)
+    return np.where(valid & (nans == 0), np.maximum(var, 0.0), np.nan)
+
+# === ESTIMATORS ===
+
+def compute_estimators(open_, high, low, close, window: int = 30, estimators=ESTIMATORS,
+                       starts: np.ndarray = None, ewma_lambda: float = EWMA_LAMBDA) -> dict:
+    """
+    Rolling volatility for each requested estimator, aligned to the input bars
+    (NaN until a full window is available). Arrays may hold several tickers
+    back to back, with `starts` marking each ticker's first bar.
+    """
+    unknown = set(estimators) - set(ESTIMATORS)
+    if unknown:
+        raise ValueError(f"Unknown estimator(s): {', '.join(sorted(unknown))}")
+    if window < 2:
+        raise ValueError("window must be at least 2")
+    o, h, l, c = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    n = len(c)
+    pos = _positions(n, starts)
+    first = pos == 0
+
+    prev_close = np.concatenate(([np.nan], c[:-1]))
+    prev_close[first] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = c / prev_close - 1
+        log_ho, log_lo, log_co = np.log(h / o), np.log(l / o), np.log(c / o)
+        log_hl = log_ho - log_lo
+        overnight = np.log(o / prev_close)
+    rs = log_ho * (log_ho - log_co) + log_lo * (log_lo - log_co)
+
+    valid = {lag: pos >= window - 1 + lag for lag in (0, 1)}
+    out = {}
+    for name in estimators:
+        if name == "close":
+            var = _rolling_var(ret, window, valid[1])
+        elif name == "parkinson":
+            var = _rolling_mean(log_hl ** 2, window, valid[0]) / (4 * np.log(2))
+        elif name == "garman_klass":
+            gk = 0.5 * log_hl ** 2 - (2 * np.log(2) - 1) * log_co ** 2
+            var = np.maximum(_rolling_mean(gk, window, valid[0]), 0.0)
+        elif name == "rogers_satchell":
+            var = _rolling_mean(rs, window, valid[0])
+        elif name == "yang_zhang":
+            k = 0.34 / (1.34 + (window + 1) / (window - 1))
+            var = (_rolling_var(overnight, window, valid[1])
+                   + k * _rolling_var(log_co, window, valid[1])
+                   + (1 - k) * _rolling_mean(rs, window, valid[1]))
+        else:  # ewma: var_t = lambda * var_{t-1} + (1 - lambda) * r_t^2, restarted per ticker
+            squared = pd.Series(ret * ret)
+            ewm_args = dict(alpha=1 - ewma_lambda, adjust=False, min_periods=window)
+            if starts is None:
+                var = squared.ewm(**ewm_args).mean().to_numpy()
+            else:
+                var = squared.groupby(np.cumsum(first)).ewm(**ewm_args).mean().to_numpy()
+        out[name] = np.sqrt(var)
+    return out
+
+
+def estimate_frame(df: pd.DataFrame, window: int = 30, estimators=ESTIMATORS) -> pd.DataFrame:
+    """
+    Apply compute_estimators to a long (ticker, date, open, high, low, close)
+    frame. Returns ticker, date and one column per estimator, sorted by ticker and date.
+    """
+    df = df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+    tickers = df["ticker"].to_numpy()
+    starts = np.r_[True, tickers[1:] != tickers[:-1]] if len(df) else np.zeros(0, dtype=bool)
+    values = compute_estimators(df["open"], df["high"], df["low"], df["close"],
+                                window, estimators, starts=starts)
+    return pd.concat([df[["ticker", "date"]], pd.DataFrame(values)], axis=1)
@@ -0,0 +1,265 @@
+# app/services/weights_store.py
+
+import os
+import re
+import json
+import mmap
+import struct
+import time
+import datetime
+import numpy as np
+from sqlalchemy import text
+from app.database import engine, DB_PATH
+
+# === CONFIGURATION ===
+# One binary file per window holding every date's weights:
+#   [records][date index][ticker names][trailer]
+# Records are (ticker id int32, volatility float32, weight float32), grouped by
+# date (ascending) and ordered by weight within a date. The date index holds
+# (day number, record offset, record count) per date, so a lookup is a binary
+# search on a small array plus one slice of the memory-mapped file.
+# Weights are volatility over the date's total, so each date's records are also
+# its volatility ranking: top/bottom-N are slices from either end and a
+# ticker's rank is its position within the date.
+# Rebuilt from weights_snapshot by app/services/snapshots.py after every refresh.
+STORE_DIR = os.path.join(os.path.dirname(DB_PATH), "weights_store")
+
+MAGIC = b"RRW1"
+TRAILER = struct.Struct("<4sIIQQQ")  # magic, window, dates, index offset, names offset, names length
+RECORD = np.dtype([("ticker", "<i4"), ("volatility", "<f4"), ("weight", "<f4")])
+INDEX = np.dtype([("day", "<i4"), ("offset", "<i8"), ("count", "<i4")])
+FETCH_ROWS = 100_000
+DAY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ].*)?")
+EPOCH = datetime.date(1970, 1, 1)
+
+def store_path(window: int, store_dir: str = STORE_DIR) -> str:
+    return os.path.join(store_dir, f"weights_w{window}.bin")
+
+def parse_day(date) -> int:
+    """
+    Day number of a 'YYYY-MM-DD' (or longer ISO) date, None if it does not parse.
+    Strict: "today", "2024" or "NaT" are rejected rather than read as some day.
+    """
+    date = str(date)
+    if not DAY_PATTERN.fullmatch(date):
+        return None
+    try:
+        return (datetime.date.fromisoformat(date[:10]) - EPOCH).days
+    except ValueError:
+        return None
+
+# === BUILD ===
+
+def build_weights_store(window: int, store_dir: str = STORE_DIR) -> dict:
+    """
+    Stream weights_snapshot for `window` into a fresh store file and swap it in.
+    Returns {"dates", "tickers", "records"}.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = store_path(window, store_dir)
+    tmp = f"{path}.tmp"
+
+    ids, index = {}, []
+    written = 0
+    with open(tmp, "wb") as f, engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(text("""
+            SELECT date, ticker, volatility, weight FROM weights_snapshot
+            WHERE window = :window
+            ORDER BY date, weight DESC
+        """), {"window": window})
+        for rows in result.partitions(FETCH_ROWS):
+            block = np.empty(len(rows), dtype=RECORD)
+            block["ticker"] = [ids.setdefault(r[1], len(ids)) for r in rows]
+            block["volatility"] = [r[2] for r in rows]
+            block["weight"] = [r[3] for r in rows]
+            days = np.array([r[0][:10] for r in rows], dtype="datetime64[D]").astype(np.int32)
+            # Dates may straddle partitions: extend the last index entry when they do
+            starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+            counts = np.diff(np.r_[starts, len(days)])
+            for s, n in zip(starts, counts):
+                if index and index[-1][0] == days[s]:
+                    index[-1][2] += int(n)
+                else:
+                    index.append([int(days[s]), written + int(s), int(n)])
+            f.write(block.tobytes())
+            written += len(block)
+
+        index_offset = f.tell()
+        f.write(np.array([tuple(e) for e in index], dtype=INDEX).tobytes())
+        names_offset = f.tell()
+        names = json.dumps(sorted(ids, key=ids.get)).encode()
+        f.write(names)
+        f.write(TRAILER.pack(MAGIC, window, len(index), index_offset, names_offset, len(names)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return {"dates": len(index), "tickers": len(ids), "records": written}
+
+# === READ ===
+
+class WeightsStore:
+    """
+    Read-only, memory-mapped view of one window's store file.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.window, n_dates, index_offset, names_offset, names_len = \
+            TRAILER.unpack_from(self._mm, len(self._mm) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a weights store")
+        index = np.frombuffer(self._mm, dtype=INDEX, count=n_dates, offset=index_offset)
+        self.days = index["day"].copy()
+        self.offsets = index["offset"].copy()
+        self.counts = index["count"].copy()
+        self.tickers = np.array(json.loads(self._mm[names_offset:names_offset + names_len]), dtype=object)
+        self._ids = {t: i for i, t in enumerate(self.tickers)}
+
+    def dates(self) -> list:
+        return [str(d) for d in self.days.astype("datetime64[D]")]
+
+    def locate(self, date: str, nearest: bool = False) -> int:
+        """
+        Index position of `date`, or of the latest date before it when nearest=True.
+        Returns None when there is no match or `date` is not a 'YYYY-MM-DD' date.
+        """
+        day = parse_day(date)
+        if day is None:
+            return None
+        i = int(np.searchsorted(self.days, day, side="right")) - 1
+        if i < 0 or (not nearest and self.days[i] != day):
+            return None
+        return i
+
+    def records(self, i: int) -> np.ndarray:
+        return np.frombuffer(self._mm, dtype=RECORD, count=int(self.counts[i]),
+                             offset=int(self.offsets[i]) * RECORD.itemsize)
+
+    def date_at(self, i: int) -> str:
+        return str(self.days[i].astype("datetime64[D]"))
+
+    def ticker_id(self, ticker: str):
+        return self._ids.get(ticker)
+
+
+_stores = {}
+
+def get_weights_store(window: int, store_dir: str = STORE_DIR):
+    """
+    Shared store for `window`, reopened after a rebuild; None if never built.
+    """
+    path = store_path(window, store_dir)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        _stores.pop(path, None)
+        return None
+    cached = _stores.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, WeightsStore(path))
+        _stores[path] = cached
+    return cached[1]
+
+
+def store_version(window: int, store_dir: str = STORE_DIR):
+    """
+    mtime of the window's store file (None if never built); every rebuild swaps in a new file.
+    """
+    try:
+        return os.stat(store_path(window, store_dir)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_weights(date: str, window: int = 30, nearest: bool = False):
+    """
+    Weights for `date` (or the closest earlier date with nearest=True).
+    Returns (served_date, [{"ticker", "volatility", "weight"}, ...]) or None.
+    """
+    store = get_weights_store(window)
+    if store is None:
+        return None
+    i = store.locate(date, nearest)
+    if i is None:
+        return None
+    rec = store.records(i)
+    tickers = store.tickers[rec["ticker"]]
+    return store.date_at(i), [
+        {"ticker": t, "volatility": float(v), "weight": float(w)}
+        for t, v, w in zip(tickers, rec["volatility"], rec["weight"])
+    ]
+
+
+def _locate_or_latest(store, date, nearest: bool = True):
+    if date is None:
+        return len(store.days) - 1 if len(store.days) else None
+    return store.locate(date, nearest)
+
+
+def top_volatility(date: str = None, n: int = 10, order: str = "desc", window: int = 30):
+    """
+    The n most (order="desc") or least ("asc") volatile tickers on the trading
+    day on or before `date` (latest when None).
+    Returns (served_date, [{"rank", "ticker", "volatility", "weight"}, ...]) or None.
+    """
+    store = get_weights_store(window)
+    if store is None:
+        return None
+    i = _locate_or_latest(store, date)
+    if i is None:
+        return None
+    rec = store.records(i)
+    total = len(rec)
+    if order == "asc":
+        picked, ranks = rec[::-1][:n], range(total, total - min(n, total), -1)
+    else:
+        picked, ranks = rec[:n], range(1, min(n, total) + 1)
+    tickers = store.tickers[picked["ticker"]]
+    return store.date_at(i), [
+        {"rank": r, "ticker": t, "volatility": float(v), "weight": float(w)}
+        for r, t, v, w in zip(ranks, tickers, picked["volatility"], picked["weight"])
+    ]
+
+
+def volatility_percentile(ticker: str, date: str = None, window: int = 30):
+    """
+    Where a ticker's volatility ranks on the trading day on or before `date`.
+    rank 1 is the most volatile; percentile is the share of tickers at or below it.
+    Returns None when the store, the date or the ticker is missing.
+    """
+    store = get_weights_store(window)
+    if store is None:
+        return None
+    i = _locate_or_latest(store, date)
+    tid = store.ticker_id(ticker)
+    if i is None or tid is None:
+        return None
+    rec = store.records(i)
+    hits = np.flatnonzero(rec["ticker"] == tid)
+    if not len(hits):
+        return None
+    pos, total = int(hits[0]), len(rec)
+    return {
+        "ticker": ticker,
+        "date": store.date_at(i),
+        "window": window,
+        "volatility": float(rec["volatility"][pos]),
+        "rank": pos + 1,
+        "count": total,
+        "percentile": round(100.0 * (total - pos) / total, 4),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the binary weights store from weights_snapshot.")
+    parser.add_argument("--window", type=int, default=30)
+    args = parser.parse_args()
+
+    start = time.time()
+    stats = build_weights_store(args.window)
+    size = os.path.getsize(store_path(args.window))
+    print(f"✅  Stored {stats['records']} weights for {stats['dates']} dates "
+          f"({stats['tickers']} tickers, {size / 1e6:.1f} MB) in {time.time() - start:.1f}s.")
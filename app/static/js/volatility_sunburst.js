@@ -4,8 +4,13 @@ let maxW = 0;
 const DATE = "2025-04-25";
 
 function preload() {
-  // load your JSON weights array:
-  weights = loadJSON(`/api/weights/${DATE}`, wrap);
+  // load your JSON weights array, from its precompressed, content-hashed
+  // payload URL when one is published:
+  const fallback = `/api/weights/${DATE}`;
+  loadJSON("/api/payloads", manifest => {
+    const entry = manifest[`weights_${DATE}.json`];
+    loadJSON(entry ? entry.url : fallback, wrap);
+  }, () => loadJSON(fallback, wrap));
 }
 
 function wrap(data) {
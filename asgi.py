@@ -0,0 +1,5 @@
+# asgi.py
+# Async serving mode: uvicorn asgi:app (lanes and limits in app/async_bridge.py)
+from app.async_bridge import create_asgi_app
+
+app = create_asgi_app()
@@ -2,14 +2,32 @@
 
 import pandas as pd
 import os
+import json
+import hashlib
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from io import StringIO  # For future-proofing warning
 
 # === CONFIGURATION ===
+# Sources are fetched in parallel over one pooled session. Each response's
+# ETag / Last-Modified is kept in CACHE_DIR with the page body, so the next run
+# sends a conditional request and a 304 (or an identical body) skips parsing.
+# The cache entry is only written once the page has been parsed and its CSV
+# saved, so a page the parser rejects is fetched and parsed again next run.
+# The combine/clean steps only rerun when at least one list changed.
+# Any URL can be overridden with RISKRADAR_TICKER_URL_<NAME>, e.g.
+#   RISKRADAR_TICKER_URL_DOW30=http://localhost:8000/dow30.html
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_DIR = os.path.join(BASE_DIR, "data")
+CACHE_DIR = os.path.join(DATA_DIR, ".http_cache")
+
+TIMEOUT = (5, 30)  # connect, read (seconds)
+RETRIES = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+USER_AGENT = "RiskRadar ticker-list updater"
 
 SOURCES = {
     "nasdaq100": {
@@ -26,58 +44,185 @@ SOURCES = {
     }
 }
 
-# === FUNCTIONS ===
-
-def fetch_nasdaq100_tickers(url: str) -> list:
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
+# === HTTP ===
+
+_session = None
+
+def get_session() -> requests.Session:
+    """
+    Shared session: keep-alive connections, retries with backoff.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(SOURCES), pool_maxsize=len(SOURCES), max_retries=RETRIES)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+        _session.headers["User-Agent"] = USER_AGENT
+    return _session
+
+
+def source_url(name: str) -> str:
+    return os.environ.get(f"RISKRADAR_TICKER_URL_{name.upper()}", SOURCES[name]["url"])
+
+
+def _cache_paths(name: str) -> tuple:
+    return os.path.join(CACHE_DIR, f"{name}.json"), os.path.join(CACHE_DIR, f"{name}.html")
+
+
+def fetch_page(name: str, url: str, force: bool = False) -> tuple:
+    """
+    Conditional GET against the on-disk cache.
+    Returns (html, changed, entry); changed is False for a 304 or an unchanged
+    body, and entry is the cache record to pass to save_page (None for a 304).
+    """
+    meta_path, body_path = _cache_paths(name)
+    meta = {}
+    if not force and os.path.exists(meta_path) and os.path.exists(body_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("url") != url:
+            meta = {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = get_session().get(url, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 304 and meta:
+        with open(body_path, encoding="utf-8") as f:
+            return f.read(), False, None
+    response.raise_for_status()
+
+    html = response.text
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    entry = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": digest,
+    }
+    return html, digest != meta.get("sha256"), entry
+
+
+def save_page(name: str, html: str, entry: dict) -> None:
+    """
+    Cache a page body and its validators for the next conditional request.
+    """
+    meta_path, body_path = _cache_paths(name)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(f"{body_path}.tmp", "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(f"{body_path}.tmp", body_path)
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump(entry, f)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+# === PARSERS ===
+
+def parse_nasdaq100_tickers(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
     table = soup.find("table", {"id": "constituents"})
     df = pd.read_html(StringIO(str(table)))[0]
     tickers = df['Ticker'].dropna().tolist()
     print(f"✅ Found {len(tickers)} NASDAQ-100 tickers.")
     return tickers
 
-def fetch_dow30_tickers(url: str) -> list:
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
+def parse_dow30_tickers(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
     table = soup.find("table", {"id": "constituents"})
     df = pd.read_html(StringIO(str(table)))[0]
     tickers = df['Symbol'].dropna().tolist()
     print(f"✅ Found {len(tickers)} Dow 30 tickers.")
     return tickers
 
-def fetch_russell2000_tickers(url: str) -> list:
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
+def parse_russell2000_tickers(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
     tables = soup.find_all("table")
     df = pd.read_html(StringIO(str(tables[0])))[0]  # Take first big table
     tickers = df['Ticker'].dropna().tolist()
     print(f"✅ Found {len(tickers)} Russell 2000 tickers.")
     return tickers
 
+PARSERS = {
+    "nasdaq100": parse_nasdaq100_tickers,
+    "dow30": parse_dow30_tickers,
+    "russell2000": parse_russell2000_tickers,
+}
+
+# === FUNCTIONS ===
+
 def save_tickers(tickers: list, path: str):
     df = pd.DataFrame({"ticker": tickers})
     df.to_csv(path, index=False)
     print(f"📄 Saved {len(tickers)} tickers to {os.path.basename(path)}.")
 
-def update_all_indices():
+def refresh_source(name: str, force: bool = False) -> bool:
+    """
+    Fetch one source and rewrite its CSV if the page changed. Returns changed.
+    """
+    csv_path = SOURCES[name]["csv_path"]
+    html, changed, entry = fetch_page(name, source_url(name), force)
+    if not changed and os.path.exists(csv_path):
+        print(f"⏭️  {name}: unchanged, skipped.")
+        if entry is not None:
+            save_page(name, html, entry)  # same body, possibly new validators
+        return False
+    save_tickers(PARSERS[name](html), csv_path)
+    if entry is not None:
+        save_page(name, html, entry)
+    return True
+
+def run_downstream(changed: list):
+    """
+    Rebuild the derived lists after a source changed.
+    """
+    from data_sources.combine_all_tickers import combine_all_tickers
+    from app.services.clean_master_tickers import clean_master_tickers
+
+    print(f"🔁 Rebuilding master list ({', '.join(changed)} changed)...")
+    combine_all_tickers()
+    clean_master_tickers()
+
+def update_all_indices(force: bool = False, downstream: bool = True) -> list:
+    """
+    Refresh every source concurrently. Returns the names that changed.
+    """
     print("🚀 Updating ticker lists...")
 
-    # NASDAQ-100
-    nasdaq100_tickers = fetch_nasdaq100_tickers(SOURCES['nasdaq100']['url'])
-    save_tickers(nasdaq100_tickers, SOURCES['nasdaq100']['csv_path'])
-
-    # Dow 30
-    dow30_tickers = fetch_dow30_tickers(SOURCES['dow30']['url'])
-    save_tickers(dow30_tickers, SOURCES['dow30']['csv_path'])
-
-    # Russell 2000
-    russell2000_tickers = fetch_russell2000_tickers(SOURCES['russell2000']['url'])
-    save_tickers(russell2000_tickers, SOURCES['russell2000']['csv_path'])
-
-    print("\n🏁 ✅ Ticker lists updated successfully.")
+    with ThreadPoolExecutor(max_workers=len(SOURCES)) as pool:
+        futures = {name: pool.submit(refresh_source, name, force) for name in SOURCES}
+    failed = []
+    changed = []
+    for name, future in futures.items():
+        try:
+            if future.result():
+                changed.append(name)
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            print(f"❌ {name}: {e}")
+            failed.append(name)
+
+    if changed and downstream:
+        run_downstream(changed)
+
+    if failed:
+        print(f"\n⚠️ Ticker lists updated with errors ({', '.join(failed)} failed).")
+    elif changed:
+        print(f"\n🏁 ✅ Ticker lists updated successfully ({', '.join(changed)} changed).")
+    else:
+        print("\n🏁 ✅ Ticker lists already up to date.")
+    return changed
 
 # === MAIN EXECUTION ===
 
 if __name__ == "__main__":
-    update_all_indices()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Refresh index constituent lists.")
+    parser.add_argument("--force", action="store_true", help="ignore the HTTP cache and re-parse every page")
+    parser.add_argument("--no-downstream", action="store_true", help="skip the combine/clean steps")
+    args = parser.parse_args()
+
+    update_all_indices(force=args.force, downstream=not args.no_downstream)
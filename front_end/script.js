@@ -64,10 +64,26 @@ function initColorScale() {
         .style("fill", "url(#color-gradient)");
 }
 
+// Published payloads are precompressed and served from content-hashed,
+// cache-forever URLs; the manifest maps each file name to its current URL
+let manifest = null;
+
+async function payloadUrl(name, fallback) {
+    if (manifest === null) {
+        try {
+            const resp = await fetch("/api/payloads");
+            manifest = resp.ok ? await resp.json() : {};
+        } catch (e) {
+            manifest = {};
+        }
+    }
+    return manifest[name] ? manifest[name].url : fallback;
+}
+
 // Update visualization with new data
 async function updateViz() {
     const date = document.getElementById("date-select").value;
-    const resp = await fetch(`/api/weights/${date}`);
+    const resp = await fetch(await payloadUrl(`weights_${date}.json`, `/api/weights/${date}`));
     const data = await resp.json();
     currentData = data;
 
@@ -0,0 +1,128 @@
+# scripts/bench_data_access.py
+
+import os
+import json
+import sqlite3
+import random
+import shutil
+import tempfile
+import threading
+import time
+import argparse
+from contextlib import closing
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from scripts.synthetic_db import build_synthetic_db
+
+# === CONFIGURATION ===
+# Compares the old per-module `create_engine(sqlite:///...)` setup with the
+# tuned engines from app.database: reader threads hammer the history query
+# while a maintenance writer commits batches alongside them.
+HISTORY_QUERY = text("""
+    SELECT date, open, high, low, close, volume
+    FROM stock_data
+    WHERE ticker = :ticker
+    ORDER BY date DESC
+    LIMIT 100
+""")
+WRITE_QUERY = text("UPDATE stock_data SET volume = volume WHERE ticker = :ticker")
+
+# === FUNCTIONS ===
+
+def run_scenario(reader, writer, tickers: list, threads: int, seconds: float,
+                 with_writer: bool) -> dict:
+    latencies, errors = [], []
+    stop = time.perf_counter() + seconds
+    lock = threading.Lock()
+
+    def read_loop():
+        local, failed = [], 0
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            try:
+                with reader.connect() as conn:
+                    conn.execute(HISTORY_QUERY, {"ticker": random.choice(tickers)}).fetchall()
+                local.append(time.perf_counter() - t0)
+            except Exception:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    def write_loop():
+        while time.perf_counter() < stop:
+            with writer.begin() as conn:
+                for ticker in random.sample(tickers, min(20, len(tickers))):
+                    conn.execute(WRITE_QUERY, {"ticker": ticker})
+            time.sleep(0.01)
+
+    workers = [threading.Thread(target=read_loop) for _ in range(threads)]
+    if with_writer:
+        workers.append(threading.Thread(target=write_loop))
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    lat = np.array(latencies) * 1000
+    return {
+        "reads_per_sec": round(len(lat) / seconds, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+        "p99_ms": round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+        "errors": int(sum(errors)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark default vs tuned SQLite access.")
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="riskradar_bench_")
+    try:
+        base_path = os.path.join(workdir, "baseline.db")
+        stats = build_synthetic_db(base_path, args.tickers, args.years)
+        tuned_path = os.path.join(workdir, "tuned.db")
+        shutil.copy(base_path, tuned_path)
+        print(f"🧪 Synthetic database: {stats['rows']} rows, {stats['tickers']} tickers")
+
+        os.environ["RISKRADAR_DB_PATH"] = tuned_path
+        from app.database import create_reader_engine, create_writer_engine
+
+        with closing(sqlite3.connect(base_path)) as c:
+            tickers = [r[0] for r in c.execute("SELECT DISTINCT ticker FROM stock_data")]
+
+        setups = {
+            "before": lambda: (create_engine(f"sqlite:///{base_path}"),) * 2,
+            "after": lambda: (create_reader_engine(tuned_path), create_writer_engine(tuned_path)),
+        }
+        results = {"config": vars(args) | stats}
+        for name, make in setups.items():
+            reader, writer = make()
+            with writer.begin() as conn:
+                conn.execute(text("SELECT 1"))  # let the writer apply its PRAGMAs first
+            results[name] = {
+                "reads_only": run_scenario(reader, writer, tickers, args.threads, args.seconds, False),
+                "reads_with_writer": run_scenario(reader, writer, tickers, args.threads, args.seconds, True),
+            }
+            reader.dispose()
+            writer.dispose()
+            for scenario, r in results[name].items():
+                print(f"{name:>6} {scenario:<18} {r['reads_per_sec']:>9} reads/s  "
+                      f"p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  errors {r['errors']}")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"📄 Saved results to {args.output}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# scripts/bench_parallel_volatility.py
+
+import os
+import json
+import shutil
+import tempfile
+import time
+import argparse
+
+from scripts.synthetic_db import build_synthetic_db
+
+# === CONFIGURATION ===
+# Times compute_rolling_volatility_parallel at 1..N workers on a synthetic
+# database and checks every run against the single-process result.
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded rolling volatility scaling.")
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--window", type=int, default=30)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="riskradar_bench_")
+    try:
+        db_path = os.path.join(workdir, "bench.db")
+        stats = build_synthetic_db(db_path, args.tickers, args.years)
+        print(f"🧪 Synthetic database: {stats['rows']} rows, {stats['tickers']} tickers")
+
+        os.environ["RISKRADAR_DB_PATH"] = db_path
+        from app.services.parallel_volatility import compute_rolling_volatility_parallel
+
+        counts = sorted({1, 2, 4, 8, 16, 32, args.max_workers} & set(range(1, args.max_workers + 1)))
+        results = {"config": vars(args) | stats, "runs": []}
+        baseline, base_time = None, None
+        for workers in counts:
+            start = time.perf_counter()
+            vol_df = compute_rolling_volatility_parallel(args.window, workers, db_path)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline, base_time = vol_df, elapsed
+            identical = vol_df.equals(baseline)
+            results["runs"].append({
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "speedup": round(base_time / elapsed, 2),
+                "identical": identical,
+            })
+            print(f"{workers:>3} workers  {elapsed:8.2f}s  speedup {base_time / elapsed:5.2f}x  "
+                  f"{'✅ identical' if identical else '❌ differs'}")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"📄 Saved results to {args.output}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# scripts/bench_suite.py
+
+import os
+import io
+import sys
+import json
+import shutil
+import importlib
+import platform
+import tempfile
+import subprocess
+import time
+import tracemalloc
+import argparse
+import resource
+from contextlib import redirect_stdout
+from functools import partial
+import numpy as np
+
+from scripts.synthetic_db import build_synthetic_db
+
+# === CONFIGURATION ===
+# End-to-end benchmark on a synthetic stock_data database of configurable size:
+#   services  - explorer steps and store/snapshot builders, run in-process
+#   endpoints - every API route through the Flask test client, with the
+#               response cache cleared before each request (cold) and kept (warm)
+# Each entry records latency percentiles over the timed runs plus the traced
+# peak allocation of one extra run (tracemalloc slows code, so it is kept out of
+# the timings). Results are written as JSON; --compare prints the change
+# against an earlier results file, e.g. one saved at another commit. Steps and
+# routes whose modules do not exist in the checked-out tree are skipped (and
+# listed under "skipped"), so the same suite runs at older commits.
+PERCENTILES = (50, 95, 99)
+SAMPLE_TICKERS = 10
+
+# === MEASUREMENT ===
+
+def measure(fn, iterations: int, setup=None) -> dict:
+    """
+    Time `fn` over `iterations` runs (after `setup`, untimed), then trace one more run.
+    """
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    with redirect_stdout(io.StringIO()):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = np.array(timings)
+    result = {f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES}
+    result.update({
+        "mean_ms": round(float(ms.mean()), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "iterations": iterations,
+        "peak_mb": round(peak / 1e6, 2),
+    })
+    return result
+
+
+def _report(section: str, name: str, r: dict) -> None:
+    print(f"  {section:<9} {name:<52} p50 {r['p50_ms']:>10.2f} ms  p95 {r['p95_ms']:>10.2f} ms  "
+          f"peak {r['peak_mb']:>8.1f} MB")
+
+
+def _load(path: str):
+    """
+    "package.module" or "package.module:attr" if it exists in this checkout, else None.
+    """
+    module, _, attr = path.partition(":")
+    try:
+        loaded = importlib.import_module(module)
+    except ImportError:
+        return None
+    return getattr(loaded, attr, None) if attr else loaded
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# === SUITES ===
+
+def bench_services(workdir: str, iterations: int, skipped: list) -> dict:
+    explorer = _load("app.services.database_explorer")
+    publish = _load("app.services.payloads:publish")
+    if publish is not None and hasattr(explorer, "publish"):
+        # Exports go to the scratch directory, not app/data
+        explorer.publish = partial(publish, payload_dir=os.path.join(workdir, "payloads"))
+
+    results = {}
+
+    def run(name, fn, *needs, setup=None, n=iterations):
+        """
+        Time fn unless something it needs (see _load) is missing from this tree.
+        """
+        if any(need is None for need in needs):
+            skipped.append(name)
+            print(f"  service   {name:<52} skipped (not in this tree)")
+            return
+        results[name] = measure(fn, n, setup)
+        _report("service", name, results[name])
+
+    def ex(name):
+        return getattr(explorer, name, None)
+
+    with redirect_stdout(io.StringIO()):
+        df = explorer.get_all_data()
+        ret = explorer.compute_daily_returns(df)
+        vol_df = explorer.compute_rolling_volatility(ret, window=30)
+    latest = vol_df["date"].max()
+    latest_vol = vol_df[vol_df["date"] == latest]
+    ticker = str(df["ticker"].iloc[0])
+    year_ago = str(latest.date() - np.timedelta64(365, "D"))
+
+    parallel_volatility = _load("app.services.parallel_volatility:compute_rolling_volatility_parallel")
+    materialize_from_frame = _load("app.services.snapshots:materialize_from_frame")
+    refresh_snapshots = _load("app.services.snapshots:refresh_snapshots")
+    build_weights_store = _load("app.services.weights_store:build_weights_store")
+    build_price_store = _load("app.services.price_store:build_price_store")
+    build_covariance = _load("app.services.covariance:build_covariance")
+    get_covariance = _load("app.services.covariance:get_covariance")
+    export_parquet = _load("app.services.parquet_store:export_parquet")
+    read_prices = _load("app.services.parquet_store:read_prices")
+    reader = _load("app.services.database_reader")
+
+    run("explorer.get_all_data", explorer.get_all_data)
+    run("explorer.check_coverage_summary", lambda: explorer.check_coverage_summary(df))
+    run("explorer.check_records_per_date", lambda: explorer.check_records_per_date(df))
+    run("explorer.get_summary_statistics", lambda: explorer.get_summary_statistics(df))
+    run("explorer.check_missing_data", lambda: explorer.check_missing_data(df))
+    run("explorer.check_records_per_ticker", lambda: explorer.check_records_per_ticker(df))
+    run("explorer.check_reliability_scores", lambda: explorer.check_reliability_scores(df))
+    run("explorer.check_duplicate_ticker_dates", lambda: explorer.check_duplicate_ticker_dates(df))
+    run("explorer.compute_daily_returns", lambda: explorer.compute_daily_returns(df))
+    run("explorer.compute_rolling_volatility", lambda: explorer.compute_rolling_volatility(ret, window=30))
+    run("explorer.compute_rolling_volatility_parallel",
+        lambda: parallel_volatility(window=30, workers=os.cpu_count() or 1), parallel_volatility)
+    run("explorer.compute_estimator_volatility[yang_zhang]",
+        lambda: explorer.compute_estimator_volatility(df, window=30, estimator="yang_zhang"),
+        ex("compute_estimator_volatility"))
+    run("explorer.check_volatility_summary", lambda: explorer.check_volatility_summary(latest_vol, latest))
+    run("explorer.compute_volatility_weights", lambda: explorer.compute_volatility_weights(latest_vol, latest))
+    run("explorer.export_to_json[volatility]",
+        lambda: explorer.export_to_json(vol_df, os.path.join(workdir, "export", "volatility.json")))
+    run("snapshots.materialize_from_frame", lambda: materialize_from_frame(vol_df, window=30),
+        materialize_from_frame)
+    run("snapshots.refresh_snapshots[no-op]", lambda: refresh_snapshots(30), refresh_snapshots)
+    run("weights_store.build_weights_store", lambda: build_weights_store(30), build_weights_store)
+    run("price_store.build_price_store", lambda: build_price_store(), build_price_store)
+    run("covariance.build_covariance", lambda: build_covariance(window=60), build_covariance)
+    run("covariance.get_covariance", lambda: get_covariance(window=60), get_covariance)
+    run("parquet_store.export_parquet", lambda: export_parquet(), export_parquet)
+    run("parquet_store.read_prices[1 ticker, 1y]",
+        lambda: read_prices([ticker], year_ago, str(latest.date())), read_prices)
+    run("database_reader.get_all_data_for_ticker", lambda: reader.get_all_data_for_ticker(ticker), reader)
+    run("database_reader.get_recent_n_days", lambda: reader.get_recent_n_days(ticker, 30), reader)
+    return results
+
+
+def _sample(n: int) -> tuple:
+    """
+    (first n tickers, latest date) from the fastest source this tree has.
+    """
+    get_price_store = _load("app.services.price_store:get_price_store")
+    store = get_price_store() if get_price_store else None
+    if store is not None:
+        tickers = store.tickers()[:n]
+    else:
+        from sqlalchemy import text
+        from app.database import engine
+        with engine.connect() as conn:
+            tickers = [t for (t,) in conn.execute(text("SELECT DISTINCT ticker FROM stock_data LIMIT :n"), {"n": n})]
+    get_weights_store = _load("app.services.weights_store:get_weights_store")
+    weights = get_weights_store(30) if get_weights_store else None
+    if weights is not None and len(weights.days):
+        latest = weights.dates()[-1]
+    else:
+        from sqlalchemy import text
+        from app.database import engine
+        with engine.connect() as conn:
+            latest = str(conn.execute(text("SELECT MAX(date) FROM stock_data")).scalar())[:10]
+    return tickers, latest
+
+
+def bench_endpoints(requests: int, skipped: list) -> dict:
+    from werkzeug.exceptions import HTTPException
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    routes_here = app.url_map.bind("localhost")
+    response_cache = _load("app.cache:response_cache")
+    tickers, latest = _sample(SAMPLE_TICKERS)
+    ticker = tickers[0]
+    listed = ",".join(tickers)
+
+    routes = {
+        "/": "/",
+        "/api/ready": "/api/ready",
+        "/api/schema": "/api/schema",
+        "/api/cache/stats": "/api/cache/stats",
+        "/api/tickers": "/api/tickers",
+        "/api/history/<ticker>": f"/api/history/{ticker}",
+        "/api/volatility/<ticker>": f"/api/volatility/{ticker}",
+        "/api/volatility/<ticker>?estimator=yang_zhang": f"/api/volatility/{ticker}?estimator=yang_zhang",
+        "/api/volatility/<ticker>/percentile": f"/api/volatility/{ticker}/percentile",
+        "/api/volatility/top": "/api/volatility/top?n=50",
+        "/api/volatility/batch?tickers": f"/api/volatility/batch?tickers={listed}",
+        "/api/volatility/batch?index=dow30": "/api/volatility/batch?index=dow30",
+        "/api/weights/<date>": f"/api/weights/{latest}",
+        "/api/covariance": f"/api/covariance?tickers={listed}&window=60",
+        "/api/export/<ticker>": f"/api/export/{ticker}?format=csv",
+        "/api/export?start": f"/api/export?format=ndjson&start={latest}",
+        "/api/payloads": "/api/payloads",
+    }
+
+    results = {}
+    for name, url in routes.items():
+        try:
+            endpoint, _ = routes_here.match(url.split("?")[0])
+        except HTTPException:
+            endpoint = None
+        # /api/volatility/<ticker> also matches routes added later (top, batch)
+        if endpoint is None or (name.startswith("/api/volatility/") and "<ticker>" not in name
+                                and endpoint.endswith(".get_volatility")):
+            skipped.append(name)
+            print(f"  endpoint  {name:<52} skipped (no such route in this tree)")
+            continue
+        status = client.get(url).status_code
+        for mode, setup in (("cold", response_cache.clear if response_cache else None), ("warm", None)):
+            key = f"{name} [{mode}]"
+            results[key] = measure(lambda: client.get(url).get_data(), requests, setup) | {"status": status}
+            _report("endpoint", key, results[key])
+    return results
+
+# === COMPARISON ===
+
+def compare(current: dict, previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n📊 Change vs {previous_path} ({previous['meta']['commit']} -> {current['meta']['commit']}):")
+    for section in ("services", "endpoints"):
+        for name, r in current[section].items():
+            old = previous.get(section, {}).get(name)
+            if not old or not old["p50_ms"]:
+                continue
+            delta = 100.0 * (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"]
+            flag = "🔺" if delta > 10 else ("🔻" if delta < -10 else "  ")
+            print(f"  {flag} {name:<52} p50 {old['p50_ms']:>10.2f} -> {r['p50_ms']:>10.2f} ms ({delta:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint and explorer step on synthetic data.")
+    parser.add_argument("--tickers", type=int, default=500, help="e.g. 500 to 10000")
+    parser.add_argument("--years", type=int, default=5, help="e.g. 5 to 30")
+    parser.add_argument("--iterations", type=int, default=3, help="timed runs per service step")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per endpoint and mode")
+    parser.add_argument("--skip-services", action="store_true", help="only build stores and time endpoints")
+    parser.add_argument("--output", help="results JSON (default: bench_<commit>_<tickers>x<years>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="riskradar_bench_")
+    try:
+        db_path = os.path.join(workdir, "riskradar.db")
+        t0 = time.perf_counter()
+        stats = build_synthetic_db(db_path, args.tickers, args.years)
+        build_seconds = time.perf_counter() - t0
+        print(f"🧪 Synthetic database: {stats['rows']} rows, {stats['tickers']} tickers ({build_seconds:.1f}s)")
+
+        # Every app module reads RISKRADAR_DB_PATH at import time, so set it before importing any
+        os.environ["RISKRADAR_DB_PATH"] = db_path
+        commit = _git_commit()
+        results = {
+            "meta": {
+                "commit": commit,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "config": vars(args) | stats | {"build_seconds": round(build_seconds, 2)},
+            },
+        }
+
+        skipped = []
+        if args.skip_services:
+            # Build whatever stores this tree has, as the services run would
+            with redirect_stdout(io.StringIO()):
+                for path, call_args in (("app.services.price_store:build_price_store", ()),
+                                        ("app.services.snapshots:refresh_snapshots", (30, True)),
+                                        ("app.services.covariance:build_covariance", (None, 60))):
+                    build = _load(path)
+                    if build is not None:
+                        build(*call_args)
+            results["services"] = {}
+        else:
+            print("⏱️  Services")
+            results["services"] = bench_services(workdir, args.iterations, skipped)
+
+        print("⏱️  Endpoints")
+        results["endpoints"] = bench_endpoints(args.requests, skipped)
+        results["skipped"] = skipped
+        results["meta"]["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+        output = args.output or f"bench_{commit}_{args.tickers}x{args.years}.json"
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Saved results to {output}")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        if args.keep:
+            print(f"📁 Scratch directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# scripts/load_test.py
+
+import os
+import io
+import sys
+import json
+import random
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import subprocess
+import http.client
+import time
+import argparse
+from contextlib import redirect_stdout
+import numpy as np
+
+from scripts.synthetic_db import build_synthetic_db
+
+# === CONFIGURATION ===
+# Starts `gunicorn main:app` against a synthetic database once per worker
+# configuration and replays a dashboard-like request mix from closed-loop
+# clients at rising concurrency. Every level reports throughput, p50/p95/p99
+# latency and the error rate, overall and per endpoint. The summary lists the
+# highest concurrency each configuration sustained within the SLO.
+# The load generator runs on the same host, so it competes with the server
+# for CPU; compare configurations with each other rather than in absolute terms.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Share of requests per endpoint: the dashboard loads the ticker list once,
+# then mostly pulls history and volatility for individual tickers
+REQUEST_MIX = {
+    "tickers": 0.05,
+    "history": 0.35,
+    "volatility": 0.40,
+    "weights": 0.20,
+}
+DEFAULT_CONFIGS = "sync:1,sync:2,gthread:2x4"
+DEFAULT_CONCURRENCY = "1,2,4,8,16,32"
+READY_TIMEOUT = 60
+
+# === SERVER ===
+
+def parse_config(spec: str) -> dict:
+    """
+    'sync:2' -> 2 sync workers; 'gthread:2x4' -> 2 workers with 4 threads each.
+    """
+    worker_class, _, size = spec.partition(":")
+    workers, _, threads = (size or "1").partition("x")
+    return {"name": spec, "worker_class": worker_class, "workers": int(workers), "threads": int(threads or 1)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(config: dict, db_path: str, port: int) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "gunicorn", "main:app",
+           "--bind", f"127.0.0.1:{port}",
+           "--workers", str(config["workers"]),
+           "--worker-class", config["worker_class"],
+           "--threads", str(config["threads"]),
+           "--log-level", "warning"]
+    env = dict(os.environ, RISKRADAR_DB_PATH=db_path)
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, start_new_session=True)
+
+    deadline = time.time() + READY_TIMEOUT
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/ready")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_gunicorn(proc)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def stop_gunicorn(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+# === LOAD ===
+
+class RequestMix:
+    """
+    Draws (endpoint, path) pairs. Tickers follow a 1/rank popularity curve,
+    as a few names get most of the dashboard traffic.
+    """
+
+    def __init__(self, tickers: list, dates: list, seed: int = 0):
+        self.tickers = tickers
+        self.dates = dates[-60:]
+        popularity = 1.0 / np.arange(1, len(tickers) + 1)
+        self.ticker_weights = (popularity / popularity.sum()).tolist()
+        self.endpoints = list(REQUEST_MIX)
+        self.endpoint_weights = list(REQUEST_MIX.values())
+        self.seed = seed
+
+    def sampler(self, client_id: int):
+        rng = random.Random(self.seed + client_id)
+
+        def draw():
+            endpoint = rng.choices(self.endpoints, self.endpoint_weights)[0]
+            if endpoint == "tickers":
+                return endpoint, "/api/tickers"
+            if endpoint == "weights":
+                return endpoint, f"/api/weights/{rng.choice(self.dates)}"
+            ticker = rng.choices(self.tickers, self.ticker_weights)[0]
+            return endpoint, f"/api/{endpoint}/{ticker}"
+        return draw
+
+
+def run_level(port: int, mix: RequestMix, clients: int, seconds: float, think_ms: float = 0) -> dict:
+    """
+    `clients` closed-loop clients for `seconds`; returns latency and error stats.
+    """
+    samples = []  # (endpoint, latency seconds, ok)
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients + 1)
+    stop = [None]
+
+    def client(client_id):
+        draw = mix.sampler(client_id)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        start_line.wait()
+        while time.perf_counter() < stop[0]:
+            endpoint, path = draw()
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                ok = False
+            local.append((endpoint, time.perf_counter() - t0, ok))
+            if think_ms:
+                time.sleep(think_ms / 1000)
+        conn.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    stop[0] = time.perf_counter() + seconds
+    start_line.wait()
+    for t in threads:
+        t.join()
+
+    def summarize(rows):
+        if not rows:
+            return {"requests": 0}
+        lat = np.array([r[1] for r in rows]) * 1000
+        errors = sum(not r[2] for r in rows)
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / seconds, 1),
+            "p50_ms": round(float(np.percentile(lat, 50)), 2),
+            "p95_ms": round(float(np.percentile(lat, 95)), 2),
+            "p99_ms": round(float(np.percentile(lat, 99)), 2),
+            "error_rate": round(errors / len(rows), 4),
+        }
+
+    result = {"concurrency": clients, **summarize(samples), "endpoints": {}}
+    for endpoint in REQUEST_MIX:
+        result["endpoints"][endpoint] = summarize([s for s in samples if s[0] == endpoint])
+    return result
+
+# === REPORT ===
+
+def within_slo(level: dict, p95_ms: float, max_error_rate: float) -> bool:
+    return level.get("requests", 0) > 0 and level["p95_ms"] <= p95_ms and level["error_rate"] <= max_error_rate
+
+
+def print_level(level: dict) -> None:
+    print(f"  {level['concurrency']:>4} clients  {level.get('throughput_rps', 0):>8} req/s  "
+          f"p50 {level.get('p50_ms', 0):>8} ms  p95 {level.get('p95_ms', 0):>8} ms  "
+          f"p99 {level.get('p99_ms', 0):>8} ms  errors {100 * level.get('error_rate', 0):.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test gunicorn configurations against a synthetic database.")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS,
+                        help="comma-separated worker_class:workers[xthreads], e.g. sync:4,gthread:2x8")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="comma-separated client counts")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each concurrency level")
+    parser.add_argument("--warmup", type=float, default=3, help="unrecorded load before each configuration")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a client's requests")
+    parser.add_argument("--slo-p95-ms", type=float, default=250)
+    parser.add_argument("--slo-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    configs = [parse_config(c) for c in args.configs.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="riskradar_load_")
+    try:
+        db_path = os.path.join(workdir, "riskradar.db")
+        stats = build_synthetic_db(db_path, args.tickers, args.years)
+        print(f"🧪 Synthetic database: {stats['rows']} rows, {stats['tickers']} tickers")
+
+        # Build the derived stores up front so every configuration serves the same data
+        os.environ["RISKRADAR_DB_PATH"] = db_path
+        from app.services.price_store import build_price_store, get_price_store
+        from app.services.snapshots import refresh_snapshots
+        from app.services.weights_store import get_weights_store
+        with redirect_stdout(io.StringIO()):
+            build_price_store()
+            refresh_snapshots(30, full=True)
+        mix = RequestMix(get_price_store().tickers(), get_weights_store(30).dates())
+
+        results = {"config": vars(args) | stats, "mix": REQUEST_MIX, "runs": []}
+        for config in configs:
+            port = _free_port()
+            print(f"\n🚀 gunicorn {config['name']} "
+                  f"({config['workers']} x {config['worker_class']}, {config['threads']} thread(s))")
+            proc = start_gunicorn(config, db_path, port)
+            try:
+                run_level(port, mix, max(levels), args.warmup, args.think_ms)
+                run = {"server": config, "levels": []}
+                for clients in levels:
+                    level = run_level(port, mix, clients, args.seconds, args.think_ms)
+                    run["levels"].append(level)
+                    print_level(level)
+                passing = [lv["concurrency"] for lv in run["levels"]
+                           if within_slo(lv, args.slo_p95_ms, args.slo_error_rate)]
+                run["max_concurrency_within_slo"] = max(passing) if passing else 0
+                run["peak_throughput_rps"] = max(lv.get("throughput_rps", 0) for lv in run["levels"])
+                results["runs"].append(run)
+            finally:
+                stop_gunicorn(proc)
+
+        print(f"\n📊 SLO: p95 <= {args.slo_p95_ms:g} ms, errors <= {100 * args.slo_error_rate:g}%")
+        for run in results["runs"]:
+            print(f"  {run['server']['name']:<16} max clients within SLO: {run['max_concurrency_within_slo']:>4}  "
+                  f"peak {run['peak_throughput_rps']} req/s")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"📄 Saved results to {args.output}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
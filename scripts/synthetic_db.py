@@ -0,0 +1,86 @@
+# scripts/synthetic_db.py
+
+import os
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+
+# === CONFIGURATION ===
+# Builds a stock_data database with the same schema and unique index as
+# riskradar.db, filled with geometric-random-walk OHLCV bars. Ticker names are
+# taken from data_sources/master_tickers.csv so index lookups (sp500, ...) hit.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MASTER_FILE = os.path.join(BASE_DIR, "data_sources", "master_tickers.csv")
+BATCH_ROWS = 200_000
+
+# === FUNCTIONS ===
+
+def synthetic_tickers(n: int) -> list:
+    names = pd.read_csv(MASTER_FILE)["ticker"].dropna().astype(str).tolist()
+    names += [f"SYN{i:05d}" for i in range(max(0, n - len(names)))]
+    return sorted(names[:n])
+
+
+def build_synthetic_db(path: str, n_tickers: int = 500, years: int = 5,
+                       seed: int = 0, end_date: str = "2024-12-31") -> dict:
+    """
+    Write a fresh synthetic stock_data database to `path`.
+    Returns {"tickers", "dates", "rows"}.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end_date, periods=years * 252).strftime("%Y-%m-%d").tolist()
+    tickers = synthetic_tickers(n_tickers)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("""
+        CREATE TABLE stock_data (
+            ticker TEXT, date TEXT,
+            open REAL, high REAL, low REAL, close REAL,
+            volume INTEGER
+        )
+    """)
+
+    rows = 0
+    batch = []
+    for ticker in tickers:
+        sigma = rng.uniform(0.01, 0.04)
+        # Late listings give some tickers shorter histories
+        start = int(rng.integers(0, len(dates) // 4)) if rng.random() < 0.2 else 0
+        n = len(dates) - start
+        close = rng.uniform(10, 500) * np.cumprod(1 + rng.normal(0.0003, sigma, n))
+        open_ = close * (1 + rng.normal(0, sigma / 4, n))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, sigma / 2, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, sigma / 2, n)))
+        volume = rng.integers(10_000, 5_000_000, n)
+        batch.extend(zip([ticker] * n, dates[start:], open_.tolist(), high.tolist(),
+                         low.tolist(), close.tolist(), volume.tolist()))
+        if len(batch) >= BATCH_ROWS:
+            conn.executemany("INSERT INTO stock_data VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            rows += len(batch)
+            batch = []
+    conn.executemany("INSERT INTO stock_data VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+    rows += len(batch)
+
+    conn.execute("CREATE UNIQUE INDEX idx_unique_ticker_date ON stock_data (ticker, date)")
+    conn.commit()
+    conn.close()
+    return {"tickers": len(tickers), "dates": len(dates), "rows": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic riskradar database.")
+    parser.add_argument("path")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = build_synthetic_db(args.path, args.tickers, args.years, args.seed)
+    print(f"✅ Wrote {stats['rows']} rows ({stats['tickers']} tickers x {stats['dates']} dates) to {args.path}")
@@ -0,0 +1,139 @@
+import asyncio
+import functools
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import app as app_module
+import app.api.export_api as export_api
+import app.bootstrap as bootstrap
+import app.services.exporter as exporter
+from app.async_bridge import AsyncBridge, full_history_volatility, lane_for
+from app.database import create_reader_engine
+from scripts.synthetic_db import build_synthetic_db
+
+CHUNK_ROWS = 200
+
+
+@pytest.fixture
+def flask_app(monkeypatch, tmp_path):
+    path = str(tmp_path / "riskradar.db")
+    build_synthetic_db(path, n_tickers=5, years=1)
+    monkeypatch.setattr(exporter, "engine", create_reader_engine(path))
+    # Small chunks so every export spans several body messages
+    monkeypatch.setattr(export_api, "iter_export", functools.partial(exporter.iter_export, chunk_rows=CHUNK_ROWS))
+    monkeypatch.setattr(app_module, "start_bootstrap", lambda: None)
+    monkeypatch.setitem(bootstrap._state, "status", "ready")
+    return app_module.create_app()
+
+
+@pytest.fixture
+def bridge(flask_app):
+    bridge = AsyncBridge(flask_app)
+    yield bridge
+    bridge.stop()
+
+
+async def call(bridge, path: str, query: str = "") -> dict:
+    """
+    One GET through the bridge; returns the status and every body message.
+    """
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+             "query_string": query.encode(), "headers": [], "scheme": "http",
+             "server": ("testserver", 80), "client": ("127.0.0.1", 1234), "root_path": "",
+             "http_version": "1.1"}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await bridge(scope, receive, send)
+    assert sent[0]["type"] == "http.response.start"
+    return {"status": sent[0]["status"], "chunks": [m["body"] for m in sent[1:]]}
+
+
+@pytest.mark.parametrize("path,query", [
+    ("/api/export", "format=csv"),
+    ("/api/export", "format=ndjson"),
+    ("/api/export/{ticker}", "format=csv"),
+])
+def test_export_streams_through_the_bridge(flask_app, bridge, path, query):
+    with exporter.engine.connect() as conn:
+        path = path.format(ticker=conn.execute(text("SELECT MIN(ticker) FROM stock_data")).scalar())
+    expected = flask_app.test_client().get(f"{path}?{query}").data
+    response = asyncio.run(call(bridge, path, query))
+    assert response["status"] == 200
+    assert len([c for c in response["chunks"] if c]) > 1
+    assert b"".join(response["chunks"]) == expected
+
+
+def test_concurrent_exports_keep_their_own_context(flask_app, bridge):
+    client = flask_app.test_client()
+    expected = {fmt: client.get(f"/api/export?format={fmt}").data for fmt in ("csv", "ndjson")}
+
+    async def run_all():
+        return await asyncio.gather(*(call(bridge, "/api/export", f"format={fmt}")
+                                      for fmt in ("csv", "ndjson") * 3))
+
+    for fmt, response in zip(("csv", "ndjson") * 3, asyncio.run(run_all())):
+        assert response["status"] == 200
+        assert b"".join(response["chunks"]) == expected[fmt]
+
+
+def test_lanes():
+    assert lane_for("/api/export") == "stream"
+    assert lane_for("/api/export/AAPL") == "stream"
+    assert lane_for("/api/volatility/batch") == "compute"
+    assert lane_for("/api/covariance") == "cheap"
+    assert lane_for("/api/volatility/AAPL") == "cheap"
+
+
+def test_only_full_history_volatility_is_compute(monkeypatch):
+    import app.api.volatility_api as volatility_api
+    monkeypatch.setitem(bootstrap._state, "status", "ready")
+    seen = []
+
+    def needs_full_history(ticker, window, estimator):
+        seen.append((ticker, window, estimator))
+        return ticker == "COLD"
+
+    monkeypatch.setattr(volatility_api, "needs_full_history", needs_full_history)
+
+    def environ(path, query=""):
+        return {"PATH_INFO": path, "QUERY_STRING": query}
+
+    assert full_history_volatility(environ("/api/volatility/COLD", "window=20"))
+    assert not full_history_volatility(environ("/api/volatility/WARM"))
+    assert seen == [("COLD", 20, "close"), ("WARM", 30, "close")]
+    # Answered by the app with 400, or not a per-ticker route at all
+    assert not full_history_volatility(environ("/api/volatility/COLD", "window=x"))
+    assert not full_history_volatility(environ("/api/volatility/COLD", "window=1"))
+    assert not full_history_volatility(environ("/api/volatility/top"))
+    assert not full_history_volatility(environ("/api/volatility/COLD/percentile"))
+    assert len(seen) == 2
+
+
+def _unavailable(*args):
+    raise OperationalError("SELECT 1", {}, Exception("unable to open database file"))
+
+
+def test_lane_check_falls_back_to_cheap_on_database_errors(monkeypatch):
+    import app.api.volatility_api as volatility_api
+    monkeypatch.setitem(bootstrap._state, "status", "ready")
+    monkeypatch.setattr(volatility_api, "needs_full_history", _unavailable)
+    assert not full_history_volatility({"PATH_INFO": "/api/volatility/AAPL", "QUERY_STRING": ""})
+
+
+def test_volatility_while_warming_gets_the_readiness_503(flask_app, bridge, monkeypatch):
+    import app.api.volatility_api as volatility_api
+    monkeypatch.setattr(volatility_api, "needs_full_history",
+                        lambda *args: pytest.fail("lane check queried the database while warming"))
+    monkeypatch.setitem(bootstrap._state, "status", "warming")
+    response = asyncio.run(call(bridge, "/api/volatility/AAPL"))
+    assert response["status"] == 503
+    assert json.loads(b"".join(response["chunks"]))["status"] == "warming"
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import bootstrap
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+DIGEST = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class FakeServer:
+    """
+    Local stand-in for the database host: serves /riskradar.db with Range
+    support and /riskradar.db.sha256, with switches for the failure paths.
+    """
+
+    def __init__(self):
+        self.ranges = []            # Range header of every database request
+        self.drop_first = False     # cut the first response off half way
+        self.ignore_range = False   # always answer 200 with the whole file
+        self.digest = DIGEST        # None answers 404 for the digest file
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/riskradar.db.sha256":
+                    if server.digest is None:
+                        self.send_error(404)
+                        return
+                    body = f"{server.digest}  riskradar.db\n".encode()
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                header = self.headers.get("Range")
+                server.ranges.append(header)
+                offset = int(header[len("bytes="):].rstrip("-")) if header and not server.ignore_range else 0
+                if offset >= len(PAYLOAD):
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(PAYLOAD)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = PAYLOAD[offset:]
+                self.send_response(206 if offset else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.drop_first and len(server.ranges) == 1:
+                    self.wfile.write(body[:len(body) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/riskradar.db"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    fake = FakeServer()
+    yield fake
+    fake.close()
+
+
+def test_digest_url_keeps_query():
+    assert bootstrap.digest_url("https://host/db/riskradar.db?dl=1") == "https://host/db/riskradar.db.sha256?dl=1"
+
+
+def test_deployment_config_resolves_a_digest():
+    """
+    The default DROPBOX_URL publishes no .sha256, so the deploy must carry the digest.
+    """
+    root = os.path.join(os.path.dirname(__file__), "..")
+    with open(os.path.join(root, ".render.yaml")) as f:
+        env = re.findall(r"^\s*- key: (\S+)", f.read(), re.M)
+    assert "RISKRADAR_DB_SHA256" in env
+    assert "RISKRADAR_DB_URL" not in env  # the digest belongs to the default URL
+
+    # With the deploy's digest set, the default config resolves it without any fetch
+    script = ("from app import bootstrap as b; from app.database import DROPBOX_URL; "
+              "assert b.DB_URL == DROPBOX_URL; "
+              "b.fetch_published_digest = None; "
+              "print(b.expected_digest(b.DB_URL, b.DB_SHA256, b.DB_SHA256_URL, b.ALLOW_UNVERIFIED))")
+    environ = {k: v for k, v in os.environ.items() if not k.startswith("RISKRADAR_DB_")}
+    environ.update(RISKRADAR_DB_SHA256=DIGEST.upper(), PYTHONPATH=root)
+    out = subprocess.run([sys.executable, "-c", script], env=environ, cwd=root,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.split() == [DIGEST]
+
+
+def test_ensure_database_verifies_published_digest(server, tmp_path):
+    dest = tmp_path / "riskradar.db"
+    bootstrap.ensure_database(str(dest), server.url, sha256=None, sha256_url=None)
+    assert dest.read_bytes() == PAYLOAD
+    assert not (tmp_path / "riskradar.db.part").exists()
+
+
+def test_missing_digest_fails_closed(server, tmp_path):
+    server.digest = None
+    dest = tmp_path / "riskradar.db"
+    with pytest.raises(ValueError, match="RISKRADAR_DB_SHA256"):
+        bootstrap.ensure_database(str(dest), server.url, sha256=None, sha256_url=None)
+    assert not dest.exists()
+    assert server.ranges == []  # nothing downloaded without a digest
+
+
+def test_missing_digest_allowed_when_opted_out(server, tmp_path):
+    server.digest = None
+    dest = tmp_path / "riskradar.db"
+    bootstrap.ensure_database(str(dest), server.url, sha256=None, sha256_url=None, allow_unverified=True)
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_resumes_after_dropped_connection(server, tmp_path):
+    server.drop_first = True
+    dest = tmp_path / "riskradar.db"
+    bootstrap.download_database(server.url, str(dest), DIGEST, retries=3, timeout=5)
+    assert dest.read_bytes() == PAYLOAD
+    assert server.ranges[0] is None
+    assert server.ranges[1] == f"bytes={len(PAYLOAD) // 2}-"
+
+
+def test_range_not_satisfiable_completes_existing_part(server, tmp_path):
+    dest = tmp_path / "riskradar.db"
+    (tmp_path / "riskradar.db.part").write_bytes(PAYLOAD)
+    bootstrap.download_database(server.url, str(dest), DIGEST, retries=2, timeout=5)
+    assert server.ranges == [f"bytes={len(PAYLOAD)}-"]
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_server_ignoring_range_restarts_download(server, tmp_path):
+    server.ignore_range = True
+    dest = tmp_path / "riskradar.db"
+    (tmp_path / "riskradar.db.part").write_bytes(PAYLOAD[:1000])
+    bootstrap.download_database(server.url, str(dest), DIGEST, retries=2, timeout=5)
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_checksum_mismatch_discards_download(server, tmp_path):
+    dest = tmp_path / "riskradar.db"
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        bootstrap.download_database(server.url, str(dest), "0" * 64, retries=2, timeout=5)
+    assert not dest.exists()
+    assert not (tmp_path / "riskradar.db.part").exists()
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import data_sources.update_ticker_lists as updater
+
+PAGES = {
+    "nasdaq100": ('<table id="constituents"><tr><th>Company</th><th>Ticker</th></tr>'
+                  '<tr><td>Apple</td><td>AAPL</td></tr><tr><td>Microsoft</td><td>MSFT</td></tr></table>'),
+    "dow30": ('<table id="constituents"><tr><th>Company</th><th>Symbol</th></tr>'
+              '<tr><td>Boeing</td><td>BA</td></tr></table>'),
+    "russell2000": ('<table><tr><th>Company</th><th>Ticker</th></tr>'
+                    '<tr><td>Alpha</td><td>AAA</td></tr><tr><td>Beta</td><td>BBB</td></tr></table>'),
+}
+LAST_MODIFIED = "Mon, 02 Jun 2025 00:00:00 GMT"
+
+
+class FakeServer:
+    """
+    Local stand-in for the list pages: ETag validators for two sources,
+    Last-Modified only for russell2000, with switches for the other paths.
+    """
+
+    def __init__(self):
+        self.pages = dict(PAGES)
+        self.requests = []          # (name, status) of every request
+        self.validators = True      # False: plain 200s without ETag / Last-Modified
+        self.missing = set()        # names answered with 404
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                name = self.path.strip("/").removesuffix(".html")
+                if name in server.missing:
+                    server.requests.append((name, 404))
+                    self.send_error(404)
+                    return
+                body = f"<html><body>{server.pages[name]}</body></html>".encode()
+                if name == "russell2000":
+                    validator = ("Last-Modified", LAST_MODIFIED)
+                    fresh = self.headers.get("If-Modified-Since") == LAST_MODIFIED
+                else:
+                    validator = ("ETag", f'"{hashlib.sha1(body).hexdigest()}"')
+                    fresh = self.headers.get("If-None-Match") == validator[1]
+                if server.validators and fresh:
+                    server.requests.append((name, 304))
+                    self.send_response(304)
+                    self.send_header(*validator)
+                    self.end_headers()
+                    return
+                server.requests.append((name, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if server.validators:
+                    self.send_header(*validator)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def statuses(self) -> dict:
+        return {name: status for name, status in self.requests}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    fake = FakeServer()
+    for name in updater.SOURCES:
+        monkeypatch.setenv(f"RISKRADAR_TICKER_URL_{name.upper()}", f"{fake.base_url}/{name}.html")
+        monkeypatch.setitem(updater.SOURCES[name], "csv_path", str(tmp_path / f"{name}_tickers.csv"))
+    monkeypatch.setattr(updater, "CACHE_DIR", str(tmp_path / ".http_cache"))
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def downstream(monkeypatch):
+    runs = []
+    monkeypatch.setattr(updater, "run_downstream", lambda changed: runs.append(sorted(changed)))
+    return runs
+
+
+def test_first_run_parses_every_source(server, downstream, tmp_path):
+    assert sorted(updater.update_all_indices()) == sorted(PAGES)
+    assert downstream == [sorted(PAGES)]
+    assert (tmp_path / "nasdaq100_tickers.csv").read_text().split() == ["ticker", "AAPL", "MSFT"]
+    assert set(server.statuses().values()) == {200}
+
+
+def test_not_modified_skips_parsing_and_downstream(server, downstream, monkeypatch):
+    updater.update_all_indices()
+    monkeypatch.setitem(updater.PARSERS, "dow30", lambda html: pytest.fail("parsed a 304"))
+    assert updater.update_all_indices() == []
+    assert server.statuses() == dict.fromkeys(PAGES, 304)
+    assert downstream == [sorted(PAGES)]
+
+
+def test_unchanged_body_without_validators_is_skipped(server, downstream):
+    server.validators = False
+    updater.update_all_indices()
+    assert updater.update_all_indices() == []
+    assert server.statuses() == dict.fromkeys(PAGES, 200)
+    assert len(downstream) == 1
+
+
+def test_only_the_changed_source_is_rewritten(server, downstream, tmp_path):
+    updater.update_all_indices()
+    server.pages["dow30"] = PAGES["dow30"].replace("</table>", "<tr><td>Cisco</td><td>CSCO</td></tr></table>")
+    assert updater.update_all_indices() == ["dow30"]
+    assert downstream[-1] == ["dow30"]
+    assert "CSCO" in (tmp_path / "dow30_tickers.csv").read_text()
+
+
+def test_failed_source_does_not_stop_the_others(server, downstream, tmp_path):
+    server.missing = {"dow30"}
+    assert sorted(updater.update_all_indices()) == ["nasdaq100", "russell2000"]
+    assert not (tmp_path / "dow30_tickers.csv").exists()
+    assert downstream == [["nasdaq100", "russell2000"]]
+
+    # The failure cached nothing, so the next run fetches the page in full
+    server.missing = set()
+    assert updater.update_all_indices() == ["dow30"]
+    assert server.statuses()["dow30"] == 200
+
+
+def test_force_refetches_and_reparses(server, downstream):
+    updater.update_all_indices()
+    assert sorted(updater.update_all_indices(force=True)) == sorted(PAGES)
+    assert server.statuses() == dict.fromkeys(PAGES, 200)
+    assert len(downstream) == 2
+
+
+def test_parse_failure_is_retried_next_run(server, downstream, monkeypatch, tmp_path):
+    def broken(html):
+        raise KeyError("Symbol")
+
+    monkeypatch.setitem(updater.PARSERS, "dow30", broken)
+    assert sorted(updater.update_all_indices()) == ["nasdaq100", "russell2000"]
+    assert not (tmp_path / ".http_cache" / "dow30.json").exists()
+
+    # With the parser fixed, the page is fetched in full and parsed, not skipped as unchanged
+    monkeypatch.setitem(updater.PARSERS, "dow30", updater.parse_dow30_tickers)
+    assert updater.update_all_indices() == ["dow30"]
+    assert server.statuses()["dow30"] == 200
+    assert "BA" in (tmp_path / "dow30_tickers.csv").read_text()